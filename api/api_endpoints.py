@@ -1,23 +1,103 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Start of the module import, for the import-time budget
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Dict, List, Optional
+import json
 import logging
-from price_engine.dynamic_pricing_calculation import calculate_price
+import os
+from price_engine.dynamic_pricing_calculation import (calculate_prices, configure_price_table,
+                                                      configure_pricing_rules, load_model, prediction_cache,
+                                                      price_catalog)
+from models.model_artifact import is_artifact
 from config.config_settings import get_config
-from models.model_evaluation import load_model
+from api.request_batcher import PriceRequestBatcher
+from api.model_registry import ModelRegistry
+from utils.logger import HOT_PATH, sample_request, setup_logging
+from utils.metrics import metrics
+from utils.profiler import SamplingProfiler
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Run the startup hook before the app serves and the shutdown hook after it stops.
+    """
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Initialize logger
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load configuration
+# Configuration, loaded by the startup hook rather than at import
 CONFIG_PATH = 'config/development.yaml'
-config = get_config(CONFIG_PATH)
+config = {}
+catalog_config = {}
+metrics_config = {}
+admin_config = {}
+model_path = None
+batcher = None
+price_table = None
+# Wall-clock time the startup hook ran, for the time-to-ready of the first model
+started_at = None
 
-model_path = 'models/trained_model.pkl'
-model = load_model(model_path)
+# Serving model, loaded and warmed up by the startup hook and hot-swappable through the admin endpoints or the
+# file watcher
+registry = ModelRegistry(load_model)
+
+def price_batch(user_ids, product_ids, purchase_dates, base_prices, categories, locations, purchase_times):
+    """
+    Price a batch of coalesced requests with the currently loaded model.
+    """
+    return calculate_prices(registry.current, user_ids, product_ids, purchase_dates, base_prices, categories,
+                            locations, purchase_times)
+
+def reload_price_table(model=None):
+    """
+    Reload the configured price table from disk, picking up tables rebuilt for the serving model.
+    Runs after every model swap, since a table only hits for the model version it was built from.
+    Args:
+        model: Swapped-in model; unused, the table is always re-read.
+    Returns:
+        PriceTable: The loaded table, or None.
+    """
+    global price_table
+    price_table = configure_price_table(config.get('pricing', {}).get('price_table', {}).get('path'))
+    return price_table
+
+registry.add_swap_listener(reload_price_table)
+
+def serving_model():
+    """
+    Get the serving model, refusing requests until the first model is warm.
+    Returns:
+        model: Currently loaded model.
+    """
+    model = registry.current
+    if model is None:
+        raise HTTPException(status_code=503, detail="The model is still loading")
+    return model
+
+# Scrape-time gauges from the batcher, the prediction cache, the price table and startup
+metrics.add_gauges(lambda: {f'pricing_batcher_{name}': value
+                            for name, value in (batcher.stats() if batcher is not None else {}).items()})
+metrics.add_gauges(lambda: {f'pricing_cache_{name}': value for name, value in prediction_cache.stats().items()})
+metrics.add_gauges(lambda: {f'pricing_table_{name}': value
+                            for name, value in (price_table.stats() if price_table is not None else {}).items()
+                            if name != 'model_version'})
+metrics.add_gauges(lambda: {'pricing_model_ready': registry.current is not None,
+                            'pricing_import_seconds': IMPORT_SECONDS})
 
 # Define request model
 class PriceRequest(BaseModel):
@@ -25,33 +105,410 @@ class PriceRequest(BaseModel):
     product_id: str
     purchase_date: str
     base_price: float
+    category: Optional[str] = None
+    location: Optional[str] = None
+    purchase_time: Optional[str] = None
+
+class BulkPriceRequest(BaseModel):
+    requests: List[PriceRequest]
+
+class CatalogRequest(BaseModel):
+    user_id: str
+    purchase_date: str
+    k: int = 10
+    use_ann: Optional[bool] = None
+    base_prices: Dict[str, float] = {}
+
+class ModelReloadRequest(BaseModel):
+    path: Optional[str] = None
+    wait: bool = False
+
+# Number of requests priced and serialized per streamed NDJSON chunk
+NDJSON_CHUNK_SIZE = 1000
+
+def price_requests(model, requests):
+    """
+    Price a list of requests with one model call.
+    Args:
+        model (TimeAwareFactorModel): Model to price with.
+        requests (list): PriceRequest objects.
+    Returns:
+        np.ndarray: Final prices matching the requests.
+    """
+    return calculate_prices(
+        model,
+        [r.user_id for r in requests],
+        [r.product_id for r in requests],
+        [r.purchase_date for r in requests],
+        [r.base_price for r in requests],
+        [r.category for r in requests],
+        [r.location for r in requests],
+        [r.purchase_time for r in requests]
+    )
+
+async def iter_ndjson_prices(model, requests):
+    """
+    Price bulk requests chunk by chunk and stream the results as newline-delimited JSON, one line per request.
+    The first lines go out as soon as the first chunk is priced, and only one chunk of prices is held at a time.
+    Args:
+        model (TimeAwareFactorModel): Model to price with, fixed for the whole response.
+        requests (list): PriceRequest objects, in input order.
+    Yields:
+        str: Chunks of NDJSON lines.
+    """
+    for start in range(0, len(requests), NDJSON_CHUNK_SIZE):
+        chunk = requests[start:start + NDJSON_CHUNK_SIZE]
+        try:
+            final_prices = await run_in_threadpool(price_requests, model, chunk)
+        except Exception as e:
+            # The status line is already sent, so the error can only end the stream early
+            record_error('/api/calculate_prices')
+            logger.error("Error in /api/calculate_prices stream after %d prices: %s", start, e)
+            raise
+        with metrics.stage('serialize'):
+            lines = ''.join(
+                json.dumps({'user_id': r.user_id, 'product_id': r.product_id, 'final_price': price}) + '\n'
+                for r, price in zip(chunk, final_prices.tolist())
+            )
+        yield lines
+
+def json_response(content):
+    """
+    Serialize a response body inside the timed serialization stage.
+    Args:
+        content: JSON-serializable response body.
+    Returns:
+        Response: Pre-serialized JSON response.
+    """
+    with metrics.stage('serialize'):
+        return Response(content=json.dumps(content), media_type='application/json')
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Count every request and record its end-to-end latency per route and status.
+    Also decides whether the request's hot-path log messages are sampled.
+    """
+    request.state.received_at = time.perf_counter()
+    sample_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        metrics.inc('pricing_requests_total', route=path, status=status)
+        metrics.observe('pricing_request_seconds', time.perf_counter() - request.state.received_at, route=path)
+
+def record_parse(http_request):
+    """
+    Record the time from receiving a request until its handler runs: body parsing and validation, plus any
+    wait for the event loop under load.
+    Args:
+        http_request (Request): Incoming request.
+    """
+    metrics.observe('pricing_stage_seconds', time.perf_counter() - http_request.state.received_at, stage='parse')
+
+def record_error(endpoint):
+    """
+    Count a failed request.
+    Args:
+        endpoint (str): Endpoint path.
+    """
+    metrics.inc('pricing_errors_total', endpoint=endpoint)
+
+async def startup():
+    """
+    Load the configuration, configure the pricing code and start loading the model.
+    By default the model loads and warms up on a background thread, so the process accepts connections at once
+    and /ready reports when it can serve.
+    """
+    global config, catalog_config, metrics_config, admin_config, model_path, batcher, started_at
+    started_at = time.time()
+    setup_logging()
+    config = get_config(CONFIG_PATH)
+    startup_config = config['api'].get('startup', {})
+    budget_ms = startup_config.get('import_budget_ms')
+    if budget_ms is not None and IMPORT_SECONDS * 1000 > budget_ms:
+        logger.warning("Importing the API took %.0f ms, over the %.0f ms budget", IMPORT_SECONDS * 1000, budget_ms)
+    else:
+        logger.info("Imported the API in %.0f ms", IMPORT_SECONDS * 1000)
+
+    # Size the prediction cache before the model load clears it
+    cache_config = config['pricing'].get('cache', {})
+    prediction_cache.configure(
+        max_size=cache_config.get('max_size', 100000),
+        ttl_seconds=cache_config.get('ttl_seconds', 300)
+    )
+
+    # Compile the pricing tier tables once; requests only look them up
+    configure_pricing_rules(config['pricing'].get('rules'))
+
+    # Precomputed prices of hot (user, product) pairs, checked before the model and reloaded on every swap
+    reload_price_table()
+
+    # Catalog scoring defaults
+    catalog_config = config['api'].get('catalog', {})
+
+    # Coalesce concurrent single-price requests into batched model calls
+    batching_config = config['api'].get('batching', {})
+    batcher = PriceRequestBatcher(
+        price_batch,
+        max_batch_size=batching_config.get('max_batch_size', 256),
+        max_wait_ms=batching_config.get('max_wait_ms', 2.0)
+    )
+
+    # The sampling profiler is opt-in because /admin/profile exposes code paths
+    metrics_config = config['api'].get('metrics', {})
+
+    # The model admin routes are opt-in because they swap what the API serves
+    admin_config = config['api'].get('admin', {})
+
+    model_path = config['api'].get('model_path', 'models/trained_model')
+    if startup_config.get('background_model_load', True):
+        registry.load_in_background(model_path)
+    else:
+        await run_in_threadpool(registry.load, model_path)
+    if config['api'].get('model_watch_interval', 0) > 0:
+        registry.watch(model_path, config['api']['model_watch_interval'])
+
+async def shutdown():
+    """
+    Stop the model watcher and flush the request batcher.
+    """
+    registry.stop()
+    if batcher is not None:
+        await batcher.close()
 
 @app.get("/")
 async def root():
     return {"message": "FastAPI is running"}
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 once a model is loaded and warmed up, 503 before that.
+    """
+    status = registry.status()
+    loads = [swap for swap in status['swaps'] if swap['action'] == 'load']
+    report = {
+        'ready': registry.current is not None,
+        'model_version': status['current']['version'],
+        'import_seconds': IMPORT_SECONDS,
+        'loading': status['reloading'],
+    }
+    if status['ready_at'] is not None and started_at is not None:
+        report['seconds_to_ready'] = max(status['ready_at'] - started_at, 0.0)
+    if loads and 'error' in loads[-1]:
+        report['error'] = loads[-1]['error']
+    return JSONResponse(report, status_code=200 if report['ready'] else 503)
+
+@app.get("/api/batcher_stats")
+async def batcher_stats():
+    """
+    API endpoint reporting the request coalescer's queue depth and batch sizes.
+    """
+    return batcher.stats()
+
+@app.get("/api/cache_stats")
+async def cache_stats():
+    """
+    API endpoint reporting the prediction cache's size and hit/miss counters.
+    """
+    return prediction_cache.stats()
+
+@app.get("/api/price_table_stats")
+async def price_table_stats():
+    """
+    API endpoint reporting the price table's size, build throughput and hit/miss counters.
+    """
+    if price_table is None:
+        raise HTTPException(status_code=404, detail="No price table is loaded")
+    return price_table.stats()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus scrape endpoint with request counts, per-stage latency histograms and quantiles,
+    unknown-ID fallback counters, and batcher and cache gauges.
+    """
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+@app.get("/admin/profile")
+async def profile(seconds: float = 10.0, interval_ms: float = 5.0):
+    """
+    Admin endpoint sampling every thread's stack for a while and returning folded stacks for a flamegraph.
+    Only available when api.metrics.profiler_enabled is set in the configuration.
+    """
+    if not metrics_config.get('profiler_enabled', False):
+        raise HTTPException(status_code=403, detail="The sampling profiler is disabled")
+    seconds = min(seconds, metrics_config.get('profiler_max_seconds', 30))
+    profiler = SamplingProfiler(interval=interval_ms / 1000.0)
+    try:
+        folded = await run_in_threadpool(profiler.profile, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded)
+
 @app.post("/api/calculate_price")
-async def calculate_price_endpoint(request: PriceRequest):
+async def calculate_price_endpoint(request: PriceRequest, http_request: Request):
     """
     API endpoint to calculate the dynamic price for a product.
     Expects JSON input with user_id, product_id, purchase_date, and base_price.
+    Concurrent requests are coalesced into batched predictions that run off the event loop.
     """
+    record_parse(http_request)
     try:
         user_id = request.user_id
         product_id = request.product_id
         purchase_date = request.purchase_date
         base_price = request.base_price
 
-        logger.info(f"API request to calculate price for User: {user_id}, Product: {product_id}, Date: {purchase_date}")
+        logger.info("API request to calculate price for User: %s, Product: %s, Date: %s", user_id, product_id,
+                    purchase_date, extra=HOT_PATH)
+        serving_model()
 
-        final_price = calculate_price(model, user_id, product_id, purchase_date, base_price)
+        final_price = await batcher.submit(user_id, product_id, purchase_date, base_price, request.category,
+                                           request.location, request.purchase_time)
 
         response = {'final_price': final_price}
-        return response
+        return json_response(response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        record_error('/api/calculate_price')
+        logger.error("Error in /api/calculate_price endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/calculate_prices")
+async def calculate_prices_endpoint(request: BulkPriceRequest, http_request: Request, stream: bool = False):
+    """
+    API endpoint to calculate dynamic prices for many products in one call.
+    Expects JSON input with a list of requests, each with user_id, product_id, purchase_date, and base_price.
+    The model is called once for the whole batch. With ?stream=true the batch is instead priced
+    NDJSON_CHUNK_SIZE requests at a time and each chunk is streamed back as NDJSON lines once it is priced.
+    """
+    record_parse(http_request)
+    try:
+        requests = request.requests
+        logger.info("API request to calculate %d prices", len(requests), extra=HOT_PATH)
+
+        if stream:
+            return StreamingResponse(iter_ndjson_prices(serving_model(), requests), media_type='application/x-ndjson')
+        final_prices = await run_in_threadpool(price_requests, serving_model(), requests)
+        response = {'final_prices': final_prices.tolist()}
+        return json_response(response)
+    except HTTPException:
+        raise
+    except Exception as e:
+        record_error('/api/calculate_prices')
+        logger.error("Error in /api/calculate_prices endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/score_catalog")
+async def score_catalog_endpoint(request: CatalogRequest):
+    """
+    API endpoint returning the top-k products for a user, priced when their base price is given.
+    Expects JSON input with user_id, purchase_date, k, and optional base_prices and use_ann.
+    """
+    try:
+        logger.info("API request to score the catalog for User: %s, Date: %s", request.user_id,
+                    request.purchase_date, extra=HOT_PATH)
+        use_ann = catalog_config.get('use_ann', False) if request.use_ann is None else request.use_ann
+        items = await run_in_threadpool(
+            price_catalog, serving_model(), request.user_id, request.purchase_date, request.base_prices,
+            request.k, use_ann, catalog_config.get('n_probe')
+        )
+        return {'items': items}
+    except HTTPException:
+        raise
+    except Exception as e:
+        record_error('/api/score_catalog')
+        logger.error("Error in /api/score_catalog endpoint: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+def require_admin():
+    """
+    Refuse admin requests unless api.admin.enabled is set in the configuration.
+    """
+    if not admin_config.get('enabled', False):
+        raise HTTPException(status_code=403, detail="The admin endpoints are disabled")
+
+def resolve_reload_path(path):
+    """
+    Resolve the model path of a reload request, only accepting artifact directories inside the configured
+    model directory; pickles and other files are refused since loading them can run arbitrary code.
+    Args:
+        path (str): Requested model path; None reloads the configured model path.
+    Returns:
+        str: Resolved model path.
+    """
+    if path is None:
+        return model_path
+    model_dir = os.path.realpath(admin_config.get('model_dir', 'models'))
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([model_dir, resolved]) != model_dir or not is_artifact(resolved):
+        raise HTTPException(status_code=400,
+                            detail=f"Only model artifact directories under {model_dir} can be loaded")
+    return resolved
+
+@app.get("/admin/model")
+async def model_status():
+    """
+    Admin endpoint reporting the serving and rollback models and recent swaps.
+    """
+    require_admin()
+    return registry.status()
+
+@app.post("/admin/model/reload")
+async def reload_model(request: ModelReloadRequest):
+    """
+    Admin endpoint to load a new model and swap it in without dropping requests.
+    Expects JSON input with an optional path (defaults to the configured model path) and wait flag; other paths
+    must be artifact directories under api.admin.model_dir.
+    By default the load runs in the background; with wait=true the swap report is returned.
+    """
+    require_admin()
+    path = resolve_reload_path(request.path)
+    try:
+        if request.wait:
+            return await run_in_threadpool(registry.load, path)
+        if not registry.load_in_background(path):
+            raise HTTPException(status_code=409, detail="A model reload is already in progress")
+        return {'status': 'reloading', 'path': path}
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error in /api/calculate_price endpoint: {e}")
+        logger.error("Error in /admin/model/reload endpoint: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/admin/model/rollback")
+async def rollback_model():
+    """
+    Admin endpoint to swap the previous model back in.
+    """
+    require_admin()
+    try:
+        return registry.rollback()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/price_table/reload")
+async def reload_price_table_endpoint():
+    """
+    Admin endpoint to reload the price table after price_engine/materialize_prices.py rebuilt it.
+    """
+    require_admin()
+    table = await run_in_threadpool(reload_price_table)
+    if table is None:
+        raise HTTPException(status_code=404, detail="No price table is configured or built")
+    return table.stats()
+
+# Seconds spent importing this module and everything it pulls in
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
 if __name__ == '__main__':
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=config['api']['port'])
+    uvicorn.run(app, host="0.0.0.0", port=get_config(CONFIG_PATH)['api']['port'])
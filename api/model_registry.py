@@ -0,0 +1,265 @@
+import collections
+import datetime
+import logging
+import os
+import resource
+import threading
+import time
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Number of known users/items combined into warm-up predictions for a freshly loaded model
+WARMUP_SIZE = 8
+# Number of load, failed load and rollback reports kept for the status endpoints
+SWAP_HISTORY = 100
+
+
+def current_rss_bytes():
+    """
+    Measure the resident set size of this process.
+    Returns:
+        int: Current RSS in bytes, or the peak RSS where the current value is unavailable.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def warm_up(model, date=None):
+    """
+    Run a few predictions so a freshly loaded model pages in its arrays before serving traffic.
+    Args:
+        model: Loaded Time-Aware Factor Model.
+        date (str): Date to predict for; defaults to today.
+    """
+    date = date or datetime.date.today().isoformat()
+    users = model.user_index.sorted_arrays()[0][:WARMUP_SIZE].tolist()
+    items = model.item_index.sorted_arrays()[0][:WARMUP_SIZE].tolist()
+    n = max(len(users), len(items), 1)
+    users = (users or ['']) * n
+    items = (items or ['']) * n
+    model.predict_batch(users[:n], items[:n], date)
+    model.predict(users[0], items[0], date)
+
+
+class ModelRegistry:
+    """
+    Hold the serving model and swap in new ones without downtime.
+
+    New models are loaded and warmed up outside the lock, then swapped in with a single reference
+    assignment; requests already holding the old model finish with it. The replaced model is kept so
+    that a rollback is an instant swap back. Loads and rollbacks are serialized, so swaps from the admin
+    endpoints and the file watcher always apply in order. Swap listeners run after every swap, before the next
+    one can start, to refresh state tied to the serving model.
+    """
+    def __init__(self, loader):
+        """
+        Args:
+            loader (callable): Function loading a model from a path.
+        """
+        self.loader = loader
+        self.current = None
+        self.current_path = None
+        self.previous = None
+        self.previous_path = None
+        self.swaps = collections.deque(maxlen=SWAP_HISTORY)
+        # Wall-clock time the first model was swapped in, kept after its report leaves the swap history
+        self.ready_at = None
+        self._lock = threading.Lock()
+        # Held for a whole load or rollback, so swaps never interleave
+        self._swap_lock = threading.Lock()
+        self._reload_thread = None
+        self._watch_thread = None
+        self._stop_watching = threading.Event()
+        self._swap_listeners = []
+
+    def add_swap_listener(self, listener):
+        """
+        Register a function called with the new serving model after every load and rollback.
+        Args:
+            listener (callable): Function taking the swapped-in model.
+        """
+        self._swap_listeners.append(listener)
+
+    def _notify_swap(self, model):
+        """
+        Run the swap listeners, logging instead of raising so a failed listener never undoes a swap.
+        Args:
+            model: Swapped-in model.
+        """
+        for listener in self._swap_listeners:
+            try:
+                listener(model)
+            except Exception as e:
+                logger.error(f"Error in swap listener {getattr(listener, '__name__', listener)}: {e}")
+
+    def load(self, path):
+        """
+        Load, warm up and swap in the model at a path, waiting for any load or rollback in progress.
+        Args:
+            path (str): Model path.
+        Returns:
+            dict: Swap report with load time, warm-up time and memory delta.
+        """
+        with self._swap_lock:
+            return self._load(path)
+
+    def _load(self, path):
+        """
+        Load, warm up and swap in the model at a path; the caller holds the swap lock.
+        Args:
+            path (str): Model path.
+        Returns:
+            dict: Swap report.
+        """
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        model = self.loader(path)
+        loaded = time.perf_counter()
+        warm_up(model)
+        warmed = time.perf_counter()
+        rss_after = current_rss_bytes()
+
+        with self._lock:
+            self.previous, self.previous_path = self.current, self.current_path
+            self.current, self.current_path = model, path
+            report = {
+                'action': 'load',
+                'path': path,
+                'version': getattr(model, 'version', None),
+                'previous_version': getattr(self.previous, 'version', None),
+                'load_seconds': loaded - start,
+                'warmup_seconds': warmed - loaded,
+                'rss_delta_bytes': rss_after - rss_before,
+                'rss_bytes': rss_after,
+                'swapped_at': time.time(),
+            }
+            self.swaps.append(report)
+            if self.ready_at is None:
+                self.ready_at = report['swapped_at']
+        logger.info(f"Swapped in model {report['version']} from {path}: loaded in {report['load_seconds']:.3f}s, "
+                    f"warmed in {report['warmup_seconds']:.3f}s, RSS delta {report['rss_delta_bytes'] / 2**20:+.1f} MiB")
+        self._notify_swap(model)
+        return report
+
+    def load_in_background(self, path):
+        """
+        Start loading a model on a background thread; the current model keeps serving meanwhile.
+        Args:
+            path (str): Model path.
+        Returns:
+            bool: False if another reload is still running.
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(target=self._load_logged, args=(path,), name='model-reload',
+                                                   daemon=True)
+            self._reload_thread.start()
+        return True
+
+    def _load_logged(self, path):
+        """
+        Load a model, logging instead of raising so a failed background reload leaves the current model serving.
+        Args:
+            path (str): Model path.
+        """
+        try:
+            self.load(path)
+        except Exception as e:
+            logger.error(f"Error reloading the model from {path}: {e}")
+            with self._lock:
+                self.swaps.append({'action': 'load', 'path': path, 'error': str(e), 'failed_at': time.time()})
+
+    def rollback(self):
+        """
+        Swap the previous model back in.
+        Returns:
+            dict: Swap report.
+        Raises:
+            RuntimeError: If there is no previous model or a load is in progress.
+        """
+        if not self._swap_lock.acquire(blocking=False):
+            raise RuntimeError("A model reload is in progress")
+        try:
+            return self._rollback()
+        finally:
+            self._swap_lock.release()
+
+    def _rollback(self):
+        """
+        Swap the previous model back in; the caller holds the swap lock.
+        Returns:
+            dict: Swap report.
+        """
+        with self._lock:
+            if self.previous is None:
+                raise RuntimeError("No previous model to roll back to")
+            self.current, self.previous = self.previous, self.current
+            self.current_path, self.previous_path = self.previous_path, self.current_path
+            model = self.current
+            report = {
+                'action': 'rollback',
+                'path': self.current_path,
+                'version': getattr(self.current, 'version', None),
+                'previous_version': getattr(self.previous, 'version', None),
+                'swapped_at': time.time(),
+            }
+            self.swaps.append(report)
+        logger.info(f"Rolled back to model {report['version']} from {report['path']}")
+        self._notify_swap(model)
+        return report
+
+    def watch(self, path, interval=5.0):
+        """
+        Poll a model path and reload it in the background whenever it changes on disk.
+        Reloads go through load_in_background; a change seen while another reload runs is picked up by a later poll.
+        Args:
+            path (str): Model path to watch.
+            interval (float): Polling interval in seconds.
+        """
+        def modified_time():
+            manifest = os.path.join(path, 'manifest.json')
+            try:
+                return os.stat(manifest if os.path.isdir(path) else path).st_mtime_ns
+            except OSError:
+                return None
+
+        def poll(last_seen):
+            while not self._stop_watching.wait(interval):
+                seen = modified_time()
+                if seen is not None and seen != last_seen and self.load_in_background(path):
+                    last_seen = seen
+                    logger.info(f"Model at {path} changed on disk, reloading")
+
+        self._stop_watching.clear()
+        # Take the baseline before returning, so a change made right after watch() is never missed
+        self._watch_thread = threading.Thread(target=poll, args=(modified_time(),), name='model-watch', daemon=True)
+        self._watch_thread.start()
+
+    def stop(self):
+        """
+        Stop watching the model path.
+        """
+        self._stop_watching.set()
+
+    def status(self):
+        """
+        Report the serving and rollback models and recent swaps.
+        The snapshot is taken under the lock every swap report is appended under; the swap lock is held for
+        whole loads, so taking it here would stall the readiness probe until a reload finished.
+        Returns:
+            dict: Registry status.
+        """
+        with self._lock:
+            return {
+                'current': {'path': self.current_path, 'version': getattr(self.current, 'version', None)},
+                'previous': {'path': self.previous_path, 'version': getattr(self.previous, 'version', None)},
+                'reloading': self._reload_thread is not None and self._reload_thread.is_alive(),
+                'watching': self._watch_thread is not None and self._watch_thread.is_alive(),
+                'swaps': list(self.swaps)[-10:],
+                'ready_at': self.ready_at,
+            }
@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class PriceRequestBatcher:
+    """
+    Coalesce concurrent single-price requests into batched model calls.
+
+    Requests are queued on the event loop and flushed as one batch when either max_batch_size requests
+    are waiting or the oldest has waited max_wait_ms. The batch is priced on a dedicated worker thread so
+    CPU-bound model code never blocks the event loop, and each caller's future is resolved with its price.
+    Each request carries a copy of its caller's context variables; a batch runs in the context of its first
+    request, so request-scoped state such as the log-sampling decision reaches the worker thread.
+    """
+    def __init__(self, price_batch, max_batch_size=256, max_wait_ms=2.0):
+        """
+        Args:
+            price_batch (callable): Function (user_ids, product_ids, purchase_dates, base_prices, categories,
+                locations, purchase_times) -> prices.
+            max_batch_size (int): Maximum number of requests per flushed batch.
+            max_wait_ms (float): Maximum time the first request of a batch waits for others, in milliseconds.
+        """
+        self.price_batch = price_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='price-batcher')
+        self._requests = 0
+        self._batches = 0
+        self._last_batch_size = 0
+        self._max_batch_size_seen = 0
+        self._max_queue_depth = 0
+
+    async def submit(self, user_id, product_id, purchase_date, base_price, category=None, location=None,
+                     purchase_time=None):
+        """
+        Queue one price request and wait for its batched result.
+        Args:
+            user_id (str): User ID.
+            product_id (str): Product ID.
+            purchase_date (str): Date of purchase.
+            base_price (float): Base price of the product.
+            category (str): Product category.
+            location (str): Purchase location.
+            purchase_time (str): Time of purchase as HH:MM.
+        Returns:
+            float: Final dynamic price for the product.
+        """
+        if self._task is None or self._task.done():
+            # (Re)start the batching task on the running event loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(((user_id, product_id, purchase_date, base_price, category, location, purchase_time),
+                                future, contextvars.copy_context()))
+        self._requests += 1
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _run(self):
+        """
+        Collect queued requests into batches and flush them until cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        """
+        Price one batch on the worker thread and resolve the callers' futures.
+        Args:
+            batch (list): (request arguments, future, context) triples.
+        """
+        self._batches += 1
+        self._last_batch_size = len(batch)
+        self._max_batch_size_seen = max(self._max_batch_size_seen, len(batch))
+        try:
+            await self._price(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+                return
+            # One bad request must not fail its neighbours: retry them one by one
+            logger.error(f"Error pricing a batch of {len(batch)} requests, retrying individually: {e}")
+            for item in batch:
+                try:
+                    await self._price([item])
+                except Exception as item_error:
+                    self._fail(item, item_error)
+
+    @staticmethod
+    def _fail(item, error):
+        """
+        Resolve a caller's future with the error that occurred while pricing its request.
+        Args:
+            item (tuple): (request arguments, future, context) triple.
+            error (Exception): Error to raise in the caller.
+        """
+        if not item[1].done():
+            item[1].set_exception(error)
+
+    async def _price(self, batch):
+        """
+        Run the batch pricing function on the worker thread and resolve the futures with the results.
+        Args:
+            batch (list): (request arguments, future, context) triples.
+        """
+        columns = [list(column) for column in zip(*(args for args, _, _ in batch))]
+        # run_in_executor does not propagate context variables, so run the batch inside a request's context
+        context = batch[0][2]
+        prices = await asyncio.get_running_loop().run_in_executor(self._executor, context.run, self.price_batch,
+                                                                  *columns)
+        for (_, future, _), price in zip(batch, prices):
+            if not future.done():
+                future.set_result(float(price))
+
+    def stats(self):
+        """
+        Report queue and batching statistics.
+        Returns:
+            dict: Queue depth, request and batch counts, and batch sizes.
+        """
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self._max_queue_depth,
+            'requests': self._requests,
+            'batches': self._batches,
+            'mean_batch_size': self._requests / self._batches if self._batches else 0.0,
+            'last_batch_size': self._last_batch_size,
+            'max_batch_size': self._max_batch_size_seen,
+        }
+
+    async def close(self):
+        """
+        Stop the batching task and the worker thread.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False)
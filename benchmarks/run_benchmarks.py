@@ -0,0 +1,570 @@
+"""
+run_benchmarks.py - Repeatable performance benchmarks on synthetic purchase histories.
+
+Objective:
+    Measure how training, prediction, evaluation, model loading, the price table and the pricing API scale with
+    data size, and save the results as JSON tagged with the git commit so runs can be compared between commits.
+    The API cold start is checked against the configured import-time budget.
+
+    The synthetic history is streamed to a Parquet file chunk by chunk; histories larger than --max-in-memory-rows
+    are trained out of core, with prediction, evaluation and serving benchmarked on an in-memory sample.
+    Timings are taken without tracemalloc, which slows Python-heavy code by an order of magnitude; peak traced
+    memory is measured in separate passes.
+
+Usage:
+    python -m benchmarks.run_benchmarks --rows 100000
+    python -m benchmarks.run_benchmarks --rows 1000000 --skip-api --compare benchmarks/results/<baseline>.json
+    python -m benchmarks.run_benchmarks --rows 100000000 --skip-api
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import pickle
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic_data import GENERATOR_CHUNK_SIZE, LOCATIONS, default_population, write_purchase_history
+from models.model_artifact import load_artifact, save_artifact
+from models.model_evaluation import evaluate_model
+from models.model_training import build_model
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = 'benchmarks/results'
+# Model settings used unless overridden on the command line
+DEFAULT_MODEL_CONFIG = {'n_factors': 50, 'lr': 0.005, 'reg': 0.02, 'n_epochs': 3, 'engine': 'minibatch'}
+# Histories up to this size are loaded and trained in memory; larger ones are trained out of core
+DEFAULT_IN_MEMORY_ROWS = 5_000_000
+# Modules the serving process must not import
+SERVING_EXCLUDED_MODULES = ('pandas', 'sklearn', 'scipy', 'pyarrow')
+# Cold start of the API in a fresh interpreter: import time, excluded modules loaded, and time until the
+# configured model is warm. The result goes to the file named by the first argument, since the app's logs share
+# stdout; the probe waits for the swap listeners and flushes the logging listeners before it exits.
+STARTUP_PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import api.api_endpoints as api
+from utils.logger import stop_listeners
+imported = time.perf_counter()
+asyncio.run(api.startup())
+while api.registry.current is None and api.registry.status()['reloading']:
+    time.sleep(0.001)
+ready = time.perf_counter()
+result = {'import_seconds': imported - start, 'ready_seconds': ready - start, 'ready': api.registry.current is not None,
+          'excluded_modules': [name for name in %r if name in sys.modules]}
+while api.registry.status()['reloading']:
+    time.sleep(0.001)
+api.registry.stop()
+stop_listeners()
+with open(sys.argv[1], 'w') as f:
+    json.dump(result, f)
+"""
+
+
+def measure(fn, *args, **kwargs):
+    """
+    Run a function once, measuring wall-clock time without memory tracing.
+    Args:
+        fn (callable): Function to run.
+    Returns:
+        tuple: (result, seconds).
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def trace_peak(fn, *args, **kwargs):
+    """
+    Run a function once under tracemalloc, measuring its peak traced memory.
+    Kept separate from measure, since tracing distorts the timing.
+    Args:
+        fn (callable): Function to run.
+    Returns:
+        int: Peak traced bytes.
+    """
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def latency_summary(seconds):
+    """
+    Summarize latencies as percentiles in milliseconds.
+    Args:
+        seconds (array-like): Latencies in seconds.
+    Returns:
+        dict: Mean, p50, p95 and p99 latency in milliseconds.
+    """
+    millis = np.asarray(seconds) * 1000
+    return {
+        'mean_ms': float(millis.mean()),
+        'p50_ms': float(np.percentile(millis, 50)),
+        'p95_ms': float(np.percentile(millis, 95)),
+        'p99_ms': float(np.percentile(millis, 99)),
+    }
+
+
+def bench_fit(data, config):
+    """
+    Benchmark training throughput in memory.
+    Args:
+        data (pd.DataFrame): Training data.
+        config (dict): Model settings.
+    Returns:
+        tuple: (trained model, results dict).
+    """
+    model = build_model(config)
+    _, seconds = measure(model.fit, data)
+    results = fit_results(model, seconds)
+    # Trace a separate one-epoch fit; peak memory does not grow with the number of epochs
+    results['epoch_peak_traced_bytes'] = trace_peak(build_model(dict(config, n_epochs=1)).fit, data)
+    return model, results
+
+
+def bench_fit_stream(file_path, config, chunk_size):
+    """
+    Benchmark out-of-core training throughput, streaming the history from disk every epoch.
+    Args:
+        file_path (str): Purchase history file.
+        config (dict): Model settings.
+        chunk_size (int): Rows per streamed chunk.
+    Returns:
+        tuple: (trained model, results dict).
+    """
+    from models.model_training import train_model_stream
+
+    model, seconds = measure(train_model_stream, file_path, config, chunk_size)
+    return model, dict(fit_results(model, seconds), streamed=True)
+
+
+def fit_results(model, seconds):
+    """
+    Summarize a training run.
+    Args:
+        model: Trained model.
+        seconds (float): Total training time.
+    Returns:
+        dict: Time, per-epoch throughput and final training RMSE.
+    """
+    return {
+        'seconds': seconds,
+        'rows_per_sec_per_epoch': float(np.mean([epoch['rows_per_sec'] for epoch in model.history])),
+        'final_train_rmse': model.history[-1]['train_rmse'],
+    }
+
+
+def bench_predict(model, data, n_single=2000, batch_sizes=(1000, 100000)):
+    """
+    Benchmark single-prediction latency and batch prediction throughput.
+    Args:
+        model: Trained model.
+        data (pd.DataFrame): Rows to predict.
+        n_single (int): Number of timed single predictions.
+        batch_sizes (tuple): Batch sizes to time.
+    Returns:
+        dict: Latency percentiles and rows per second for each batch size.
+    """
+    users, items, dates = (data[column].to_numpy() for column in ('User_ID', 'Product_ID', 'Purchase_Date'))
+    n_single = min(n_single, len(data))
+    latencies = np.empty(n_single)
+    for i in range(n_single):
+        start = time.perf_counter()
+        model.predict(users[i], items[i], dates[i])
+        latencies[i] = time.perf_counter() - start
+
+    results = {'single': latency_summary(latencies), 'batch': {}}
+    for batch_size in batch_sizes:
+        batch_size = min(batch_size, len(data))
+        args = (users[:batch_size], items[:batch_size], dates[:batch_size])
+        _, seconds = measure(model.predict_batch, *args)
+        peak = trace_peak(model.predict_batch, *args)
+        results['batch'][str(batch_size)] = {'seconds': seconds, 'rows_per_sec': batch_size / max(seconds, 1e-9),
+                                             'peak_traced_bytes': peak}
+    return results
+
+
+def bench_evaluate(model, data):
+    """
+    Benchmark evaluate_model over the full data.
+    Args:
+        model: Trained model.
+        data (pd.DataFrame): Evaluation data.
+    Returns:
+        dict: Time, throughput and the metrics themselves.
+    """
+    metrics, seconds = measure(evaluate_model, model, data)
+    peak = trace_peak(evaluate_model, model, data)
+    return {'seconds': seconds, 'rows_per_sec': len(data) / max(seconds, 1e-9), 'peak_traced_bytes': peak,
+            'metrics': {name: float(value) for name, value in metrics.items()}}
+
+
+def bench_load(model, workdir, repeats=5):
+    """
+    Benchmark saving and loading the model as an artifact directory and as a pickle.
+    Args:
+        model: Trained model.
+        workdir (str): Scratch directory.
+        repeats (int): Number of timed loads per format.
+    Returns:
+        tuple: (artifact path, results dict).
+    """
+    artifact_path = os.path.join(workdir, 'model')
+    pickle_path = os.path.join(workdir, 'model.pkl')
+    _, save_seconds = measure(save_artifact, model, artifact_path)
+    with open(pickle_path, 'wb') as f:
+        pickle.dump(model, f)
+
+    def load_pickle():
+        with open(pickle_path, 'rb') as f:
+            return pickle.load(f)
+
+    artifact_seconds = [measure(load_artifact, artifact_path)[1] for _ in range(repeats)]
+    pickle_seconds = [measure(load_pickle)[1] for _ in range(repeats)]
+    return artifact_path, {
+        'artifact_save_seconds': save_seconds,
+        'artifact_load_seconds': float(np.median(artifact_seconds)),
+        'pickle_load_seconds': float(np.median(pickle_seconds)),
+        'pickle_bytes': os.path.getsize(pickle_path),
+    }
+
+
+def bench_startup(n_runs=3, budget_ms=None):
+    """
+    Benchmark the cold start of the serving process, each run in a fresh interpreter.
+    Args:
+        n_runs (int): Number of cold starts.
+        budget_ms (float): Import-time budget; defaults to api.startup.import_budget_ms in the configuration.
+    Returns:
+        dict: Best-of-n import and time-to-ready seconds, the excluded modules that were imported, and whether
+            the import stayed within budget.
+    """
+    if budget_ms is None:
+        from config.config_settings import get_config
+        budget_ms = get_config('config/development.yaml')['api'].get('startup', {}).get('import_budget_ms')
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        result_path = os.path.join(workdir, 'startup.json')
+        for _ in range(n_runs):
+            subprocess.check_call([sys.executable, '-c', STARTUP_PROBE % (SERVING_EXCLUDED_MODULES,), result_path],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            with open(result_path) as f:
+                runs.append(json.load(f))
+    import_seconds = min(run['import_seconds'] for run in runs)
+    result = {
+        'import_seconds': import_seconds,
+        'ready_seconds': min(run['ready_seconds'] for run in runs),
+        'ready': all(run['ready'] for run in runs),
+        'excluded_modules': sorted({name for run in runs for name in run['excluded_modules']}),
+        'import_budget_ms': budget_ms,
+    }
+    result['within_budget'] = budget_ms is None or import_seconds * 1000 <= budget_ms
+    if not result['within_budget'] or result['excluded_modules']:
+        logger.warning(f"Serving startup regressed: import {import_seconds * 1000:.0f} ms (budget {budget_ms} ms), "
+                       f"excluded modules imported: {result['excluded_modules']}")
+    return result
+
+
+def bench_api(artifact_path, data, n_requests=2000, concurrency=64, bulk_size=1000):
+    """
+    Benchmark the pricing API in process, through the full ASGI stack.
+    Args:
+        artifact_path (str): Model artifact to serve.
+        data (pd.DataFrame): Rows to price.
+        n_requests (int): Number of single-price requests.
+        concurrency (int): Number of requests in flight at once.
+        bulk_size (int): Rows per bulk request.
+    Returns:
+        dict: Requests per second and latency percentiles for single requests, rows per second for bulk ones.
+    """
+    import httpx
+    from api import api_endpoints
+
+    rows = data.head(max(n_requests, bulk_size))
+    dates = pd.to_datetime(rows['Purchase_Date']).dt.strftime('%Y-%m-%d')
+    payloads = [{'user_id': user_id, 'product_id': product_id, 'purchase_date': purchase_date,
+                 'base_price': float(base_price)}
+                for user_id, product_id, purchase_date, base_price in zip(rows['User_ID'], rows['Product_ID'], dates,
+                                                                          rows['Price_Paid'])]
+
+    async def run():
+        # Run the startup hook on this event loop, then swap in the benchmark model once the configured one is up
+        await api_endpoints.startup()
+        while api_endpoints.registry.status()['reloading']:
+            await asyncio.sleep(0.01)
+        api_endpoints.registry.load(artifact_path)
+        transport = httpx.ASGITransport(app=api_endpoints.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+
+            async def single(payload):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post('/api/calculate_price', json=payload)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(single(payloads[i % len(payloads)]) for i in range(n_requests)))
+            single_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = await client.post('/api/calculate_prices', json={'requests': payloads[:bulk_size]})
+            response.raise_for_status()
+            bulk_seconds = time.perf_counter() - start
+            batcher_stats = api_endpoints.batcher.stats()
+        await api_endpoints.shutdown()
+        return latencies, single_seconds, bulk_seconds, batcher_stats
+
+    latencies, single_seconds, bulk_seconds, batcher_stats = asyncio.run(run())
+    return {
+        'single': dict(requests_per_sec=n_requests / max(single_seconds, 1e-9), concurrency=concurrency,
+                       **latency_summary(latencies)),
+        'bulk': {'rows': bulk_size, 'seconds': bulk_seconds, 'rows_per_sec': bulk_size / max(bulk_seconds, 1e-9)},
+        'batcher': batcher_stats,
+    }
+
+
+def bench_price_table(model, data, workdir, hot_users=1000, hot_products=200, days_ahead=7, n_rows=100000):
+    """
+    Benchmark building a materialized price table and pricing through it.
+    Args:
+        model: Trained model.
+        data (pd.DataFrame): Purchase history; the hot set is taken from it and its rows are priced.
+        workdir (str): Directory to save the table in.
+        hot_users (int): Number of hot users.
+        hot_products (int): Number of hot products.
+        days_ahead (int): Number of days precomputed.
+        n_rows (int): Number of rows priced with and without the table.
+    Returns:
+        dict: Build throughput, and pricing throughput and hit rate with and without the table.
+    """
+    from price_engine import dynamic_pricing_calculation
+    from price_engine.materialize_prices import materialize_prices
+
+    rows = data.tail(n_rows)
+    path = os.path.join(workdir, 'price_table')
+    # Price the rows as one day's traffic on the first precomputed day, as with a table built the night before
+    start_date = str(np.max(data['Purchase_Date'].to_numpy()).astype('datetime64[D]'))
+    build = materialize_prices(model, data, path, {'hot_users': hot_users, 'hot_products': hot_products,
+                                                   'days_ahead': days_ahead, 'start_date': start_date})
+
+    args = (model, rows['User_ID'].to_numpy(), rows['Product_ID'].to_numpy(), start_date,
+            rows['Price_Paid'].to_numpy())
+    dynamic_pricing_calculation.configure_price_table(None)
+    _, live_seconds = measure(dynamic_pricing_calculation.calculate_prices, *args, use_cache=False)
+    table = dynamic_pricing_calculation.configure_price_table(path)
+    _, table_seconds = measure(dynamic_pricing_calculation.calculate_prices, *args, use_cache=False)
+    dynamic_pricing_calculation.configure_price_table(None)
+    return {
+        'build': build,
+        'live': {'seconds': live_seconds, 'rows_per_sec': len(rows) / max(live_seconds, 1e-9)},
+        'table': {'seconds': table_seconds, 'rows_per_sec': len(rows) / max(table_seconds, 1e-9),
+                  'hit_rate': table.stats()['hit_rate']},
+    }
+
+
+def git_commit():
+    """
+    Get the current git commit, marking uncommitted changes.
+    Returns:
+        str: Commit hash, or None outside a git checkout.
+    """
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], text=True,
+                                        stderr=subprocess.DEVNULL).strip()
+        return f'{commit}-dirty' if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_features(file_path, chunk_size):
+    """
+    Benchmark feature extraction, streaming the history from disk chunk by chunk.
+    Args:
+        file_path (str): Purchase history file.
+        chunk_size (int): Rows per chunk.
+    Returns:
+        dict: Time and throughput of one pass over the history.
+    """
+    from data.data_loader import iter_chunks
+    from data.feature_extractor import FeatureEncoders, extract_features_stream
+
+    def extract_all():
+        n_rows = 0
+        for chunk in extract_features_stream(iter_chunks(file_path, chunk_size), FeatureEncoders(LOCATIONS)):
+            n_rows += len(chunk)
+        return n_rows
+
+    n_rows, seconds = measure(extract_all)
+    return {'seconds': seconds, 'rows_per_sec': n_rows / max(seconds, 1e-9)}
+
+
+def load_sample(file_path, n_rows):
+    """
+    Load the first rows of a history file with their features extracted.
+    Args:
+        file_path (str): Purchase history file.
+        n_rows (int): Number of rows to load.
+    Returns:
+        pd.DataFrame: Data with extracted features.
+    """
+    from data.data_loader import iter_chunks
+    from data.feature_extractor import FeatureEncoders, extract_features
+
+    return extract_features(next(iter_chunks(file_path, n_rows)), FeatureEncoders(LOCATIONS))
+
+
+def run_benchmarks(n_rows, model_config=None, seed=0, include_api=True, max_in_memory_rows=DEFAULT_IN_MEMORY_ROWS,
+                   chunk_size=GENERATOR_CHUNK_SIZE):
+    """
+    Run the full benchmark suite on a synthetic purchase history.
+    The history is written to disk chunk by chunk and never held in memory as a whole; histories larger than
+    max_in_memory_rows are trained out of core, and the remaining benchmarks run on their first
+    max_in_memory_rows rows.
+    Args:
+        n_rows (int): Number of synthetic rows.
+        model_config (dict): Model settings; defaults to DEFAULT_MODEL_CONFIG.
+        seed (int): Random seed for the data and the model initialization.
+        include_api (bool): Whether to benchmark the API.
+        max_in_memory_rows (int): Largest history trained in memory.
+        chunk_size (int): Rows per chunk when generating and streaming the history.
+    Returns:
+        dict: Benchmark results with environment details.
+    """
+    model_config = model_config or DEFAULT_MODEL_CONFIG
+    in_memory = n_rows <= max_in_memory_rows
+    results = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'n_rows': n_rows,
+        'seed': seed,
+        'model_config': model_config,
+        'in_memory': in_memory,
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        history_path = os.path.join(workdir, 'purchase_history.parquet')
+        n_users, n_items = default_population(n_rows)
+        _, seconds = measure(write_purchase_history, history_path, n_rows, n_users, n_items, seed=seed,
+                             chunk_size=chunk_size)
+        results['generate'] = {'seconds': seconds, 'users': n_users, 'items': n_items,
+                               'file_bytes': os.path.getsize(history_path)}
+        logger.info("Benchmarking feature extraction...")
+        results['features'] = bench_features(history_path, chunk_size)
+
+        np.random.seed(seed)
+        logger.info("Benchmarking training...")
+        if in_memory:
+            data = load_sample(history_path, n_rows)
+            model, results['fit'] = bench_fit(data, model_config)
+        else:
+            model, results['fit'] = bench_fit_stream(history_path, model_config, chunk_size)
+            data = load_sample(history_path, max_in_memory_rows)
+        results['sample_rows'] = len(data)
+
+        logger.info("Benchmarking prediction...")
+        results['predict'] = bench_predict(model, data)
+        results['evaluate'] = bench_evaluate(model, data)
+        logger.info("Benchmarking model loading...")
+        artifact_path, results['load'] = bench_load(model, workdir)
+        logger.info("Benchmarking the price table...")
+        results['price_table'] = bench_price_table(model, data, workdir)
+        if include_api:
+            logger.info("Benchmarking the API...")
+            results['api'] = bench_api(artifact_path, data)
+    if include_api:
+        logger.info("Benchmarking the API cold start...")
+        results['startup'] = bench_startup()
+
+    results['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return results
+
+
+def save_results(results, output_dir=RESULTS_DIR):
+    """
+    Save benchmark results as JSON named after the commit and row count.
+    Args:
+        results (dict): Benchmark results.
+        output_dir (str): Output directory.
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    commit = (results['commit'] or 'unknown')[:12]
+    path = os.path.join(output_dir, f"{commit}-{results['n_rows']}-{time.strftime('%Y%m%d%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"Benchmark results saved to {path}")
+    return path
+
+
+def compare_results(baseline, current, prefix=''):
+    """
+    Compare every numeric result between two benchmark runs.
+    Args:
+        baseline (dict): Earlier results.
+        current (dict): Later results.
+        prefix (str): Key path prefix used while recursing.
+    Returns:
+        dict: Dotted key path -> (baseline value, current value, current / baseline).
+    """
+    comparison = {}
+    for key, value in current.items():
+        path = f'{prefix}{key}'
+        previous = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            comparison.update(compare_results(previous or {}, value, f'{path}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(previous, (int, float)):
+            comparison[path] = (previous, value, value / previous if previous else None)
+    return comparison
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    # Keep the per-row logs of the pricing code out of the measurements
+    logging.getLogger('price_engine').setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description='Run the performance benchmarks on synthetic data.')
+    parser.add_argument('--rows', type=int, default=100000, help='Synthetic rows (10k to 100M)')
+    parser.add_argument('--epochs', type=int, default=DEFAULT_MODEL_CONFIG['n_epochs'])
+    parser.add_argument('--engine', default=DEFAULT_MODEL_CONFIG['engine'], choices=('sgd', 'minibatch'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-in-memory-rows', type=int, default=DEFAULT_IN_MEMORY_ROWS,
+                        help='Train larger histories out of core')
+    parser.add_argument('--chunk-size', type=int, default=GENERATOR_CHUNK_SIZE,
+                        help='Rows per chunk when generating and streaming the history')
+    parser.add_argument('--skip-api', action='store_true', help='Skip the API benchmark')
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    parser.add_argument('--compare', help='Earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    model_config = dict(DEFAULT_MODEL_CONFIG, n_epochs=args.epochs, engine=args.engine)
+    results = run_benchmarks(args.rows, model_config, args.seed, include_api=not args.skip_api,
+                             max_in_memory_rows=args.max_in_memory_rows, chunk_size=args.chunk_size)
+    save_results(results, args.output_dir)
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for path, (before, after, ratio) in compare_results(baseline, results).items():
+            print(f"{path}: {before:.6g} -> {after:.6g}" + (f" ({ratio:.2f}x)" if ratio is not None else ''))
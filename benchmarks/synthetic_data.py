@@ -0,0 +1,181 @@
+"""
+synthetic_data.py - Generate synthetic purchase histories for benchmarking.
+
+Objective:
+    Produce data with the Customer_Purchase_History schema (User_ID, Product_ID, Purchase_Date, Price_Paid, Rating,
+    Purchase_Time, Location) at any size, with power-law user and item popularity like real purchase logs.
+    Ratings come from latent user/item biases and factors plus noise, so the model has signal to learn.
+
+Usage:
+    from benchmarks.synthetic_data import generate_purchase_history, write_purchase_history
+    data = generate_purchase_history(100000)
+    write_purchase_history('cache/synthetic_100m.parquet', 100_000_000)
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+LOCATIONS = np.array(['London', 'New York', 'Paris', 'Berlin', 'Sydney', 'Rome', 'Madrid', 'Tokyo'])
+# Rows generated per vectorized chunk
+GENERATOR_CHUNK_SIZE = 1_000_000
+
+
+class PurchaseHistoryGenerator:
+    """
+    Sample purchase rows from a fixed synthetic population of users and items.
+    User and item popularity follow a Zipf law with the given exponents; rows are sampled by inverse-CDF
+    lookups on the cumulative popularity, and every string column is built by indexing precomputed arrays.
+    """
+    def __init__(self, n_users, n_items, start_date='2023-01-01', n_days=365, user_exponent=1.0,
+                 item_exponent=1.1, n_factors=8, seed=0):
+        """
+        Args:
+            n_users (int): Number of distinct users.
+            n_items (int): Number of distinct items.
+            start_date (str): First purchase date.
+            n_days (int): Number of days spanned by the purchases.
+            user_exponent (float): Zipf exponent of user activity.
+            item_exponent (float): Zipf exponent of item popularity.
+            n_factors (int): Dimension of the latent factors generating the ratings.
+            seed (int): Random seed; the same seed and sizes always produce the same rows.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.user_ids = np.char.add('CUST', np.char.zfill(np.arange(n_users).astype(str), 7))
+        self.item_ids = np.char.add('PROD', np.char.zfill(np.arange(n_items).astype(str), 6))
+        self.user_cdf = self._zipf_cdf(n_users, user_exponent)
+        self.item_cdf = self._zipf_cdf(n_items, item_exponent)
+        self.dates = np.datetime_as_string(np.datetime64(start_date) + np.arange(n_days), unit='D')
+        self.times = np.array([f'{hour:02d}:{minute:02d}' for hour in range(24) for minute in range(60)])
+
+        # Latent rating structure and per-item list prices
+        self.user_bias = self.rng.normal(0, 0.5, n_users)
+        self.item_bias = self.rng.normal(0, 0.5, n_items)
+        self.user_factors = self.rng.normal(0, 0.4, (n_users, n_factors))
+        self.item_factors = self.rng.normal(0, 0.4, (n_items, n_factors))
+        self.item_price = np.round(self.rng.lognormal(3.5, 0.6, n_items), 2)
+        self.location_cdf = self._zipf_cdf(len(LOCATIONS), 0.8)
+
+    def _zipf_cdf(self, n, exponent):
+        """
+        Build the cumulative distribution of a shuffled Zipf law over n entities.
+        Args:
+            n (int): Number of entities.
+            exponent (float): Zipf exponent.
+        Returns:
+            np.ndarray: Cumulative probabilities.
+        """
+        weights = 1.0 / np.arange(1, n + 1) ** exponent
+        weights = weights[self.rng.permutation(n)]
+        return np.cumsum(weights / weights.sum())
+
+    def _sample(self, cdf, size):
+        """
+        Sample entity indices from a cumulative distribution.
+        Args:
+            cdf (np.ndarray): Cumulative probabilities.
+            size (int): Number of samples.
+        Returns:
+            np.ndarray: Sampled indices.
+        """
+        return np.minimum(np.searchsorted(cdf, self.rng.random(size)), len(cdf) - 1)
+
+    def sample(self, n_rows):
+        """
+        Sample purchase rows.
+        Args:
+            n_rows (int): Number of rows.
+        Returns:
+            pd.DataFrame: Rows with the Customer_Purchase_History schema.
+        """
+        users = self._sample(self.user_cdf, n_rows)
+        items = self._sample(self.item_cdf, n_rows)
+        affinity = np.einsum('ij,ij->i', self.user_factors[users], self.item_factors[items])
+        ratings = 3.0 + self.user_bias[users] + self.item_bias[items] + affinity + self.rng.normal(0, 0.7, n_rows)
+        return pd.DataFrame({
+            'User_ID': self.user_ids[users],
+            'Product_ID': self.item_ids[items],
+            'Purchase_Date': self.dates[self.rng.integers(len(self.dates), size=n_rows)],
+            'Price_Paid': np.round(self.item_price[items] * self.rng.uniform(0.8, 1.2, n_rows), 2),
+            'Rating': np.clip(np.rint(ratings), 1, 5).astype(np.int64),
+            'Purchase_Time': self.times[self.rng.integers(len(self.times), size=n_rows)],
+            'Location': LOCATIONS[self._sample(self.location_cdf, n_rows)],
+        })
+
+    def iter_chunks(self, n_rows, chunk_size=GENERATOR_CHUNK_SIZE):
+        """
+        Sample rows in chunks, so arbitrarily large histories never have to fit in memory.
+        Args:
+            n_rows (int): Total number of rows.
+            chunk_size (int): Rows per chunk.
+        Yields:
+            pd.DataFrame: Consecutive chunks of rows.
+        """
+        for start in range(0, n_rows, chunk_size):
+            yield self.sample(min(chunk_size, n_rows - start))
+
+
+def default_population(n_rows):
+    """
+    Pick user and item counts that keep the density of a real purchase log as the row count grows.
+    Args:
+        n_rows (int): Number of rows.
+    Returns:
+        tuple: (number of users, number of items).
+    """
+    return max(100, n_rows // 20), max(50, int(np.sqrt(n_rows) * 10))
+
+
+def generate_purchase_history(n_rows, n_users=None, n_items=None, seed=0, **kwargs):
+    """
+    Generate a synthetic purchase history in memory.
+    Args:
+        n_rows (int): Number of rows.
+        n_users (int): Number of distinct users; scaled with n_rows when not given.
+        n_items (int): Number of distinct items; scaled with n_rows when not given.
+        seed (int): Random seed.
+        **kwargs: Further PurchaseHistoryGenerator settings.
+    Returns:
+        pd.DataFrame: Synthetic purchase history.
+    """
+    default_users, default_items = default_population(n_rows)
+    generator = PurchaseHistoryGenerator(n_users or default_users, n_items or default_items, seed=seed, **kwargs)
+    return pd.concat(generator.iter_chunks(n_rows), ignore_index=True)
+
+
+def write_purchase_history(path, n_rows, n_users=None, n_items=None, seed=0, chunk_size=GENERATOR_CHUNK_SIZE,
+                           **kwargs):
+    """
+    Stream a synthetic purchase history to a Parquet or CSV file chunk by chunk.
+    Args:
+        path (str): Output path ending in .parquet or .csv.
+        n_rows (int): Number of rows.
+        n_users (int): Number of distinct users; scaled with n_rows when not given.
+        n_items (int): Number of distinct items; scaled with n_rows when not given.
+        seed (int): Random seed.
+        chunk_size (int): Rows generated and written at a time.
+        **kwargs: Further PurchaseHistoryGenerator settings.
+    """
+    default_users, default_items = default_population(n_rows)
+    generator = PurchaseHistoryGenerator(n_users or default_users, n_items or default_items, seed=seed, **kwargs)
+    logger.info(f"Writing {n_rows} synthetic rows to {path}...")
+    if path.endswith('.csv'):
+        for i, chunk in enumerate(generator.iter_chunks(n_rows, chunk_size)):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in generator.iter_chunks(n_rows, chunk_size):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
@@ -1,35 +1,264 @@
+import hashlib
+import json
 import os
+import uuid
 import pandas as pd
 import numpy as np
 import logging
 from config.config_settings import get_config
-from utils.logger import setup_logging
 
 # Initialize logger
-setup_logging()
 logger = logging.getLogger(__name__)
 
 # Configuration Handling
 CONFIG_PATH = 'config/development.yaml'
-config = get_config(CONFIG_PATH)
+# The `data` configuration section, read on first use by data_settings()
+_data_config = None
 
-# Cache to speed up data loading for large datasets
-CACHE_DIR = 'cache'
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+# Cache to speed up data loading for large datasets, unless configured otherwise
+DEFAULT_CACHE_DIR = 'cache'
+DEFAULT_CACHE_FORMAT = 'parquet'  # parquet or feather
 
-def load_data(file_path):
+# Bytes read at a time when hashing a source file
+HASH_CHUNK_SIZE = 1 << 20
+# Rows per chunk when streaming data that does not fit in memory
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def data_settings():
+    """
+    Get the data-loading settings, reading the configuration on first use rather than at import.
+    Returns:
+        dict: Cache directory and format and the streaming chunk size, with defaults filled in.
+    """
+    global _data_config
+    if _data_config is None:
+        data_config = get_config(CONFIG_PATH).get('data') or {}
+        _data_config = {
+            'cache_dir': data_config.get('cache_dir') or DEFAULT_CACHE_DIR,
+            'cache_format': data_config.get('cache_format') or DEFAULT_CACHE_FORMAT,
+            'chunk_size': data_config.get('chunk_size') or DEFAULT_CHUNK_SIZE,
+        }
+    return _data_config
+
+
+class RunningStats:
+    """
+    Streaming mean and standard deviation, merged chunk by chunk (Chan et al. parallel variance).
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        """
+        Fold a chunk of values into the running statistics; missing values are skipped.
+        Args:
+            values (array-like): Chunk of values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        count = self.count + len(values)
+        chunk_mean = values.mean()
+        delta = chunk_mean - self.mean
+        self._m2 += ((values - chunk_mean) ** 2).sum() + delta ** 2 * self.count * len(values) / count
+        self.mean += delta * len(values) / count
+        self.count = count
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, as pandas computes it)."""
+        return float(np.sqrt(self._m2 / (self.count - 1))) if self.count > 1 else float('nan')
+
+def file_hash(file_path):
+    """
+    Compute the SHA-256 of a file's contents.
+    Args:
+        file_path (str): Path to the file.
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def read_source(file_path, columns=None):
+    """
+    Parse a source file with the reader matching its extension.
+    Args:
+        file_path (str): Path to an Excel, CSV, Parquet or Feather file.
+        columns (list): Columns to read; None reads all of them.
+    Returns:
+        pd.DataFrame: Parsed data.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        return pd.read_csv(file_path, usecols=columns)
+    if extension == '.parquet':
+        return pd.read_parquet(file_path, columns=columns)
+    if extension == '.feather':
+        return pd.read_feather(file_path, columns=columns)
+    return pd.read_excel(file_path, usecols=columns)
+
+def cache_paths(file_path, cache_dir=None, cache_format=None):
+    """
+    Locate the columnar cache file and its metadata for a source file.
+    Args:
+        file_path (str): Path to the source file.
+        cache_dir (str): Cache directory; defaults to the configured one.
+        cache_format (str): 'parquet' or 'feather'; defaults to the configured one.
+    Returns:
+        tuple: (cache file path, metadata JSON path).
+    """
+    cache_dir = cache_dir or data_settings()['cache_dir']
+    cache_format = cache_format or data_settings()['cache_format']
+    source = os.path.abspath(file_path)
+    stem = f"{os.path.splitext(os.path.basename(source))[0]}-{hashlib.sha256(source.encode()).hexdigest()[:16]}"
+    return os.path.join(cache_dir, f"{stem}.{cache_format}"), os.path.join(cache_dir, f"{stem}.json")
+
+def cached_source(file_path, cache_dir=None, cache_format=None):
+    """
+    Return an up-to-date columnar copy of a source file, converting it on first use.
+    The cache is keyed by the source path and validated against its size and mtime; when only the mtime
+    changed, the content hash decides whether the cached copy is still valid.
+    Args:
+        file_path (str): Path to the source file.
+        cache_dir (str): Cache directory; defaults to the configured one.
+        cache_format (str): 'parquet' or 'feather'; defaults to the configured one.
+    Returns:
+        str: Path to the cached file.
+    """
+    cache_format = cache_format or data_settings()['cache_format']
+    cache_file, meta_file = cache_paths(file_path, cache_dir, cache_format)
+    stat = os.stat(file_path)
+    meta = None
+    if os.path.exists(cache_file) and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            return cache_file
+
+    content_hash = file_hash(file_path)
+    if meta is not None and meta['size'] == stat.st_size and meta['sha256'] == content_hash:
+        logger.info(f"Source {file_path} was touched but not changed, keeping its cache")
+    else:
+        logger.info(f"Converting {file_path} to a {cache_format} cache...")
+        data = read_source(file_path)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        staging = f"{cache_file}.tmp-{uuid.uuid4().hex}"
+        try:
+            if cache_format == 'feather':
+                data.to_feather(staging)
+            else:
+                data.to_parquet(staging, index=False)
+            os.replace(staging, cache_file)
+        except Exception:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    meta = {'source': os.path.abspath(file_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'sha256': content_hash, 'format': cache_format}
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return cache_file
+
+def iter_chunks(file_path, chunk_size=None, columns=None):
+    """
+    Read a source file as a stream of DataFrame chunks.
+    CSV files are parsed incrementally and Parquet files are read batch by batch; Excel files, which can
+    only be parsed whole, are converted once to the columnar cache and streamed from there.
+    Args:
+        file_path (str): Path to a CSV, Parquet, Feather or Excel file.
+        chunk_size (int): Rows per chunk; defaults to the configured chunk size.
+        columns (list): Columns to read; None reads all of them.
+    Yields:
+        pd.DataFrame: Consecutive chunks of the file.
+    """
+    chunk_size = chunk_size or data_settings()['chunk_size']
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        yield from pd.read_csv(file_path, usecols=columns, chunksize=chunk_size)
+        return
+
+    import pyarrow.ipc
+    import pyarrow.parquet
+    if extension not in ('.parquet', '.feather'):
+        file_path = cached_source(file_path)
+        extension = f".{data_settings()['cache_format']}"
+    if extension == '.parquet':
+        for batch in pyarrow.parquet.ParquetFile(file_path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        with pyarrow.ipc.open_file(file_path) as reader:
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunk_size):
+                    yield batch.slice(start, chunk_size).to_pandas()
+
+def compute_price_stats(file_path, chunk_size=None):
+    """
+    Compute the Price_Paid normalization statistics in one streaming pass.
+    Rows with a missing value in any column are skipped, as preprocess_data drops them before normalizing.
+    Args:
+        file_path (str): Path to the source file.
+        chunk_size (int): Rows per chunk; defaults to the configured chunk size.
+    Returns:
+        RunningStats: Mean and standard deviation of Price_Paid.
+    """
+    stats = RunningStats()
+    for chunk in iter_chunks(file_path, chunk_size):
+        stats.update(chunk.dropna()['Price_Paid'])
+    logger.info(f"Price_Paid statistics over {stats.count} rows: mean {stats.mean:.4f}, std {stats.std:.4f}")
+    return stats
+
+def stream_data(file_path, chunk_size=None, price_stats=None):
+    """
+    Stream preprocessed chunks of a source file that may not fit in memory.
+    Args:
+        file_path (str): Path to the source file.
+        chunk_size (int): Rows per chunk; defaults to the configured chunk size.
+        price_stats (RunningStats): Price_Paid statistics; computed in a first pass when not given.
+    Yields:
+        pd.DataFrame: Preprocessed chunks, normalized with the statistics of the whole file.
+    """
+    if price_stats is None:
+        price_stats = compute_price_stats(file_path, chunk_size)
+    for chunk in iter_chunks(file_path, chunk_size):
+        yield preprocess_data(chunk, price_stats)
+
+def load_data(file_path, columns=None, use_cache=True):
     """
     Load data from an Excel file.
+    The file is converted once into a Parquet/Feather cache in the configured cache directory, so later
+    loads skip the slow Excel parser and read only the requested columns.
     Args:
         file_path (str): Path to the Excel file.
+        columns (list): Columns to load; None loads all of them.
+        use_cache (bool): Whether to read through the columnar cache.
     Returns:
         pd.DataFrame: Loaded data as a DataFrame.
     """
     try:
         logger.info(f"Loading data from file: {file_path}")
-        data = pd.read_excel(file_path)
-        return data
+        extension = os.path.splitext(file_path)[1].lower()
+        if not use_cache or extension in ('.parquet', '.feather'):
+            return read_source(file_path, columns)
+        try:
+            cache_file = cached_source(file_path)
+        except ImportError as e:
+            logger.warning(f"Columnar cache unavailable ({e}), reading {file_path} directly")
+            return read_source(file_path, columns)
+        if data_settings()['cache_format'] == 'feather':
+            return pd.read_feather(cache_file, columns=columns)
+        return pd.read_parquet(cache_file, columns=columns)
     except Exception as e:
         logger.error(f"Error loading data from {file_path}: {e}")
         raise
@@ -49,11 +278,13 @@ def validate_data(data, schema):
             return False
     return True
 
-def preprocess_data(data):
+def preprocess_data(data, price_stats=None):
     """
     Preprocess the loaded data.
     Args:
         data (pd.DataFrame): Data to preprocess.
+        price_stats (RunningStats): Price_Paid statistics of the full dataset, for normalizing a chunk;
+            None uses the statistics of data itself.
     Returns:
         pd.DataFrame: Preprocessed data.
     """
@@ -62,7 +293,10 @@ def preprocess_data(data):
         # Data cleaning
         data = data.dropna()  # Drop missing values
         # Normalize price
-        data['Price_Paid'] = (data['Price_Paid'] - data['Price_Paid'].mean()) / data['Price_Paid'].std()
+        if price_stats is None:
+            data['Price_Paid'] = (data['Price_Paid'] - data['Price_Paid'].mean()) / data['Price_Paid'].std()
+        else:
+            data['Price_Paid'] = (data['Price_Paid'] - price_stats.mean) / price_stats.std
         # Feature extraction
         logger.info("Data preprocessing completed successfully.")
         return data
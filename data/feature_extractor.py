@@ -1,10 +1,109 @@
+import json
+import os
 import pandas as pd
 import numpy as np
 import logging
+from utils.time_parsing import parse_hours
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Code of locations not seen when the encoders were fitted
+UNKNOWN_CODE = 0
+# Encoders fitted by model training, reused wherever features are extracted for the trained model
+ENCODERS_PATH = 'models/feature_encoders.json'
+
+class FeatureEncoders:
+    """
+    Categorical encoders fitted once on training data and reused to encode evaluation and tuning data.
+    Locations are numbered from 1 in order of first appearance, so codes stay stable as new locations
+    are added; unseen locations encode to UNKNOWN_CODE.
+    """
+    def __init__(self, locations=()):
+        self.locations = []
+        self._location_codes = {}
+        self.update(locations)
+
+    @classmethod
+    def fit(cls, data):
+        """
+        Fit the encoders on a DataFrame.
+        Args:
+            data (pd.DataFrame): Data with 'Location'.
+        Returns:
+            FeatureEncoders: Fitted encoders.
+        """
+        return cls(data['Location'].dropna().unique())
+
+    def update(self, locations):
+        """
+        Register locations that are not encoded yet.
+        Args:
+            locations (array-like): Location names.
+        """
+        for location in pd.unique(pd.Series(locations).dropna()):
+            if location not in self._location_codes:
+                self.locations.append(location)
+                self._location_codes[location] = len(self.locations)
+
+    def encode_locations(self, locations):
+        """
+        Encode many locations with a vectorized hash lookup.
+        Args:
+            locations (array-like): Location names.
+        Returns:
+            np.ndarray: Location codes, UNKNOWN_CODE for unseen or missing locations.
+        """
+        return pd.Index(self.locations).get_indexer(pd.Index(locations)).astype(np.int64) + 1
+
+    def location_matrix(self, codes):
+        """
+        One-hot encode location codes as a sparse matrix; column 0 holds unknown locations.
+        Args:
+            codes (np.ndarray): Location codes.
+        Returns:
+            scipy.sparse.csr_matrix: One row per code and one column per location.
+        """
+        from scipy import sparse
+        codes = np.asarray(codes, dtype=np.int64)
+        return sparse.csr_matrix((np.ones(len(codes), dtype=np.float32), (np.arange(len(codes)), codes)),
+                                 shape=(len(codes), len(self.locations) + 1))
+
+    def save(self, path):
+        """
+        Save the encoders as JSON.
+        Args:
+            path (str): Output file path.
+        """
+        with open(path, 'w') as f:
+            json.dump({'locations': self.locations}, f, indent=2)
+        logger.info(f"Feature encoders saved to {path}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load encoders saved with save().
+        Args:
+            path (str): Encoder file path.
+        Returns:
+            FeatureEncoders: Loaded encoders.
+        """
+        with open(path) as f:
+            return cls(json.load(f)['locations'])
+
+def load_encoders(path=ENCODERS_PATH):
+    """
+    Load the encoders saved by model training, so other data is encoded with the training codes.
+    Args:
+        path (str): Encoder file path.
+    Returns:
+        FeatureEncoders: Loaded encoders, or None when training has not saved any.
+    """
+    if not os.path.exists(path):
+        logger.warning(f"No feature encoders at {path}, fitting new ones on the data")
+        return None
+    return FeatureEncoders.load(path)
+
 def extract_temporal_features(data):
     """
     Extract temporal features from purchase date and time.
@@ -18,11 +117,12 @@ def extract_temporal_features(data):
         logger.info(f"Before extraction, data columns: {data.columns}")
         # Convert 'Purchase_Date' to datetime
         data['Purchase_Date'] = pd.to_datetime(data['Purchase_Date'])
-        data['Year'] = data['Purchase_Date'].dt.year
-        data['Month'] = data['Purchase_Date'].dt.month
-        data['Day'] = data['Purchase_Date'].dt.day
-        data['DayOfWeek'] = data['Purchase_Date'].dt.dayofweek
-        data['Hour'] = data['Purchase_Time'].apply(lambda x: int(x.split(':')[0]))
+        dates = data['Purchase_Date'].dt
+        data['Year'] = dates.year
+        data['Month'] = dates.month
+        data['Day'] = dates.day
+        data['DayOfWeek'] = dates.dayofweek
+        data['Hour'] = parse_hours(data['Purchase_Time'])
         logger.info("Temporal features extracted successfully.")
         logger.info(f"After extraction, data columns: {data.columns}")
         return data
@@ -30,41 +130,56 @@ def extract_temporal_features(data):
         logger.error(f"Error extracting temporal features: {e}")
         raise
 
-def extract_location_features(data):
+def extract_location_features(data, encoders):
     """
     Extract location-based features.
     Args:
         data (pd.DataFrame): Raw data with 'Location'.
+        encoders (FeatureEncoders): Fitted encoders.
     Returns:
-        pd.DataFrame: Data with location features.
+        pd.DataFrame: Data with the 'Location_Code' feature; encoders.location_matrix expands it to one-hot.
     """
     try:
         logger.info("Extracting location features...")
-        # Example: One-hot encode 'Location'
-        location_dummies = pd.get_dummies(data['Location'], prefix='Loc')
-        data = pd.concat([data, location_dummies], axis=1)
+        data['Location_Code'] = encoders.encode_locations(data['Location'])
         logger.info("Location features extracted successfully.")
         return data
     except Exception as e:
         logger.error(f"Error extracting location features: {e}")
         raise
 
-def extract_features(data):
+def extract_features(data, encoders=None):
     """
     Extract all relevant features from raw data.
+    Columns are added to data in place rather than concatenated into a copy.
     Args:
         data (pd.DataFrame): Raw data.
+        encoders (FeatureEncoders): Fitted encoders; fitted on data when not given.
     Returns:
         pd.DataFrame: Data with extracted features.
     """
     try:
         logger.info("Starting feature extraction...")
+        if encoders is None:
+            encoders = FeatureEncoders.fit(data)
         data = extract_temporal_features(data)
-        data = extract_location_features(data)
+        data = extract_location_features(data, encoders)
         # Drop original columns if no longer needed
         data.drop(columns=['Purchase_Time', 'Location'], inplace=True)
         logger.info("Feature extraction completed successfully.")
         return data
     except Exception as e:
         logger.error(f"Error during feature extraction: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def extract_features_stream(chunks, encoders):
+    """
+    Extract features from a stream of data chunks, one chunk at a time.
+    Args:
+        chunks (iterable): Raw or preprocessed DataFrame chunks.
+        encoders (FeatureEncoders): Encoders fitted on the whole stream, so codes agree across chunks.
+    Yields:
+        pd.DataFrame: Chunks with extracted features.
+    """
+    for chunk in chunks:
+        yield extract_features(chunk, encoders)
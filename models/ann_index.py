@@ -0,0 +1,100 @@
+import logging
+import numpy as np
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) index for approximate maximum inner product search over item vectors.
+
+    Items are clustered with k-means into n_lists lists. A query scores the list centroids, probes the
+    n_probe best lists and returns their items as candidates, which the caller then scores exactly.
+    Search cost is O(n_lists + items in the probed lists) instead of O(catalog size).
+    """
+    def __init__(self, n_lists=None, n_probe=8, n_iter=10, sample_per_list=256, seed=0):
+        """
+        Args:
+            n_lists (int): Number of clusters; defaults to sqrt(number of items).
+            n_probe (int): Number of lists scanned per query.
+            n_iter (int): k-means iterations.
+            sample_per_list (int): Training sample size per list used to fit the centroids.
+            seed (int): Random seed for sampling and centroid initialization.
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.sample_per_list = sample_per_list
+        self.seed = seed
+        self.centroids = None
+        self.list_offsets = None
+        self.list_rows = None
+
+    def build(self, vectors, rows, chunk_size=65536):
+        """
+        Cluster the item vectors and build the inverted lists.
+        Args:
+            vectors (np.ndarray): Item vectors, one per row in rows.
+            rows (np.ndarray): Parameter row of each vector.
+            chunk_size (int): Number of vectors assigned to clusters per vectorized chunk.
+        Returns:
+            IVFIndex: The built index.
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+        rng = np.random.default_rng(self.seed)
+
+        # Fit the centroids on a sample of the catalog
+        sample_size = min(len(vectors), n_lists * self.sample_per_list)
+        sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = self._assign(sample, centroids, chunk_size)
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        # Assign every item and store the lists contiguously
+        assignment = self._assign(vectors, centroids, chunk_size)
+        order = np.argsort(assignment, kind='stable')
+        self.centroids = centroids
+        self.list_rows = np.asarray(rows)[order]
+        self.list_offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+        logger.info(f"Built IVF index over {len(vectors)} items with {n_lists} lists")
+        return self
+
+    @staticmethod
+    def _assign(vectors, centroids, chunk_size):
+        """
+        Assign vectors to their nearest centroid (squared L2 distance).
+        Args:
+            vectors (np.ndarray): Vectors to assign.
+            centroids (np.ndarray): Cluster centroids.
+            chunk_size (int): Number of vectors per vectorized chunk.
+        Returns:
+            np.ndarray: Centroid index of each vector.
+        """
+        centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            assignment[start:start + chunk_size] = np.argmin(centroid_norms - 2 * chunk @ centroids.T, axis=1)
+        return assignment
+
+    def candidates(self, query, n_probe=None):
+        """
+        Find candidate rows for a query by probing the lists with the highest centroid inner product.
+        Args:
+            query (np.ndarray): Query vector.
+            n_probe (int): Number of lists to scan; defaults to the index setting.
+        Returns:
+            np.ndarray: Parameter rows of the candidate items.
+        """
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        scores = self.centroids @ query
+        probed = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        return np.concatenate([self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed])
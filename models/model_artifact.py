@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+from models.time_aware_factor_model import TimeAwareFactorModel, IdIndex
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Bump when the artifact layout changes incompatibly
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+# Scalar model attributes stored in the manifest next to the hyperparameters
+MANIFEST_ATTRIBUTES = ('version', 'global_mean', 'day_min', 'n_days', 'bin_width', 'item_quantization')
+# ID indexes stored as sorted ID arrays plus the parameter row of each ID
+ID_INDEXES = ('user_index', 'item_index')
+
+
+def is_artifact(path):
+    """
+    Check whether a path holds a directory-based model artifact.
+    Args:
+        path (str): Model path.
+    Returns:
+        bool: True if the path is an artifact directory.
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def save_artifact(model, path):
+    """
+    Save a trained model as a directory of .npy arrays and a JSON manifest.
+    The directory is written next to the target and renamed into place, so readers never see a
+    partially written artifact.
+    Args:
+        model (TimeAwareFactorModel): Trained model.
+        path (str): Artifact directory to create or replace.
+    """
+    path = os.path.normpath(path)
+    staging = f"{path}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        arrays = {}
+        for name in model.state_arrays():
+            arrays[name] = np.ascontiguousarray(getattr(model, name))
+        for name in ID_INDEXES:
+            sorted_ids, sorted_rows = getattr(model, name).sorted_arrays()
+            arrays[f'{name}_ids'] = np.asarray(sorted_ids, dtype=str)
+            arrays[f'{name}_rows'] = np.asarray(sorted_rows, dtype=np.int64)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f'{name}.npy'), array, allow_pickle=False)
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'model_class': type(model).__name__,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'hyperparameters': model.get_params(),
+            'arrays': {name: {'dtype': array.dtype.str, 'shape': list(array.shape)} for name, array in arrays.items()},
+        }
+        for name in MANIFEST_ATTRIBUTES:
+            value = getattr(model, name)
+            manifest[name] = value.item() if isinstance(value, np.generic) else value
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap the finished directory into place
+        previous = None
+        if os.path.exists(path):
+            previous = f"{path}.old-{uuid.uuid4().hex}"
+            os.rename(path, previous)
+        os.rename(staging, path)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_artifact(path, mmap_mode='r'):
+    """
+    Load a model artifact, memory-mapping its arrays.
+    With mmap_mode='r' the arrays are read-only views onto the files, so loading is near-instant and
+    every process serving the same artifact shares its pages through the OS page cache.
+    Args:
+        path (str): Artifact directory.
+        mmap_mode (str or None): np.load mmap mode; None reads the arrays fully into memory.
+    Returns:
+        TimeAwareFactorModel: Loaded model.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format {manifest.get('format_version')} in {path}")
+
+    def load_array(name):
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+
+    model = TimeAwareFactorModel(**manifest['hyperparameters'])
+    for name in MANIFEST_ATTRIBUTES:
+        setattr(model, name, manifest.get(name))
+    for name in model.state_arrays():
+        setattr(model, name, load_array(name))
+    for name in ID_INDEXES:
+        setattr(model, name, IdIndex.from_sorted(load_array(f'{name}_ids'), load_array(f'{name}_rows')))
+    return model
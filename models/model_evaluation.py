@@ -1,22 +1,59 @@
 import logging
 import pickle
-from sklearn.metrics import mean_squared_error, mean_absolute_error
+import numpy as np
+from models.model_artifact import is_artifact, load_artifact
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Storage precisions compared by compare_precisions: (parameter dtype, item factor quantization)
+PRECISIONS = {
+    'float64': ('float64', None),
+    'float32': ('float32', None),
+    'int8': ('float32', 'int8'),
+}
+
+def rmse(y_true, y_pred):
+    """
+    Root mean squared error.
+    Args:
+        y_true (array-like): Observed ratings.
+        y_pred (array-like): Predicted ratings.
+    Returns:
+        float: RMSE.
+    """
+    errors = np.asarray(y_true, dtype=np.float64) - np.asarray(y_pred, dtype=np.float64)
+    return float(np.sqrt(np.dot(errors, errors) / len(errors)))
+
+
+def mae(y_true, y_pred):
+    """
+    Mean absolute error.
+    Args:
+        y_true (array-like): Observed ratings.
+        y_pred (array-like): Predicted ratings.
+    Returns:
+        float: MAE.
+    """
+    return float(np.mean(np.abs(np.asarray(y_true, dtype=np.float64) - np.asarray(y_pred, dtype=np.float64))))
+
+
 def load_model(model_path):
 
     """
     Load the trained model from disk.
+    Artifact directories are memory-mapped; legacy .pkl files are unpickled.
     Args:
         model_path (str): Path to the saved model.
     Returns:
         model: Loaded model.
     """
     try:
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
+        if is_artifact(model_path):
+            model = load_artifact(model_path)
+        else:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
         logger.info(f"Model loaded from {model_path}")
         return model
     except Exception as e:
@@ -38,15 +75,13 @@ def evaluate_model(model, data):
 
         # Prepare data for evaluation
         y_true = data['Rating']
-        y_pred = data.apply(lambda row: model.predict(row['User_ID'], row['Product_ID'], row['Purchase_Date']), axis=1)
+        y_pred = model.predict_batch(data['User_ID'].to_numpy(), data['Product_ID'].to_numpy(),
+                                     data['Purchase_Date'].to_numpy())
 
         # Calculate evaluation metrics
-        rmse = mean_squared_error(y_true, y_pred, squared=False)
-        mae = mean_absolute_error(y_true, y_pred)
-
         metrics = {
-            'RMSE': rmse,
-            'MAE': mae
+            'RMSE': rmse(y_true, y_pred),
+            'MAE': mae(y_true, y_pred)
         }
 
         logger.info("Model evaluation completed successfully.")
@@ -56,11 +91,66 @@ def evaluate_model(model, data):
         raise
 
 
+def parameter_bytes(model):
+    """
+    Measure the memory held by a model's serving arrays.
+    Args:
+        model: Trained model.
+    Returns:
+        int: Total bytes of the parameter arrays.
+    """
+    return int(sum(np.asarray(getattr(model, name)).nbytes for name in model.state_arrays()))
+
+
+def compare_precisions(model, data, precisions=tuple(PRECISIONS)):
+    """
+    Evaluate a trained model at several storage precisions to weigh memory against accuracy.
+    Each precision is a converted copy of the model; RMSE and MAE changes are relative to the float64 copy.
+    Args:
+        model: Trained model.
+        data (pd.DataFrame): Test data for evaluation.
+        precisions (tuple): Keys of PRECISIONS to compare.
+    Returns:
+        dict: Precision -> RMSE, MAE, their changes against float64, parameter bytes and item factor bytes.
+    """
+    reference = model.astype('float64')
+    y_true = data['Rating']
+    users, items = reference.encode_ids(data['User_ID'].to_numpy(), data['Product_ID'].to_numpy())
+    dates = data['Purchase_Date'].to_numpy()
+    reference_pred = reference.predict_batch_rows(users, items, dates)
+    reference_rmse, reference_mae = rmse(y_true, reference_pred), mae(y_true, reference_pred)
+
+    results = {}
+    for precision in precisions:
+        dtype, quantization = PRECISIONS[precision]
+        variant = reference.astype(dtype)
+        if quantization is not None:
+            variant = variant.quantize_items(quantization)
+        y_pred = variant.predict_batch_rows(users, items, dates)
+        item_arrays = variant.QUANTIZED_ITEM_ARRAYS if quantization is not None else ('item_factors',)
+        results[precision] = {
+            'RMSE': rmse(y_true, y_pred),
+            'MAE': mae(y_true, y_pred),
+            'RMSE_change': rmse(y_true, y_pred) - reference_rmse,
+            'MAE_change': mae(y_true, y_pred) - reference_mae,
+            'max_prediction_change': float(np.max(np.abs(y_pred - reference_pred))) if len(y_pred) else 0.0,
+            'parameter_bytes': parameter_bytes(variant),
+            'item_factor_bytes': int(sum(getattr(variant, name).nbytes for name in item_arrays)),
+        }
+        logger.info(f"{precision}: RMSE {results[precision]['RMSE']:.6f} "
+                    f"({results[precision]['RMSE_change']:+.2e}), parameters "
+                    f"{results[precision]['parameter_bytes'] / 2**20:.1f} MiB")
+    return results
+
+
 if __name__ == '__main__':
 
     from data.data_loader import load_data
-    from data.feature_extractor import extract_features
+    from data.feature_extractor import extract_features, load_encoders
     from config.config_settings import get_config
+    from utils.logger import setup_logging
+
+    setup_logging()
 
     # Load configuration
     CONFIG_PATH = 'config/development.yaml'
@@ -69,11 +159,15 @@ if __name__ == '__main__':
     # Load and preprocess data
     file_path = 'data/Customer_Purchase_History.xlsx'
     raw_data = load_data(file_path)
-    preprocessed_data = extract_features(raw_data)
+    preprocessed_data = extract_features(raw_data, load_encoders())
 
-    model_path = 'models/trained_model.pkl'
+    model_path = 'models/trained_model'
     loaded_model = load_model(model_path)
 
     # Evaluate model
     metrics = evaluate_model(loaded_model, preprocessed_data)
-    print(metrics)
\ No newline at end of file
+    print(metrics)
+
+    # Accuracy cost of reduced-precision and quantized storage
+    for precision, result in compare_precisions(loaded_model, preprocessed_data).items():
+        print(precision, result)
\ No newline at end of file
@@ -1,17 +1,49 @@
 import logging
 import pickle
 from models.time_aware_factor_model import TimeAwareFactorModel
+from models.parallel_training import fit_parallel, resolve_workers
+from models.model_artifact import save_artifact
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 
-def train_model(data, config):
+def build_model(config):
+    """
+    Initialize an untrained Time-Aware Factor Model from configuration settings.
+    Args:
+        config (dict): Configuration settings for model training.
+    Returns:
+        TimeAwareFactorModel: Untrained model.
+    """
+    return TimeAwareFactorModel(
+        n_factors=config['n_factors'],
+        lr=config['lr'],
+        reg=config['reg'],
+        n_epochs=config['n_epochs'],
+        engine=config.get('engine', 'sgd'),
+        batch_size=config.get('batch_size', 1024),
+        n_bins=config.get('n_bins', 30),
+        beta=config.get('beta', 0.4),
+        drift_lr=config.get('drift_lr'),
+        user_day_bias=config.get('user_day_bias', False),
+        lr_schedule=config.get('lr_schedule', 'constant'),
+        lr_decay=config.get('lr_decay', 0.95),
+        lr_step=config.get('lr_step', 10),
+        dtype=config.get('dtype', 'float64')
+    )
+
+
+def train_model(data, config, validation=None):
     """
     Train the Time-Aware Factor Model using the preprocessed data.
+    With validation data, early stopping picks the number of epochs, and unless config['refit'] is false the
+    model is then retrained from scratch on the training and validation rows together for that many epochs,
+    so the returned model has seen the most recent purchases.
     Args:
         data (pd.DataFrame): Preprocessed data for training.
         config (dict): Configuration settings for model training.
+        validation (pd.DataFrame): Preprocessed held-out data for early stopping, or None.
     Returns:
         model: Trained model.
     """
@@ -20,15 +52,29 @@ def train_model(data, config):
         logger.info(f"Training data columns: {data.columns}")
 
         # Initialize the timeSVD++ model
-        model = TimeAwareFactorModel(
-            n_factors=config['n_factors'],
-            lr=config['lr'],
-            reg=config['reg'],
-            n_epochs=config['n_epochs']
-        )
+        model = build_model(config)
+
+        # Train the model, in parallel when more than one worker is configured
+        n_workers = resolve_workers(config.get('n_workers', 1))
+        if n_workers > 1:
+            if validation is not None or config.get('checkpoint_dir'):
+                logger.warning("Early stopping and checkpoints are only supported by single-worker training")
+            fit_parallel(model, data, n_workers)
+        else:
+            model.fit(
+                data,
+                validation=validation,
+                patience=config.get('patience'),
+                min_delta=config.get('min_delta', 0.0),
+                checkpoint_dir=config.get('checkpoint_dir'),
+                checkpoint_every=config.get('checkpoint_every', 1),
+                resume=config.get('resume', False)
+            )
+            if validation is not None and model.best_epoch and config.get('refit', True):
+                model = refit_all(data, validation, config, model.best_epoch)
 
-        # Train the model
-        model.fit(data)
+        if config.get('item_quantization'):
+            model = model.quantize_items(config['item_quantization'])
 
         logger.info("Model training completed successfully.")
         return model
@@ -37,16 +83,94 @@ def train_model(data, config):
         raise
 
 
+def refit_all(data, validation, config, n_epochs):
+    """
+    Retrain a model from scratch on the training and validation rows together.
+    Args:
+        data (pd.DataFrame): Preprocessed training data.
+        validation (pd.DataFrame): Preprocessed validation data.
+        config (dict): Configuration settings for model training.
+        n_epochs (int): Number of epochs, usually the best epoch found by early stopping.
+    Returns:
+        model: Model trained on every row.
+    """
+    import pandas as pd
+
+    logger.info(f"Refitting on all {len(data) + len(validation)} rows for {n_epochs} epochs...")
+    model = build_model(dict(config, n_epochs=n_epochs))
+    model.fit(pd.concat([data, validation], ignore_index=True))
+    return model
+
+
+def train_model_stream(file_path, config, chunk_size=None):
+    """
+    Train the Time-Aware Factor Model out of core, streaming the data file in chunks every epoch.
+    Args:
+        file_path (str): Path to a CSV, Parquet or Excel purchase history.
+        config (dict): Configuration settings for model training.
+        chunk_size (int): Rows per chunk; defaults to the data loader's chunk size.
+    Returns:
+        model: Trained model.
+    """
+    from data.data_loader import compute_price_stats, data_settings, iter_chunks, stream_data
+    from data.feature_extractor import FeatureEncoders, extract_features_stream
+
+    try:
+        logger.info(f"Starting streaming model training on {file_path}...")
+        chunk_size = chunk_size or data_settings()['chunk_size']
+        price_stats = compute_price_stats(file_path, chunk_size)
+        encoders = FeatureEncoders()
+        for chunk in iter_chunks(file_path, chunk_size, columns=['Location']):
+            encoders.update(chunk['Location'])
+
+        model = build_model(config)
+        model.fit_stream(lambda: extract_features_stream(stream_data(file_path, chunk_size, price_stats), encoders))
+        if config.get('item_quantization'):
+            model = model.quantize_items(config['item_quantization'])
+
+        logger.info("Model training completed successfully.")
+        return model
+    except Exception as e:
+        logger.error(f"Error during streaming model training: {e}")
+        raise
+
+
+def update_model(model, new_data, config, replay=None):
+    """
+    Incrementally update a trained model with new purchases instead of retraining from scratch.
+    Args:
+        model: Trained model, e.g. as loaded from the serving artifact.
+        new_data (pd.DataFrame): Preprocessed new interactions.
+        config (dict): Configuration settings for model training.
+        replay (pd.DataFrame): Older preprocessed interactions sampled alongside the new ones.
+    Returns:
+        model: Updated model.
+    """
+    try:
+        logger.info(f"Updating the model with {len(new_data)} new interactions...")
+        model.partial_fit(new_data, n_epochs=config.get('update_epochs', 3), replay=replay,
+                          replay_size=config.get('replay_size'))
+        logger.info("Model update completed successfully.")
+        return model
+    except Exception as e:
+        logger.error(f"Error during model update: {e}")
+        raise
+
+
 def save_model(model, model_path):
     """
     Save the trained model to disk.
+    Paths ending in .pkl are pickled; any other path is written as a memory-mappable artifact directory.
     Args:
         model: Trained model.
         model_path (str): Path to save the model.
     """
     try:
-        with open(model_path, 'wb') as f:
-            pickle.dump(model, f)
+        if model_path.endswith('.pkl'):
+            with open(model_path, 'wb') as f:
+                pickle.dump(model, f)
+        else:
+            save_artifact(model, model_path)
         logger.info(f"Model saved to {model_path}")
     except Exception as e:
         logger.error(f"Error saving the model: {e}")
@@ -55,21 +179,37 @@ def save_model(model, model_path):
 
 if __name__ == '__main__':
     from data.data_loader import load_data
-    from data.feature_extractor import extract_features
+    from data.feature_extractor import ENCODERS_PATH, FeatureEncoders, extract_features
     from config.config_settings import get_config
+    from utils.logger import setup_logging
+
+    setup_logging()
 
     # Load configuration
     CONFIG_PATH = 'config/development.yaml'
     config = get_config(CONFIG_PATH)
 
-    # Load and preprocess data
+    # Load and preprocess data, fitting the feature encoders reused by evaluation and tuning
     file_path = 'data/Customer_Purchase_History.xlsx'
     raw_data = load_data(file_path)
-    preprocessed_data = extract_features(raw_data)
+    encoders = FeatureEncoders.fit(raw_data)
+    encoders.save(ENCODERS_PATH)
+    preprocessed_data = extract_features(raw_data, encoders)
+
+    # Hold out the most recent purchases for early stopping
+    validation = None
+    validation_fraction = config['model_training'].get('validation_fraction')
+    if validation_fraction:
+        from models.model_tuning import chronological_splits
+        from models.time_aware_factor_model import to_days
+        preprocessed_data = preprocessed_data.sort_values('Purchase_Date', kind='stable')
+        (cut, _), = chronological_splits(to_days(preprocessed_data['Purchase_Date'].to_numpy()), 1,
+                                         validation_fraction)
+        preprocessed_data, validation = preprocessed_data.iloc[:cut], preprocessed_data.iloc[cut:]
 
     # Train model
-    model = train_model(preprocessed_data, config['model_training'])
+    model = train_model(preprocessed_data, config['model_training'], validation)
 
     # Save model
-    model_path = 'models/trained_model.pkl'
+    model_path = 'models/trained_model'
     save_model(model, model_path)
\ No newline at end of file
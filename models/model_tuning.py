@@ -0,0 +1,303 @@
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+import numpy as np
+from models.time_aware_factor_model import UNKNOWN_ROW, IdIndex, to_days
+from models.parallel_training import attach_array, resolve_workers, share_array
+from models.model_evaluation import rmse, mae
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Hyperparameters searched by default, from the model_training configuration
+TUNED_PARAMS = ('n_factors', 'lr', 'reg', 'n_epochs')
+LEADERBOARD_FIELDS = ('rank', 'trial', 'val_rmse', 'val_rmse_std', 'val_mae', 'train_rmse', 'seconds')
+
+# Per-process state of pool workers, populated by _init_worker
+_worker = {}
+
+
+def encode_dataset(data):
+    """
+    Encode a ratings frame once into date-ordered arrays shared by every trial.
+    Args:
+        data (pd.DataFrame): Data containing User_ID, Product_ID, Rating, and Purchase_Date.
+    Returns:
+        dict: users, items, days and ratings arrays sorted by day, plus n_users and n_items (including UNKNOWN_ROW).
+    """
+    user_index = IdIndex(data['User_ID'].unique())
+    item_index = IdIndex(data['Product_ID'].unique())
+    days = to_days(data['Purchase_Date'].to_numpy())
+    order = np.argsort(days, kind='stable')
+    return {
+        'users': user_index.encode(data['User_ID'].to_numpy())[order],
+        'items': item_index.encode(data['Product_ID'].to_numpy())[order],
+        'days': days[order],
+        'ratings': data['Rating'].to_numpy(dtype=np.float64)[order],
+        'n_users': len(user_index) + 1,
+        'n_items': len(item_index) + 1,
+    }
+
+
+def chronological_splits(days, n_splits=3, val_fraction=0.2):
+    """
+    Split date-ordered rows into expanding-window train/validation folds.
+    The last val_fraction of the rows is cut into n_splits consecutive validation windows; fold k trains on
+    every row before window k and validates on window k, so no fold ever trains on the future. Cuts fall on day
+    boundaries, so a day is never split between train and validation.
+    Args:
+        days (np.ndarray): Day numbers in ascending order.
+        n_splits (int): Number of folds.
+        val_fraction (float): Fraction of the rows used for validation across all folds.
+    Returns:
+        list: (train_stop, val_stop) row offsets per fold; fold k trains on [0, train_stop) and validates on
+            [train_stop, val_stop).
+    """
+    n = len(days)
+    targets = n - np.round(n * val_fraction * (1 - np.arange(n_splits + 1) / n_splits)).astype(np.int64)
+    # Move every cut to the first row of its day
+    cuts = np.searchsorted(days, days[np.minimum(targets, n - 1)], side='left')
+    cuts[-1] = n
+    folds = [(int(start), int(stop)) for start, stop in zip(cuts[:-1], cuts[1:]) if 0 < start < stop]
+    if not folds:
+        raise ValueError("Not enough distinct dates for a chronological validation split")
+    return folds
+
+
+def grid_search_space(space):
+    """
+    Enumerate every combination of a hyperparameter grid.
+    Args:
+        space (dict): Hyperparameter name -> list of candidate values.
+    Returns:
+        list: Hyperparameter dicts.
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search_space(space, n_trials, seed=0):
+    """
+    Sample distinct combinations of a hyperparameter grid at random.
+    Args:
+        space (dict): Hyperparameter name -> list of candidate values.
+        n_trials (int): Number of combinations to sample (capped at the grid size).
+        seed (int): Random seed.
+    Returns:
+        list: Hyperparameter dicts.
+    """
+    grid = grid_search_space(space)
+    picks = np.random.default_rng(seed).choice(len(grid), size=min(n_trials, len(grid)), replace=False)
+    return [grid[i] for i in picks]
+
+
+def _init_worker(arrays, n_users, n_items, folds):
+    """
+    Pool initializer: attach the shared encoded dataset once per worker process.
+    Args:
+        arrays (dict): Shared arrays as {name: (buffer, dtype, shape)}.
+        n_users (int): Number of user rows including UNKNOWN_ROW.
+        n_items (int): Number of item rows including UNKNOWN_ROW.
+        folds (list): (train_stop, val_stop) row offsets per fold.
+    """
+    np.random.seed()
+    _worker['dataset'] = {name: attach_array(*spec) for name, spec in arrays.items()}
+    _worker['dataset'].update(n_users=n_users, n_items=n_items)
+    _worker['folds'] = folds
+
+
+def evaluate_fold(dataset, params, train_stop, val_stop):
+    """
+    Train one model on the rows before a fold's validation window and score it on the window.
+    Args:
+        dataset (dict): Encoded dataset from encode_dataset.
+        params (dict): Model hyperparameters.
+        train_stop (int): First validation row.
+        val_stop (int): End of the validation window.
+    Returns:
+        dict: Validation RMSE and MAE and the final training RMSE.
+    """
+    from models.model_training import build_model
+
+    train = slice(0, train_stop)
+    val = slice(train_stop, val_stop)
+    model = build_model(params)
+    model.fit_encoded(dataset['users'][train], dataset['items'][train], dataset['days'][train],
+                      dataset['ratings'][train], dataset['n_users'], dataset['n_items'])
+
+    # Users and items first seen in the validation window are unknown to the fold's model
+    seen_users = np.bincount(dataset['users'][train], minlength=dataset['n_users']) > 0
+    seen_items = np.bincount(dataset['items'][train], minlength=dataset['n_items']) > 0
+    users = np.where(seen_users[dataset['users'][val]], dataset['users'][val], UNKNOWN_ROW)
+    items = np.where(seen_items[dataset['items'][val]], dataset['items'][val], UNKNOWN_ROW)
+    y_pred = model.predict_encoded(users, items, dataset['days'][val])
+    y_true = dataset['ratings'][val]
+    return {'val_rmse': rmse(y_true, y_pred), 'val_mae': mae(y_true, y_pred),
+            'train_rmse': model.history[-1]['train_rmse'] if model.history else float('nan')}
+
+
+def _run_trial(task):
+    """
+    Evaluate one (trial, fold) pair on the worker's dataset.
+    Args:
+        task (tuple): (trial number, model hyperparameters, fold number).
+    Returns:
+        tuple: (trial, fold, fold metrics, seconds).
+    """
+    trial, params, fold = task
+    start = time.perf_counter()
+    train_stop, val_stop = _worker['folds'][fold]
+    scores = evaluate_fold(_worker['dataset'], params, train_stop, val_stop)
+    return trial, fold, scores, time.perf_counter() - start
+
+
+def tune_model(data, config, search_space, search='grid', n_trials=20, n_splits=3, val_fraction=0.2,
+               n_workers=0, seed=0):
+    """
+    Search hyperparameters with chronological cross-validation.
+    The data is encoded and split once; every (trial, fold) pair is an independent task on a process pool whose
+    workers attach to the encoded arrays in shared memory, so only the hyperparameters are sent per task.
+    Args:
+        data (pd.DataFrame): Preprocessed data containing User_ID, Product_ID, Rating, and Purchase_Date.
+        config (dict): model_training configuration; the base every trial's hyperparameters override.
+        search_space (dict): Hyperparameter name -> list of candidate values.
+        search (str): 'grid' for every combination, 'random' for n_trials sampled ones.
+        n_trials (int): Number of random-search trials.
+        n_splits (int): Number of chronological folds.
+        val_fraction (float): Fraction of the rows used for validation across all folds.
+        n_workers (int): Worker processes; 0 uses every CPU core, 1 runs in-process.
+        seed (int): Random seed for sampling trials.
+    Returns:
+        list: Leaderboard rows, best (lowest mean validation RMSE) first.
+    """
+    if search == 'grid':
+        candidates = grid_search_space(search_space)
+    elif search == 'random':
+        candidates = random_search_space(search_space, n_trials, seed)
+    else:
+        raise ValueError(f"Unknown search '{search}', expected 'grid' or 'random'")
+    trials = [{**config, **candidate} for candidate in candidates]
+
+    dataset = encode_dataset(data)
+    folds = chronological_splits(dataset['days'], n_splits, val_fraction)
+    tasks = [(trial, params, fold) for trial, params in enumerate(trials) for fold in range(len(folds))]
+    n_workers = min(resolve_workers(n_workers), len(tasks))
+    logger.info(f"Tuning {len(trials)} trials x {len(folds)} folds on {len(dataset['ratings'])} rows "
+                f"with {n_workers} workers...")
+
+    results = {}
+    try:
+        if n_workers > 1:
+            ctx = multiprocessing.get_context()
+            shared = {}
+            for name in ('users', 'items', 'days', 'ratings'):
+                buffer, view = share_array(ctx, dataset[name])
+                shared[name] = (buffer, view.dtype.str, view.shape)
+            initargs = (shared, dataset['n_users'], dataset['n_items'], folds)
+            with ctx.Pool(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+                for trial, fold, scores, seconds in pool.imap_unordered(_run_trial, tasks):
+                    results[trial, fold] = (scores, seconds)
+                    logger.info(f"Trial {trial} fold {fold}: val RMSE {scores['val_rmse']:.4f} ({seconds:.2f}s)")
+        else:
+            _worker.update(dataset=dataset, folds=folds)
+            for task in tasks:
+                trial, fold, scores, seconds = _run_trial(task)
+                results[trial, fold] = (scores, seconds)
+                logger.info(f"Trial {trial} fold {fold}: val RMSE {scores['val_rmse']:.4f} ({seconds:.2f}s)")
+    except Exception as e:
+        logger.error(f"Error during hyperparameter tuning: {e}")
+        raise
+    finally:
+        _worker.clear()
+
+    return build_leaderboard(candidates, results, len(folds))
+
+
+def build_leaderboard(candidates, results, n_folds):
+    """
+    Aggregate per-fold scores into a leaderboard.
+    Args:
+        candidates (list): Searched hyperparameter dicts, by trial number.
+        results (dict): (trial, fold) -> (fold metrics, seconds).
+        n_folds (int): Number of folds.
+    Returns:
+        list: One row per trial, sorted by mean validation RMSE.
+    """
+    board = []
+    for trial, candidate in enumerate(candidates):
+        scores = [results[trial, fold][0] for fold in range(n_folds)]
+        val_rmse = np.array([score['val_rmse'] for score in scores])
+        board.append({
+            'trial': trial,
+            **candidate,
+            'val_rmse': float(val_rmse.mean()),
+            'val_rmse_std': float(val_rmse.std()),
+            'val_mae': float(np.mean([score['val_mae'] for score in scores])),
+            'train_rmse': float(np.mean([score['train_rmse'] for score in scores])),
+            'seconds': float(sum(results[trial, fold][1] for fold in range(n_folds))),
+        })
+    # NaN scores (diverged trials) sort last
+    board.sort(key=lambda row: (np.isnan(row['val_rmse']), row['val_rmse']))
+    for rank, row in enumerate(board, start=1):
+        row['rank'] = rank
+    return board
+
+
+def save_leaderboard(board, path):
+    """
+    Write a leaderboard as CSV, or as JSON when the path ends in .json.
+    Args:
+        board (list): Leaderboard rows from tune_model.
+        path (str): Output path.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(board, f, indent=2)
+    else:
+        params = [key for key in board[0] if key not in LEADERBOARD_FIELDS] if board else []
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(LEADERBOARD_FIELDS[:2]) + params + list(LEADERBOARD_FIELDS[2:]))
+            writer.writeheader()
+            writer.writerows(board)
+    logger.info(f"Leaderboard saved to {path}")
+
+
+if __name__ == '__main__':
+    from data.data_loader import load_data
+    from data.feature_extractor import extract_features, load_encoders
+    from config.config_settings import get_config
+    from utils.logger import setup_logging
+
+    setup_logging()
+
+    # Load configuration
+    CONFIG_PATH = 'config/development.yaml'
+    config = get_config(CONFIG_PATH)
+    tuning_config = config['tuning']
+
+    # Load and preprocess data
+    file_path = 'data/Customer_Purchase_History.xlsx'
+    raw_data = load_data(file_path)
+    preprocessed_data = extract_features(raw_data, load_encoders())
+
+    # Search the configured space, keeping the other training settings fixed
+    space = tuning_config.get('space') or {name: [config['model_training'][name]] for name in TUNED_PARAMS}
+    board = tune_model(
+        preprocessed_data,
+        config['model_training'],
+        space,
+        search=tuning_config.get('search', 'grid'),
+        n_trials=tuning_config.get('n_trials', 20),
+        n_splits=tuning_config.get('n_splits', 3),
+        val_fraction=tuning_config.get('val_fraction', 0.2),
+        n_workers=tuning_config.get('n_workers', 0),
+        seed=tuning_config.get('seed', 0)
+    )
+    save_leaderboard(board, tuning_config.get('leaderboard_path', 'models/tuning_leaderboard.csv'))
+    for row in board[:5]:
+        print({key: row[key] for key in ('rank', *space, 'val_rmse', 'val_mae')})
@@ -0,0 +1,215 @@
+import logging
+import multiprocessing
+import os
+import time
+import numpy as np
+from models.time_aware_factor_model import TimeAwareFactorModel
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Per-process state of pool workers, populated by _init_worker
+_worker = {}
+
+
+def resolve_workers(n_workers):
+    """
+    Resolve the configured worker count.
+    Args:
+        n_workers (int or None): Requested worker count; 0 or None means one per CPU core.
+    Returns:
+        int: Number of worker processes to use.
+    """
+    return n_workers if n_workers else os.cpu_count() or 1
+
+
+def share_array(ctx, array):
+    """
+    Copy an array into lock-free shared memory that pool workers inherit.
+    Args:
+        ctx: Multiprocessing context.
+        array (np.ndarray): Array to share.
+    Returns:
+        tuple: (shared buffer, np.ndarray view onto it).
+    """
+    buffer = ctx.RawArray('b', max(array.nbytes, 1))
+    view = np.frombuffer(buffer, dtype=array.dtype, count=array.size).reshape(array.shape)
+    view[...] = array
+    return buffer, view
+
+
+def attach_array(buffer, dtype, shape):
+    """
+    Wrap a shared buffer as an np.ndarray without copying.
+    Args:
+        buffer: Shared buffer created by share_array.
+        dtype (str): Array dtype.
+        shape (tuple): Array shape.
+    Returns:
+        np.ndarray: View onto the shared buffer.
+    """
+    return np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def _init_worker(hyperparams, global_mean, params, rows, offsets, n_strata):
+    """
+    Pool initializer: build a model whose parameters are views onto the shared arrays.
+    Args:
+        hyperparams (dict): Model constructor arguments.
+        global_mean (float): Global mean rating of the training data.
+        params (dict): Shared parameter buffers as {name: (buffer, dtype, shape)}.
+        rows (tuple): Shared, block-ordered training rows as (buffer, dtype, shape) triples.
+        offsets (np.ndarray): Start offset of every block in the block-ordered rows.
+        n_strata (int): Number of user and item strata.
+    """
+    np.random.seed()
+    model = TimeAwareFactorModel(**hyperparams)
+    model.global_mean = global_mean
+    for name, spec in params.items():
+        setattr(model, name, attach_array(*spec))
+    _worker['model'] = model
+    _worker['rows'] = tuple(attach_array(*spec) for spec in rows)
+    _worker['offsets'] = offsets
+    _worker['n_strata'] = n_strata
+
+
+def _train_block(user_stratum, sub_epoch, lr_scale=1.0):
+    """
+    Train on the block of rows whose users fall in one stratum and items in the matching stratum.
+    Args:
+        user_stratum (int): User stratum handled by this task.
+        sub_epoch (int): Sub-epoch number, which selects the item stratum.
+        lr_scale (float): Learning rate multiplier of the epoch.
+    Returns:
+        int: Number of rows processed.
+    """
+    n_strata = _worker['n_strata']
+    block = user_stratum * n_strata + (user_stratum + sub_epoch) % n_strata
+    start, stop = _worker['offsets'][block], _worker['offsets'][block + 1]
+    if stop > start:
+        _worker['model']._run_epoch(*(array[start:stop] for array in _worker['rows']), lr_scale=lr_scale)
+    return stop - start
+
+
+def fit_parallel(model, data, n_workers):
+    """
+    Train a model with stratified block SGD (DSGD) on a process pool.
+    Users and items are each split into n_workers strata. Every epoch runs n_workers sub-epochs; in each
+    one, worker w trains on the block (user stratum w, item stratum (w + s) mod n_workers), so no two
+    workers ever touch the same user or item parameters and updates go to shared memory without locks.
+    Args:
+        model (TimeAwareFactorModel): Model to train in place.
+        data (pd.DataFrame): Training data containing User_ID, Product_ID, Rating, and Purchase_Date.
+        n_workers (int): Number of worker processes.
+    """
+    logger.info(f"Training timeSVD++ model with the '{model.engine}' engine on {n_workers} workers...")
+    rows = model._prepare_training(data)
+    model.history = []
+
+    # Assign users and items to balanced random strata and order the rows block by block
+    users, items = rows[0], rows[1]
+    user_strata = np.random.permutation(len(model.user_factors)) % n_workers
+    item_strata = np.random.permutation(len(model.item_factors)) % n_workers
+    blocks = user_strata[users] * n_workers + item_strata[items]
+    order = np.argsort(blocks, kind='stable')
+    offsets = np.searchsorted(blocks[order], np.arange(n_workers * n_workers + 1))
+
+    ctx = multiprocessing.get_context()
+    shared_params, shared_rows = {}, []
+    for name in model.PARAM_ARRAYS:
+        buffer, view = share_array(ctx, getattr(model, name))
+        shared_params[name] = (buffer, view.dtype.str, view.shape)
+        setattr(model, name, view)
+    for array in rows:
+        buffer, view = share_array(ctx, array[order])
+        shared_rows.append((buffer, view.dtype.str, view.shape))
+    block_rows = tuple(array[order] for array in rows)
+
+    hyperparams = model.get_params()
+    try:
+        initargs = (hyperparams, model.global_mean, shared_params, tuple(shared_rows), offsets, n_workers)
+        with ctx.Pool(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+            for epoch in range(model.n_epochs):
+                scale = model.lr_scale(epoch)
+                start = time.perf_counter()
+                for sub_epoch in range(n_workers):
+                    pool.starmap(_train_block, [(stratum, sub_epoch, scale) for stratum in range(n_workers)])
+                model._record_epoch(epoch, time.perf_counter() - start, block_rows, lr=model.lr * scale)
+    except Exception as e:
+        logger.error(f"Error during parallel training: {e}")
+        raise
+    finally:
+        # Detach the parameters from shared memory
+        for name in model.PARAM_ARRAYS:
+            setattr(model, name, np.array(getattr(model, name)))
+
+
+def compare_convergence(data, config, n_workers, seed=0):
+    """
+    Train the same model serially and in parallel and compare per-epoch convergence and speed.
+    Args:
+        data (pd.DataFrame): Training data.
+        config (dict): model_training configuration settings.
+        n_workers (int): Number of worker processes for the parallel run.
+        seed (int): Random seed used for both runs.
+    Returns:
+        dict: Per-epoch history of both runs plus the final RMSE gap and overall speedup. Runs whose RMSE is
+            not finite are listed under 'diverged', and the gap is then None rather than NaN.
+    """
+    from models.model_training import build_model
+
+    np.random.seed(seed)
+    serial = build_model(config)
+    serial.fit(data)
+
+    np.random.seed(seed)
+    parallel = build_model(config)
+    fit_parallel(parallel, data, n_workers)
+
+    serial_time = sum(epoch['seconds'] for epoch in serial.history)
+    parallel_time = sum(epoch['seconds'] for epoch in parallel.history)
+    diverged = [name for name, run in (('serial', serial), ('parallel', parallel))
+                if not all(np.isfinite(epoch['train_rmse']) for epoch in run.history)]
+    comparison = {
+        'n_workers': n_workers,
+        'serial': serial.history,
+        'parallel': parallel.history,
+        'diverged': diverged,
+        'final_rmse_gap': None if diverged else parallel.history[-1]['train_rmse'] - serial.history[-1]['train_rmse'],
+        'speedup': serial_time / max(parallel_time, 1e-9),
+    }
+    for s, p in zip(serial.history, parallel.history):
+        logger.info(f"Epoch {s['epoch']}: serial RMSE {s['train_rmse']:.4f} ({s['seconds']:.2f}s), "
+                    f"parallel RMSE {p['train_rmse']:.4f} ({p['seconds']:.2f}s)")
+    if diverged:
+        logger.error(f"Training diverged (non-finite RMSE) in the {' and '.join(diverged)} run")
+    else:
+        logger.info(f"Final RMSE gap {comparison['final_rmse_gap']:+.4f}, speedup {comparison['speedup']:.2f}x")
+    return comparison
+
+
+if __name__ == '__main__':
+    import json
+    from data.data_loader import load_data
+    from data.feature_extractor import extract_features, load_encoders
+    from config.config_settings import get_config
+    from utils.logger import setup_logging
+
+    setup_logging()
+
+    # Load configuration
+    CONFIG_PATH = 'config/development.yaml'
+    config = get_config(CONFIG_PATH)
+    training_config = config['model_training']
+
+    # Load and preprocess data
+    file_path = 'data/Customer_Purchase_History.xlsx'
+    raw_data = load_data(file_path)
+    preprocessed_data = extract_features(raw_data, load_encoders())
+
+    # Compare serial and parallel convergence
+    n_workers = resolve_workers(training_config.get('n_workers', 0))
+    comparison = compare_convergence(preprocessed_data, training_config, max(n_workers, 2))
+    print(json.dumps(comparison, indent=2))
+    if comparison['diverged']:
+        raise SystemExit(1)
@@ -1,92 +1,1103 @@
-
+import copy
+import json
+import math
+import os
+import time
+import uuid
 import numpy as np
-import pandas as pd
 import logging
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Parameter row shared by every unknown user/item; it is never trained and stays zero
+UNKNOWN_ROW = 0
+# Training state written next to the checkpointed parameters
+CHECKPOINT_STATE = 'training_state.json'
+
+
+def to_days(dates):
+    """
+    Convert dates to integer day numbers (days since 1970-01-01).
+    Args:
+        dates: A date string, datetime/Timestamp, or an array-like of them.
+    Returns:
+        int or np.ndarray: Day number(s).
+    """
+    days = np.asarray(dates, dtype='datetime64[s]').astype('datetime64[D]').astype(np.int64)
+    return int(days) if days.ndim == 0 else days
+
+
+class IdIndex:
+    """
+    Map raw ID strings to contiguous parameter rows.
+    Row 0 is reserved for unknown IDs, so known IDs are numbered from 1.
+
+    An index built during training keeps a dict for O(1) single lookups. An index loaded from an artifact
+    is backed only by the sorted ID array (possibly memory-mapped) and builds the dict on first mutation.
+    """
+    def __init__(self, ids=()):
+        self._ids = []
+        self._rows = {}
+        # Sorted ID array and matching rows for bulk lookups, rebuilt lazily after new IDs are added
+        self._sorted_ids = None
+        self._sorted_rows = None
+        for id_ in ids:
+            self.add(id_)
+
+    @classmethod
+    def from_sorted(cls, sorted_ids, sorted_rows):
+        """
+        Build an index directly from its sorted ID array, without materializing a dict.
+        Args:
+            sorted_ids (np.ndarray): IDs in sorted order.
+            sorted_rows (np.ndarray): Parameter row of each sorted ID.
+        Returns:
+            IdIndex: Read-mostly index over the arrays.
+        """
+        index = cls()
+        index._ids = None
+        index._rows = None
+        index._sorted_ids = sorted_ids
+        index._sorted_rows = sorted_rows
+        return index
+
+    @property
+    def ids(self):
+        """IDs in row order (the ID of row r is ids[r - 1])."""
+        if self._ids is None:
+            ids = np.empty(len(self._sorted_ids), dtype=object)
+            ids[np.asarray(self._sorted_rows) - 1] = self._sorted_ids.tolist()
+            self._ids = ids.tolist()
+        return self._ids
+
+    @property
+    def rows(self):
+        """Dict from ID to parameter row."""
+        if self._rows is None:
+            self._rows = {id_: row for row, id_ in enumerate(self.ids, start=1)}
+        return self._rows
+
+    def __len__(self):
+        return len(self._ids) if self._ids is not None else len(self._sorted_ids)
+
+    def __contains__(self, id_):
+        return self.get(id_) != UNKNOWN_ROW
+
+    def add(self, id_):
+        """
+        Register an ID if it is new.
+        Args:
+            id_ (str): Raw ID.
+        Returns:
+            int: Parameter row of the ID.
+        """
+        rows = self.rows
+        row = rows.get(id_)
+        if row is None:
+            self._ids.append(id_)
+            row = len(self._ids)
+            rows[id_] = row
+            self._sorted_ids = None
+        return row
+
+    def get(self, id_):
+        """
+        Look up the parameter row of a single ID.
+        Args:
+            id_ (str): Raw ID.
+        Returns:
+            int: Parameter row, or UNKNOWN_ROW for unseen IDs.
+        """
+        if self._rows is not None:
+            return self._rows.get(id_, UNKNOWN_ROW)
+        return int(self.encode([id_])[0])
+
+    def sorted_arrays(self):
+        """
+        Get the sorted ID array and the parameter row of each sorted ID.
+        Returns:
+            tuple: (sorted IDs, rows) as np.ndarray.
+        """
+        if self._sorted_ids is None:
+            raw = np.asarray(self._ids, dtype=str)
+            order = np.argsort(raw, kind='stable')
+            self._sorted_ids = raw[order]
+            self._sorted_rows = order.astype(np.int64) + 1
+        return self._sorted_ids, self._sorted_rows
+
+    def encode(self, ids):
+        """
+        Look up the parameter rows of many IDs with a vectorized binary search.
+        Args:
+            ids (array-like): Raw IDs.
+        Returns:
+            np.ndarray: Parameter rows, UNKNOWN_ROW for unseen IDs.
+        """
+        ids = np.asarray(ids, dtype=str)
+        if not len(self) or not len(ids):
+            return np.full(len(ids), UNKNOWN_ROW, dtype=np.int64)
+        sorted_ids, sorted_rows = self.sorted_arrays()
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[pos] == ids, sorted_rows[pos], UNKNOWN_ROW)
+
+
 class TimeAwareFactorModel:
-    def __init__(self, n_factors, lr, reg, n_epochs):
+    ENGINES = ('sgd', 'minibatch')
+    LR_SCHEDULES = ('constant', 'exponential', 'step')
+    DTYPES = ('float64', 'float32')
+    # Post-training storage formats of the item factor matrix
+    ITEM_QUANTIZATIONS = ('int8',)
+    # Trainable parameter arrays, in the order they are shared with parallel workers
+    PARAM_ARRAYS = ('user_factors', 'item_factors', 'user_bias', 'item_bias', 'user_drift', 'item_bin_bias',
+                    'user_day_bias')
+    # Every array needed to serve predictions
+    STATE_ARRAYS = PARAM_ARRAYS + ('user_mean_day',)
+    # Arrays replacing item_factors once the item factors are quantized
+    QUANTIZED_ITEM_ARRAYS = ('item_codes', 'item_scales')
+
+    def __init__(self, n_factors, lr, reg, n_epochs, engine='sgd', batch_size=1024, n_bins=30, beta=0.4,
+                 drift_lr=None, user_day_bias=False, lr_schedule='constant', lr_decay=0.95, lr_step=10,
+                 dtype='float64'):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown training engine '{engine}', expected one of {self.ENGINES}")
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported parameter dtype '{dtype}', expected one of {self.DTYPES}")
+        if lr_schedule not in self.LR_SCHEDULES:
+            raise ValueError(f"Unknown learning rate schedule '{lr_schedule}', expected one of {self.LR_SCHEDULES}")
         self.n_factors = n_factors
         self.lr = lr
+        # Learning rate decay: lr * lr_decay ** epoch (exponential) or ** (epoch // lr_step) (step)
+        self.lr_schedule = lr_schedule
+        self.lr_decay = lr_decay
+        self.lr_step = lr_step
         self.reg = reg
         self.n_epochs = n_epochs
+        self.engine = engine
+        self.batch_size = batch_size
+        # Floating-point type of the trained parameters; float32 halves memory and cache footprint
+        self.dtype = dtype
+        # Time model: item bias per time bin, per-user linear drift and optional per-user-day offsets
+        self.n_bins = n_bins
+        self.beta = beta
+        self.drift_lr = drift_lr if drift_lr is not None else lr * 0.1
+        self.use_user_day_bias = user_day_bias
+        # Identifies the trained parameters, e.g. for invalidating cached predictions; changes on every fit
+        self.version = None
         self.global_mean = None
+        self.user_index = None
+        self.item_index = None
         self.user_factors = None
         self.item_factors = None
+        # Quantized item factors: item_factors[i] ~= item_codes[i] * item_scales[i], with item_factors dropped
+        self.item_quantization = None
+        self.item_codes = None
+        self.item_scales = None
         self.user_bias = None
         self.item_bias = None
-        self.user_time_bias = None
-        self.item_time_bias = None
+        self.day_min = None
+        self.n_days = None
+        self.bin_width = None
+        self.user_mean_day = None
+        self.user_drift = None
+        self.item_bin_bias = None
+        self.user_day_bias = None
+        # Optional approximate nearest-neighbour index over the item factors, built on demand
+        self.ann_index = None
+        self.history = []
+        # Epoch whose parameters were kept by early stopping, None without a validation set
+        self.best_epoch = None
+
+    @property
+    def P(self):
+        """User factor matrix, one row per user (row 0 is the unknown-user zero row)."""
+        return self.user_factors
 
-    def fit(self, data):
+    @property
+    def Q(self):
+        """Item factor matrix, one row per item (row 0 is the unknown-item zero row), dequantized if needed."""
+        return self.item_vectors()
+
+    def get_params(self):
+        """
+        Get the constructor arguments of the model.
+        Returns:
+            dict: Hyperparameters that rebuild an equivalent untrained model.
+        """
+        return {'n_factors': self.n_factors, 'lr': self.lr, 'reg': self.reg, 'n_epochs': self.n_epochs,
+                'engine': self.engine, 'batch_size': self.batch_size, 'n_bins': self.n_bins, 'beta': self.beta,
+                'drift_lr': self.drift_lr, 'user_day_bias': self.use_user_day_bias, 'lr_schedule': self.lr_schedule,
+                'lr_decay': self.lr_decay, 'lr_step': self.lr_step, 'dtype': self.dtype}
+
+    def state_arrays(self):
+        """
+        Get the names of the arrays needed to serve predictions with the current item factor storage.
+        Returns:
+            tuple: Array attribute names.
+        """
+        if self.item_quantization is None:
+            return self.STATE_ARRAYS
+        return tuple(name for name in self.STATE_ARRAYS if name != 'item_factors') + self.QUANTIZED_ITEM_ARRAYS
+
+    def lr_scale(self, epoch):
+        """
+        Get the learning rate multiplier of the schedule at an epoch.
+        Args:
+            epoch (int): Zero-based epoch number.
+        Returns:
+            float: Factor applied to lr and drift_lr.
+        """
+        if self.lr_schedule == 'exponential':
+            return self.lr_decay ** epoch
+        if self.lr_schedule == 'step':
+            return self.lr_decay ** (epoch // self.lr_step)
+        return 1.0
+
+    def _init_params(self, user_ids, item_ids):
+        """
+        Build the ID indexes and allocate the user/item parameter arrays.
+        Args:
+            user_ids (array-like): Unique user IDs.
+            item_ids (array-like): Unique item IDs.
+        """
+        self.user_index = IdIndex(user_ids)
+        self.item_index = IdIndex(item_ids)
+        self._allocate_params(len(self.user_index) + 1, len(self.item_index) + 1)
+
+    def _allocate_params(self, n_users, n_items):
+        """
+        Allocate the user/item parameter arrays.
+        Args:
+            n_users (int): Number of user rows, including UNKNOWN_ROW.
+            n_items (int): Number of item rows, including UNKNOWN_ROW.
+        """
+        self.user_factors = np.random.normal(scale=1./self.n_factors, size=(n_users, self.n_factors)).astype(self.dtype)
+        self.item_factors = np.random.normal(scale=1./self.n_factors, size=(n_items, self.n_factors)).astype(self.dtype)
+        self.user_factors[UNKNOWN_ROW] = 0
+        self.item_factors[UNKNOWN_ROW] = 0
+        self.item_quantization, self.item_codes, self.item_scales = None, None, None
+        self.user_bias = np.zeros(n_users, dtype=self.dtype)
+        self.item_bias = np.zeros(n_items, dtype=self.dtype)
+
+    def _init_time_params(self, users, days):
+        """
+        Fix the time axis from the training dates and allocate the time-bias arrays.
+        Memory is O(items x n_bins) for the bin biases and O(users) for the drift terms; the optional
+        per-user-day offsets add O(users x days spanned by the training data).
+        Args:
+            users (np.ndarray): User rows of the training data.
+            days (np.ndarray): Day numbers of the training data.
+        """
+        n_users = len(self.user_factors)
+        counts = np.bincount(users, minlength=n_users)
+        day_sums = np.bincount(users, weights=days, minlength=n_users)
+        self._init_time_axis(int(days.min()), int(days.max()), counts, day_sums)
+
+    def _init_time_axis(self, day_min, day_max, user_counts, user_day_sums):
+        """
+        Allocate the time-bias arrays from aggregate statistics of the training dates.
+        Args:
+            day_min (int): First training day number.
+            day_max (int): Last training day number.
+            user_counts (np.ndarray): Number of training rows per user row.
+            user_day_sums (np.ndarray): Sum of the training day numbers per user row.
+        """
+        n_users, n_items = len(self.user_factors), len(self.item_bias)
+        self.day_min = day_min
+        self.n_days = day_max - self.day_min + 1
+        self.bin_width = -(-self.n_days // self.n_bins)
+
+        # Mean rating day per user, the pivot of the drift term
+        self.user_mean_day = user_day_sums / np.maximum(user_counts, 1)
+        self.user_drift = np.zeros(n_users, dtype=self.dtype)
+        self.item_bin_bias = np.zeros((n_items, self.n_bins), dtype=self.dtype)
+        # Column 0 holds dates outside the training span (always zero); day d maps to column d - day_min + 1
+        self.user_day_bias = np.zeros((n_users, self.n_days + 1 if self.use_user_day_bias else 1), dtype=self.dtype)
+
+    @property
+    def last_bin(self):
+        """
+        Last item time bin reached by the training dates.
+        The bin width is rounded up, so the final bins of n_bins can lie past the training span; dates after the
+        span use this bin rather than an untrained one.
+        """
+        return min((self.n_days - 1) // self.bin_width, self.n_bins - 1)
+
+    def _encode_time(self, users, days):
+        """
+        Encode day numbers into the time features used by the time-bias terms.
+        Any date maps to a bin, dates before or after the training span falling into the first or last trained
+        bin.
+        Args:
+            users (np.ndarray): User rows.
+            days (np.ndarray): Day numbers.
+        Returns:
+            tuple: (item time bins, user drift deviations, user-day columns) as np.ndarray.
+        """
+        offsets = days - self.day_min
+        bins = np.clip(offsets // self.bin_width, 0, self.last_bin)
+        deltas = days - self.user_mean_day[users]
+        devs = np.sign(deltas) * np.abs(deltas) ** self.beta
+        if self.use_user_day_bias:
+            day_cols = np.where((offsets >= 0) & (offsets < self.n_days), offsets + 1, 0)
+        else:
+            day_cols = np.zeros(len(days), dtype=np.int64)
+        return bins, devs, day_cols
+
+    def encode(self, data):
+        """
+        Encode a ratings DataFrame into integer parameter rows and day numbers.
+        Args:
+            data (pd.DataFrame): Data containing User_ID, Product_ID and Purchase_Date.
+        Returns:
+            tuple: (user rows, item rows, day numbers) as np.ndarray.
+        """
+        users = self.user_index.encode(data['User_ID'].to_numpy())
+        items = self.item_index.encode(data['Product_ID'].to_numpy())
+        days = to_days(data['Purchase_Date'].to_numpy())
+        return users, items, days
+
+    def _prepare_training(self, data):
+        """
+        Initialize parameters for a fresh fit and encode the training rows.
+        Args:
+            data (pd.DataFrame): Training data containing User_ID, Product_ID, Rating, and Purchase_Date.
+        Returns:
+            tuple: (user rows, item rows, time bins, drift deviations, user-day columns, ratings) as np.ndarray.
+        """
+        self._init_params(data['User_ID'].unique(), data['Product_ID'].unique())
+
+        # Encode IDs and dates once
+        users, items, days = self.encode(data)
+        return self._prepare_rows(users, items, days, data['Rating'].to_numpy(dtype=np.float64))
+
+    def _prepare_rows(self, users, items, days, ratings):
+        """
+        Fix the global mean and time axis of a fresh fit from encoded rows.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            days (np.ndarray): Day numbers.
+            ratings (np.ndarray): Observed ratings.
+        Returns:
+            tuple: (user rows, item rows, time bins, drift deviations, user-day columns, ratings) as np.ndarray.
+        """
+        self.version = uuid.uuid4().hex
+        self.ann_index = None
+        self.global_mean = float(np.mean(ratings))
+        self._init_time_params(users, days)
+        bins, devs, day_cols = self._encode_time(users, days)
+        return users, items, bins, devs, day_cols, ratings
+
+    def _record_epoch(self, epoch, elapsed, rows, n_epochs=None, val_rows=None, lr=None):
+        """
+        Log and record the throughput and training error of a finished epoch.
+        Args:
+            epoch (int): Zero-based epoch number.
+            elapsed (float): Wall-clock seconds spent in the epoch.
+            rows (tuple): Encoded training rows as returned by _prepare_training.
+            n_epochs (int): Total epochs of the run; defaults to the model's n_epochs.
+            val_rows (tuple): Encoded validation rows, or None.
+            lr (float): Learning rate used in the epoch; defaults to the model's lr.
+        """
+        ratings = rows[-1]
+        squared_error = float(np.sum((ratings - self._predict_encoded(*rows[:-1])) ** 2))
+        val_rmse = self._rmse_encoded(val_rows) if val_rows is not None else None
+        self._log_epoch(epoch, elapsed, len(ratings), squared_error, n_epochs, val_rmse, lr)
+
+    def _rmse_encoded(self, rows):
+        """
+        Compute the RMSE of the model on encoded rows in one vectorized pass.
+        Args:
+            rows (tuple): Encoded rows as returned by _encode_rows.
+        Returns:
+            float: RMSE.
+        """
+        errors = rows[-1] - self._predict_encoded(*rows[:-1])
+        return math.sqrt(float(np.dot(errors, errors)) / max(len(errors), 1))
+
+    def _log_epoch(self, epoch, elapsed, n_rows, squared_error, n_epochs=None, val_rmse=None, lr=None):
+        """
+        Log and record epoch statistics from the row count and summed squared training error.
+        Args:
+            epoch (int): Zero-based epoch number.
+            elapsed (float): Wall-clock seconds spent in the epoch.
+            n_rows (int): Number of training rows in the epoch.
+            squared_error (float): Sum of squared training errors.
+            n_epochs (int): Total epochs of the run; defaults to the model's n_epochs.
+            val_rmse (float): Validation RMSE after the epoch, or None.
+            lr (float): Learning rate used in the epoch; defaults to the model's lr.
+        """
+        rows_per_sec = n_rows / max(elapsed, 1e-9)
+        train_rmse = math.sqrt(squared_error / max(n_rows, 1))
+        record = {'epoch': epoch + 1, 'seconds': elapsed, 'rows_per_sec': rows_per_sec, 'train_rmse': train_rmse,
+                  'lr': self.lr if lr is None else lr}
+        validation = ''
+        if val_rmse is not None:
+            record['val_rmse'] = val_rmse
+            validation = f", val RMSE {val_rmse:.4f}"
+        self.history.append(record)
+        logger.info(f"Epoch {epoch + 1}/{n_epochs or self.n_epochs} completed in {elapsed:.2f}s "
+                    f"({rows_per_sec:,.0f} rows/sec, train RMSE {train_rmse:.4f}{validation}).")
+
+    def fit(self, data, validation=None, patience=None, min_delta=0.0, restore_best=True, checkpoint_dir=None,
+            checkpoint_every=1, resume=False):
         """
         Train the timeSVD++ model.
+        With a validation set, its RMSE is computed after every epoch; training stops once it has not improved
+        by at least min_delta for patience epochs, and the parameters of the best epoch are restored. With a
+        checkpoint directory, the parameters and training state are saved every checkpoint_every epochs, and
+        resume=True continues an interrupted run from its last checkpoint; users and items missing from the
+        checkpoint are added as in partial_fit.
         Args:
             data (pd.DataFrame): Training data containing User_ID, Product_ID, Rating, and Purchase_Date.
+            validation (pd.DataFrame): Held-out data with the same columns, or None.
+            patience (int): Epochs without validation improvement before stopping; None never stops early.
+            min_delta (float): Smallest validation RMSE decrease counted as an improvement.
+            restore_best (bool): Whether to end on the parameters of the best validation epoch.
+            checkpoint_dir (str): Directory for checkpoints, or None.
+            checkpoint_every (int): Epochs between checkpoints.
+            resume (bool): Whether to continue from the checkpoint in checkpoint_dir, if there is one.
         """
-        logger.info("Training timeSVD++ model...")
+        logger.info(f"Training timeSVD++ model with the '{self.engine}' engine...")
         try:
-            # Initialize parameters
-            self.global_mean = data['Rating'].mean()
-            self.user_factors = {}
-            self.item_factors = {}
-            self.user_bias = {}
-            self.item_bias = {}
-            self.user_time_bias = {}
-            self.item_time_bias = {}
-
-            # Preprocessing
-            user_ids = data['User_ID'].unique()
-            item_ids = data['Product_ID'].unique()
-
-            for user in user_ids:
-                self.user_factors[user] = np.random.normal(scale=1./self.n_factors, size=self.n_factors)
-                self.user_bias[user] = 0
-                self.user_time_bias[user] = {}
-
-            for item in item_ids:
-                self.item_factors[item] = np.random.normal(scale=1./self.n_factors, size=self.n_factors)
-                self.item_bias[item] = 0
-                self.item_time_bias[item] = {}
-
-            # Training
-            for epoch in range(self.n_epochs):
-                for idx, row in data.iterrows():
-                    user, item, rating, date = row['User_ID'], row['Product_ID'], row['Rating'], row['Purchase_Date']
+            state = self._load_checkpoint(checkpoint_dir) if resume and checkpoint_dir else None
+            if state is None:
+                rows = self._prepare_training(data)
+                self.history = []
+            else:
+                # Users, items and dates the checkpoint has not seen get their own rows, so their updates never
+                # train the shared unknown row
+                n_users, n_items = len(self.user_index), len(self.item_index)
+                self._grow(data)
+                if len(self.user_index) > n_users or len(self.item_index) > n_items:
+                    logger.warning(f"Resumed data has {len(self.user_index) - n_users} users and "
+                                   f"{len(self.item_index) - n_items} items not in the checkpoint")
+                rows = self._encode_rows(data)
+            val_rows = self._encode_rows(validation) if validation is not None and len(validation) else None
+            self._train_epochs(rows, val_rows, patience, min_delta, restore_best, checkpoint_dir, checkpoint_every,
+                               state)
+        except Exception as e:
+            logger.error(f"Error during training: {e}")
+            raise
+
+    def _train_epochs(self, rows, val_rows=None, patience=None, min_delta=0.0, restore_best=True,
+                      checkpoint_dir=None, checkpoint_every=1, state=None):
+        """
+        Run the training epochs of a fit, with optional early stopping and checkpoints.
+        Args:
+            rows (tuple): Encoded training rows.
+            val_rows (tuple): Encoded validation rows, or None.
+            patience (int): Epochs without validation improvement before stopping, or None.
+            min_delta (float): Smallest validation RMSE decrease counted as an improvement.
+            restore_best (bool): Whether to end on the parameters of the best validation epoch.
+            checkpoint_dir (str): Directory for checkpoints, or None.
+            checkpoint_every (int): Epochs between checkpoints.
+            state (dict): Training state of a resumed run, or None for a fresh one.
+        """
+        state = state or {'epoch': 0, 'best_val_rmse': None, 'best_epoch': None, 'stale_epochs': 0}
+        best_params = None
+        if state['best_epoch'] is not None and restore_best and checkpoint_dir:
+            best_params = self._load_best_params(checkpoint_dir)
 
-                    if item not in self.item_factors:
-                        self.item_factors[item] = np.random.normal(scale=1./self.n_factors, size=self.n_factors)
-                        self.item_bias[item] = 0
-                        self.item_time_bias[item] = {}
+        for epoch in range(state['epoch'], self.n_epochs):
+            scale = self.lr_scale(epoch)
+            start = time.perf_counter()
+            self._run_epoch(*rows, lr_scale=scale)
+            self._record_epoch(epoch, time.perf_counter() - start, rows, val_rows=val_rows, lr=self.lr * scale)
+            state['epoch'] = epoch + 1
 
-                    if date not in self.user_time_bias[user]:
-                        self.user_time_bias[user][date] = 0
+            if val_rows is not None:
+                val_rmse = self.history[-1]['val_rmse']
+                best = state['best_val_rmse']
+                if best is None or val_rmse < best - min_delta:
+                    state.update(best_val_rmse=val_rmse, best_epoch=epoch + 1, stale_epochs=0)
+                    if restore_best:
+                        best_params = {name: np.array(getattr(self, name)) for name in self.PARAM_ARRAYS}
+                        if checkpoint_dir:
+                            self._save_checkpoint(checkpoint_dir, 'best')
+                else:
+                    state['stale_epochs'] += 1
+            stop = patience is not None and val_rows is not None and state['stale_epochs'] >= patience
+            if checkpoint_dir and (stop or state['epoch'] % checkpoint_every == 0 or state['epoch'] == self.n_epochs):
+                self._save_checkpoint(checkpoint_dir, 'last', state)
+            if stop:
+                logger.info(f"Stopping early after epoch {epoch + 1}: validation RMSE has not improved for "
+                            f"{patience} epochs (best {state['best_val_rmse']:.4f} at epoch {state['best_epoch']}).")
+                break
 
-                    if date not in self.item_time_bias[item]:
-                        self.item_time_bias[item][date] = 0
+        if best_params is not None and state['best_epoch'] != state['epoch']:
+            logger.info(f"Restoring the parameters of epoch {state['best_epoch']}.")
+            for name, value in best_params.items():
+                setattr(self, name, value)
+            self.version = uuid.uuid4().hex
+        self.best_epoch = state['best_epoch']
 
-                    pred = self.predict(user, item, date)
-                    err = rating - pred
+    def _save_checkpoint(self, checkpoint_dir, name, state=None):
+        """
+        Save the current parameters, and optionally the training state, as a checkpoint.
+        The state file is replaced only after the parameters are fully written, so it never refers to a
+        partial checkpoint.
+        Args:
+            checkpoint_dir (str): Checkpoint directory.
+            name (str): Name of the parameter artifact, 'last' or 'best'.
+            state (dict): Training state, or None to save the parameters only.
+        """
+        from models.model_artifact import save_artifact
 
-                    # Update biases
-                    self.user_bias[user] += self.lr * (err - self.reg * self.user_bias[user])
-                    self.item_bias[item] += self.lr * (err - self.reg * self.item_bias[item])
-                    self.user_time_bias[user][date] += self.lr * (err - self.reg * self.user_time_bias[user][date])
-                    self.item_time_bias[item][date] += self.lr * (err - self.reg * self.item_time_bias[item][date])
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        save_artifact(self, os.path.join(checkpoint_dir, name))
+        if state is not None:
+            staging = os.path.join(checkpoint_dir, f'{CHECKPOINT_STATE}.tmp')
+            with open(staging, 'w') as f:
+                json.dump({**state, 'history': self.history, 'hyperparameters': self.get_params()}, f, indent=2)
+            os.replace(staging, os.path.join(checkpoint_dir, CHECKPOINT_STATE))
+            logger.info(f"Checkpoint saved to {checkpoint_dir} after epoch {state['epoch']}")
 
-                    # Update factors
-                    user_factors = self.user_factors[user]
-                    item_factors = self.item_factors[item]
-                    self.user_factors[user] += self.lr * (err * item_factors - self.reg * user_factors)
-                    self.item_factors[item] += self.lr * (err * user_factors - self.reg * item_factors)
+    def _load_checkpoint(self, checkpoint_dir):
+        """
+        Restore the parameters and training state of an interrupted run.
+        Args:
+            checkpoint_dir (str): Checkpoint directory.
+        Returns:
+            dict: Training state, or None if the directory holds no checkpoint.
+        """
+        from models.model_artifact import load_artifact
 
-                logger.info(f"Epoch {epoch + 1}/{self.n_epochs} completed.")
+        state_path = os.path.join(checkpoint_dir, CHECKPOINT_STATE)
+        if not os.path.isfile(state_path):
+            logger.info(f"No checkpoint in {checkpoint_dir}, starting a fresh run")
+            return None
+        with open(state_path) as f:
+            state = json.load(f)
+        if state.pop('hyperparameters') != self.get_params():
+            logger.warning("Resuming a checkpoint saved with different hyperparameters")
+        self.history = state.pop('history')
+
+        checkpoint = load_artifact(os.path.join(checkpoint_dir, 'last'), mmap_mode=None)
+        for name in self.STATE_ARRAYS + ('version', 'global_mean', 'day_min', 'n_days', 'bin_width',
+                                         'user_index', 'item_index'):
+            setattr(self, name, getattr(checkpoint, name))
+        self.ann_index = None
+        logger.info(f"Resuming from the checkpoint in {checkpoint_dir} after epoch {state['epoch']}")
+        return state
+
+    def _load_best_params(self, checkpoint_dir):
+        """
+        Load the parameters of the best validation epoch saved by a checkpointed run.
+        Args:
+            checkpoint_dir (str): Checkpoint directory.
+        Returns:
+            dict: Parameter arrays, or None if no best checkpoint was saved.
+        """
+        from models.model_artifact import is_artifact, load_artifact
+
+        path = os.path.join(checkpoint_dir, 'best')
+        if not is_artifact(path):
+            return None
+        best = load_artifact(path, mmap_mode=None)
+        return {name: getattr(best, name) for name in self.PARAM_ARRAYS}
+
+    def fit_encoded(self, users, items, days, ratings, n_users=None, n_items=None):
+        """
+        Train the timeSVD++ model on rows whose IDs are already encoded as parameter rows, e.g. to train many
+        models on one shared encoding. The model gets no ID indexes; score it with predict_encoded.
+        Args:
+            users (np.ndarray): User rows, numbered from 1 (UNKNOWN_ROW is never trained).
+            items (np.ndarray): Item rows, numbered from 1.
+            days (np.ndarray): Day numbers.
+            ratings (np.ndarray): Observed ratings.
+            n_users (int): Number of user rows including UNKNOWN_ROW; defaults to the largest row + 1.
+            n_items (int): Number of item rows including UNKNOWN_ROW; defaults to the largest row + 1.
+        """
+        logger.info(f"Training timeSVD++ model on {len(ratings)} encoded rows with the '{self.engine}' engine...")
+        try:
+            self.user_index, self.item_index = IdIndex(), IdIndex()
+            self._allocate_params(n_users or int(users.max()) + 1, n_items or int(items.max()) + 1)
+            rows = self._prepare_rows(users, items, days, np.asarray(ratings, dtype=np.float64))
+            self.history = []
+            self._train_epochs(rows)
         except Exception as e:
             logger.error(f"Error during training: {e}")
             raise
 
+    def fit_stream(self, chunks):
+        """
+        Train the timeSVD++ model out of core on a stream of data chunks.
+        A first pass over the stream indexes the IDs and aggregates the time axis; every epoch then
+        re-reads the stream and trains on one encoded chunk at a time, so peak memory is bounded by the
+        chunk size plus the model parameters. The per-epoch training error is measured on each chunk right
+        after it has been trained on.
+        Args:
+            chunks (callable): Zero-argument function returning a fresh iterable of DataFrames containing
+                User_ID, Product_ID, Rating, and Purchase_Date.
+        """
+        logger.info(f"Training timeSVD++ model on a data stream with the '{self.engine}' engine...")
+        try:
+            self._prepare_stream(chunks)
+            self.history = []
+            for epoch in range(self.n_epochs):
+                n_rows, squared_error = 0, 0.0
+                start = time.perf_counter()
+                for rows in self.iter_encoded(chunks()):
+                    self._run_epoch(*rows, lr_scale=self.lr_scale(epoch))
+                    n_rows += len(rows[-1])
+                    squared_error += float(np.sum((rows[-1] - self._predict_encoded(*rows[:-1])) ** 2))
+                self._log_epoch(epoch, time.perf_counter() - start, n_rows, squared_error,
+                                lr=self.lr * self.lr_scale(epoch))
+        except Exception as e:
+            logger.error(f"Error during streaming training: {e}")
+            raise
+
+    def _prepare_stream(self, chunks):
+        """
+        Initialize parameters for a fresh streaming fit from one pass over the data.
+        Args:
+            chunks (callable): Zero-argument function returning a fresh iterable of DataFrames.
+        """
+        self.version = uuid.uuid4().hex
+        self.ann_index = None
+        user_index, item_index = IdIndex(), IdIndex()
+        user_counts, user_day_sums = np.zeros(1), np.zeros(1)
+        n_rows, rating_sum = 0, 0.0
+        day_min, day_max = None, None
+        for chunk in chunks():
+            if not len(chunk):
+                continue
+            for user in chunk['User_ID'].unique():
+                user_index.add(user)
+            for item in chunk['Product_ID'].unique():
+                item_index.add(item)
+            users = chunk['User_ID'].map(user_index.rows).to_numpy(dtype=np.int64)
+            days = to_days(chunk['Purchase_Date'].to_numpy())
+            n_users = len(user_index) + 1
+            user_counts = np.bincount(users, minlength=n_users) + np.pad(user_counts, (0, n_users - len(user_counts)))
+            user_day_sums = np.bincount(users, weights=days, minlength=n_users) + np.pad(
+                user_day_sums, (0, n_users - len(user_day_sums)))
+            n_rows += len(chunk)
+            rating_sum += float(chunk['Rating'].sum())
+            day_min = int(days.min()) if day_min is None else min(day_min, int(days.min()))
+            day_max = int(days.max()) if day_max is None else max(day_max, int(days.max()))
+        if not n_rows:
+            raise ValueError("The training stream is empty")
+
+        self.global_mean = rating_sum / n_rows
+        # IdIndex assigns rows in insertion order, so the aggregates stay aligned with the new indexes
+        self._init_params(user_index.ids, item_index.ids)
+        self._init_time_axis(day_min, day_max, user_counts, user_day_sums)
+        logger.info(f"Indexed {n_rows} streamed rows: {len(user_index)} users, {len(item_index)} items")
+
+    def iter_encoded(self, chunks):
+        """
+        Encode a stream of DataFrames into training rows for the current parameters, one chunk at a time.
+        Args:
+            chunks (iterable): DataFrames containing User_ID, Product_ID, Rating, and Purchase_Date.
+        Yields:
+            tuple: (user rows, item rows, time bins, drift deviations, user-day columns, ratings) as np.ndarray.
+        """
+        for chunk in chunks:
+            if len(chunk):
+                yield self._encode_rows(chunk)
+
+    def partial_fit(self, new_rows, n_epochs=3, replay=None, replay_size=None):
+        """
+        Update a trained model with new interactions instead of retraining from scratch.
+        Unseen users and items get fresh parameter rows, the time axis is extended to cover new dates,
+        and a few SGD passes run over the new rows only, optionally mixed with a random replay sample of
+        older rows to limit drift away from the full history. Memory-mapped parameters are copied first,
+        so the artifact the model was loaded from is never modified. Quantized item factors are dequantized
+        for the update and quantized again afterwards.
+        Args:
+            new_rows (pd.DataFrame): New data containing User_ID, Product_ID, Rating, and Purchase_Date.
+            n_epochs (int): Number of passes over the new rows.
+            replay (pd.DataFrame): Older interactions to sample from each epoch.
+            replay_size (int): Replay rows sampled per epoch; defaults to the number of new rows.
+        """
+        if self.global_mean is None:
+            self.fit(new_rows)
+            return
+        logger.info(f"Updating timeSVD++ model with {len(new_rows)} new rows...")
+        try:
+            quantization = self.item_quantization
+            if quantization is not None:
+                self.item_factors = self.item_vectors()
+                self.item_quantization, self.item_codes, self.item_scales = None, None, None
+            for name in self.STATE_ARRAYS:
+                setattr(self, name, np.array(getattr(self, name)))
+            self._grow(new_rows)
+            self.version = uuid.uuid4().hex
+            self.ann_index = None
+
+            rows = self._encode_rows(new_rows)
+            replay_rows = self._encode_rows(replay) if replay is not None and len(replay) else None
+            replay_size = len(new_rows) if replay_size is None else replay_size
+
+            for epoch in range(n_epochs):
+                epoch_rows = rows
+                if replay_rows is not None and replay_size:
+                    sample = np.random.randint(len(replay_rows[-1]), size=replay_size)
+                    epoch_rows = tuple(np.concatenate([new, old[sample]]) for new, old in zip(rows, replay_rows))
+                start = time.perf_counter()
+                self._run_epoch(*epoch_rows)
+                self._record_epoch(epoch, time.perf_counter() - start, epoch_rows, n_epochs)
+            if quantization is not None:
+                self._quantize_items(quantization)
+        except Exception as e:
+            logger.error(f"Error during incremental training: {e}")
+            raise
+
+    def _encode_rows(self, data):
+        """
+        Encode a ratings DataFrame into training rows for the current parameters.
+        Args:
+            data (pd.DataFrame): Data containing User_ID, Product_ID, Rating, and Purchase_Date.
+        Returns:
+            tuple: (user rows, item rows, time bins, drift deviations, user-day columns, ratings) as np.ndarray.
+        """
+        users, items, days = self.encode(data)
+        bins, devs, day_cols = self._encode_time(users, days)
+        return users, items, bins, devs, day_cols, data['Rating'].to_numpy(dtype=np.float64)
+
+    def _grow(self, data):
+        """
+        Add parameter rows for unseen users/items and extend the time axis to cover new dates.
+        Existing users keep their drift pivot; new users pivot on the mean day of their new rows.
+        Args:
+            data (pd.DataFrame): New data containing User_ID, Product_ID and Purchase_Date.
+        """
+        n_users, n_items = len(self.user_factors), len(self.item_factors)
+        for user in data['User_ID'].unique():
+            self.user_index.add(user)
+        for item in data['Product_ID'].unique():
+            self.item_index.add(item)
+        new_users = len(self.user_index) + 1 - n_users
+        new_items = len(self.item_index) + 1 - n_items
+
+        if new_users:
+            self.user_factors = np.vstack([self.user_factors, np.random.normal(
+                scale=1./self.n_factors, size=(new_users, self.n_factors)).astype(self.dtype)])
+            self.user_bias = np.concatenate([self.user_bias, np.zeros(new_users, dtype=self.dtype)])
+            self.user_drift = np.concatenate([self.user_drift, np.zeros(new_users, dtype=self.dtype)])
+            self.user_day_bias = np.vstack([self.user_day_bias,
+                                            np.zeros((new_users, self.user_day_bias.shape[1]), dtype=self.dtype)])
+            self.user_mean_day = np.concatenate([self.user_mean_day, np.zeros(new_users)])
+        if new_items:
+            self.item_factors = np.vstack([self.item_factors, np.random.normal(
+                scale=1./self.n_factors, size=(new_items, self.n_factors)).astype(self.dtype)])
+            self.item_bias = np.concatenate([self.item_bias, np.zeros(new_items, dtype=self.dtype)])
+            self.item_bin_bias = np.vstack([self.item_bin_bias, np.zeros((new_items, self.n_bins), dtype=self.dtype)])
+
+        users, _, days = self.encode(data)
+        if new_users:
+            fresh = users >= n_users
+            counts = np.bincount(users[fresh], minlength=len(self.user_factors))
+            sums = np.bincount(users[fresh], weights=days[fresh], minlength=len(self.user_factors))
+            self.user_mean_day[n_users:] = sums[n_users:] / np.maximum(counts[n_users:], 1)
+
+        # Bins the new dates reach for the first time start from the latest trained bin's values, new days
+        # from a zero offset
+        n_days = int(days.max()) - self.day_min + 1
+        if n_days > self.n_days:
+            last_bin = self.last_bin
+            n_bins = -(-n_days // self.bin_width)
+            if n_bins > self.n_bins:
+                self.item_bin_bias = np.hstack([self.item_bin_bias, np.empty((len(self.item_bin_bias),
+                                                                              n_bins - self.n_bins), dtype=self.dtype)])
+                self.n_bins = n_bins
+            self.item_bin_bias[:, last_bin + 1:] = self.item_bin_bias[:, last_bin:last_bin + 1]
+            if self.use_user_day_bias:
+                self.user_day_bias = np.hstack([self.user_day_bias, np.zeros((len(self.user_day_bias),
+                                                                              n_days - self.n_days), dtype=self.dtype)])
+            self.n_days = n_days
+
+    def _run_epoch(self, users, items, bins, devs, day_cols, ratings, lr_scale=1.0):
+        """
+        Run one training epoch with the configured engine.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            bins (np.ndarray): Item time bins.
+            devs (np.ndarray): User drift deviations.
+            day_cols (np.ndarray): User-day offset columns.
+            ratings (np.ndarray): Observed ratings.
+            lr_scale (float): Learning rate multiplier of the epoch.
+        """
+        if self.engine == 'minibatch':
+            self._minibatch_epoch(users, items, bins, devs, day_cols, ratings, lr_scale)
+        else:
+            self._sgd_epoch(users, items, bins, devs, day_cols, ratings, lr_scale)
+
+    def _sgd_epoch(self, users, items, bins, devs, day_cols, ratings, lr_scale=1.0):
+        """
+        Run one epoch of classic per-row SGD over encoded training rows.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            bins (np.ndarray): Item time bins.
+            devs (np.ndarray): User drift deviations.
+            day_cols (np.ndarray): User-day offset columns.
+            ratings (np.ndarray): Observed ratings.
+            lr_scale (float): Learning rate multiplier of the epoch.
+        """
+        lr, reg, drift_lr = self.lr * lr_scale, self.reg, self.drift_lr * lr_scale
+        for user, item, bin_, dev, day_col, rating in zip(users.tolist(), items.tolist(), bins.tolist(),
+                                                          devs.tolist(), day_cols.tolist(), ratings.tolist()):
+            user_factors = self.user_factors[user].copy()
+            item_factors = self.item_factors[item]
+            pred = (self.global_mean + self.user_bias[user] + self.user_drift[user] * dev
+                    + self.user_day_bias[user, day_col] + self.item_bias[item] + self.item_bin_bias[item, bin_]
+                    + np.dot(user_factors, item_factors))
+            err = rating - pred
+
+            # Update biases
+            self.user_bias[user] += lr * (err - reg * self.user_bias[user])
+            self.user_drift[user] += drift_lr * (err * dev - reg * self.user_drift[user])
+            if self.use_user_day_bias and day_col:
+                self.user_day_bias[user, day_col] += lr * (err - reg * self.user_day_bias[user, day_col])
+            self.item_bias[item] += lr * (err - reg * self.item_bias[item])
+            self.item_bin_bias[item, bin_] += lr * (err - reg * self.item_bin_bias[item, bin_])
+
+            # Update factors
+            self.user_factors[user] += lr * (err * item_factors - reg * user_factors)
+            self.item_factors[item] += lr * (err * user_factors - reg * item_factors)
+
+    def _minibatch_epoch(self, users, items, bins, devs, day_cols, ratings, lr_scale=1.0):
+        """
+        Run one epoch of vectorized mini-batch SGD over shuffled encoded training rows.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            bins (np.ndarray): Item time bins.
+            devs (np.ndarray): User drift deviations.
+            day_cols (np.ndarray): User-day offset columns.
+            ratings (np.ndarray): Observed ratings.
+            lr_scale (float): Learning rate multiplier of the epoch.
+        """
+        order = np.random.permutation(len(ratings))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            self._minibatch_step(users[batch], items[batch], bins[batch], devs[batch], day_cols[batch],
+                                 ratings[batch], lr_scale)
+
+    @staticmethod
+    def _inverse_counts(ids, dtype):
+        """
+        Weight each row of a batch by one over the number of batch rows sharing its ID.
+        Args:
+            ids (np.ndarray): Parameter row (or combined row key) of each batch row.
+            dtype (np.dtype): Parameter dtype of the weights.
+        Returns:
+            np.ndarray: Row weights; the weights of every ID sum to one.
+        """
+        _, inverse, counts = np.unique(ids, return_inverse=True, return_counts=True)
+        return (1.0 / counts[inverse.ravel()]).astype(dtype)
+
+    def _minibatch_step(self, users, items, bins, devs, day_cols, ratings, lr_scale=1.0):
+        """
+        Apply one mini-batch of SGD updates.
+        Errors are computed against the parameters at the start of the batch, and the per-row updates are
+        averaged per ID with np.add.at, so an ID repeated within the batch takes one mean-gradient step
+        rather than one step per occurrence, which diverges for hot users and items.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            bins (np.ndarray): Item time bins.
+            devs (np.ndarray): User drift deviations.
+            day_cols (np.ndarray): User-day offset columns.
+            ratings (np.ndarray): Observed ratings.
+            lr_scale (float): Learning rate multiplier of the batch.
+        """
+        lr, reg, drift_lr = self.lr * lr_scale, self.reg, self.drift_lr * lr_scale
+        user_factors = self.user_factors[users]
+        item_factors = self.item_factors[items]
+        user_bias = self.user_bias[users]
+        user_drift = self.user_drift[users]
+        user_day_bias = self.user_day_bias[users, day_cols]
+        item_bias = self.item_bias[items]
+        item_bin_bias = self.item_bin_bias[items, bins]
+
+        pred = (self.global_mean + user_bias + user_drift * devs + user_day_bias + item_bias + item_bin_bias
+                + np.einsum('ij,ij->i', user_factors, item_factors))
+        err = ratings - pred
+
+        # Per-ID averaging weights
+        dtype = self.user_factors.dtype
+        user_weights = self._inverse_counts(users, dtype)
+        item_weights = self._inverse_counts(items, dtype)
+
+        # Update biases
+        np.add.at(self.user_bias, users, lr * user_weights * (err - reg * user_bias))
+        np.add.at(self.user_drift, users, drift_lr * user_weights * (err * devs - reg * user_drift))
+        if self.use_user_day_bias:
+            # Column 0 (dates outside the time axis) must stay zero
+            day_weights = self._inverse_counts(users * self.user_day_bias.shape[1] + day_cols, dtype)
+            np.add.at(self.user_day_bias, (users, day_cols),
+                      lr * day_weights * (err - reg * user_day_bias) * (day_cols > 0))
+        np.add.at(self.item_bias, items, lr * item_weights * (err - reg * item_bias))
+        bin_weights = self._inverse_counts(items * self.item_bin_bias.shape[1] + bins, dtype)
+        np.add.at(self.item_bin_bias, (items, bins), lr * bin_weights * (err - reg * item_bin_bias))
+
+        # Update factors
+        err = err[:, None]
+        np.add.at(self.user_factors, users, lr * user_weights[:, None] * (err * item_factors - reg * user_factors))
+        np.add.at(self.item_factors, items, lr * item_weights[:, None] * (err * user_factors - reg * item_factors))
+
+    def _predict_encoded(self, users, items, bins, devs, day_cols):
+        """
+        Predict ratings for encoded rows.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            bins (np.ndarray): Item time bins.
+            devs (np.ndarray): User drift deviations.
+            day_cols (np.ndarray): User-day offset columns.
+        Returns:
+            np.ndarray: Predicted ratings.
+        """
+        return (self.global_mean + self.user_bias[users] + self.user_drift[users] * devs
+                + self.user_day_bias[users, day_cols] + self.item_bias[items] + self.item_bin_bias[items, bins]
+                + self._factor_dots(users, items))
+
+    def _factor_dots(self, users, items):
+        """
+        Compute the user-item factor dot products of encoded rows.
+        With quantized item factors the int8 codes are gathered and the per-row scale is applied to the
+        finished dot product, so the float item matrix is never materialized.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+        Returns:
+            np.ndarray: Dot products.
+        """
+        user_factors = self.user_factors[users]
+        if self.item_quantization is None:
+            return np.einsum('ij,ij->i', user_factors, self.item_factors[items])
+        codes = self.item_codes[items].astype(user_factors.dtype)
+        return np.einsum('ij,ij->i', user_factors, codes) * self.item_scales[items]
+
+    def _catalog_dots(self, rows, user_factors, chunk_size=65536):
+        """
+        Compute the dot products of one user's factors with many item rows.
+        Quantized codes are converted chunk by chunk, bounding the temporary float copy to chunk_size rows.
+        Args:
+            rows (np.ndarray or slice): Item rows.
+            user_factors (np.ndarray): Factor vector of the user.
+            chunk_size (int): Item rows converted at a time when quantized.
+        Returns:
+            np.ndarray: Dot product per item row.
+        """
+        if self.item_quantization is None:
+            return self.item_factors[rows] @ user_factors
+        codes, scales = self.item_codes[rows], self.item_scales[rows]
+        dots = np.empty(len(codes), dtype=user_factors.dtype)
+        for start in range(0, len(codes), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            dots[chunk] = codes[chunk].astype(user_factors.dtype) @ user_factors
+        return dots * scales
+
+    def item_vectors(self, rows=slice(None)):
+        """
+        Get item factor rows as floating point, dequantizing quantized factors.
+        Args:
+            rows (np.ndarray or slice): Item rows; all of them by default.
+        Returns:
+            np.ndarray: Item factors.
+        """
+        if self.item_quantization is None:
+            return self.item_factors[rows]
+        return self.item_codes[rows].astype(self.dtype) * self.item_scales[rows, None]
+
+    def astype(self, dtype):
+        """
+        Get a copy of the model with its parameters stored in another floating-point type.
+        Args:
+            dtype (str): 'float64' or 'float32'.
+        Returns:
+            TimeAwareFactorModel: Converted copy sharing the ID indexes; quantized item codes are kept.
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported parameter dtype '{dtype}', expected one of {self.DTYPES}")
+        model = copy.copy(self)
+        model.dtype = dtype
+        for name in model.state_arrays():
+            if name not in ('user_mean_day', 'item_codes'):
+                setattr(model, name, np.asarray(getattr(self, name)).astype(dtype))
+        model.ann_index = None
+        model.history = list(self.history)
+        return model
+
+    def quantize_items(self, quantization='int8'):
+        """
+        Get a copy of the model with its item factors quantized for serving.
+        Each item row is stored as int8 codes times a per-row scale (max |factor| / 127), cutting the item
+        factor matrix to a quarter of its float32 size (an eighth of float64). Predictions and catalog scoring
+        compute their dot products on the codes.
+        Args:
+            quantization (str): Quantization format; only 'int8' is supported.
+        Returns:
+            TimeAwareFactorModel: Quantized copy sharing every other parameter array.
+        """
+        model = copy.copy(self)
+        model.history = list(self.history)
+        model._quantize_items(quantization)
+        return model
+
+    def _quantize_items(self, quantization):
+        """
+        Replace the item factors by their quantized form in place.
+        Args:
+            quantization (str): Quantization format.
+        """
+        if quantization not in self.ITEM_QUANTIZATIONS:
+            raise ValueError(f"Unknown item quantization '{quantization}', expected one of {self.ITEM_QUANTIZATIONS}")
+        factors = self.item_vectors()
+        scales = np.abs(factors).max(axis=1) / 127.0
+        codes = np.rint(factors / np.where(scales > 0, scales, 1.0)[:, None])
+        self.item_codes = np.clip(codes, -127, 127).astype(np.int8)
+        self.item_scales = scales.astype(self.dtype)
+        self.item_factors = None
+        self.item_quantization = quantization
+        self.ann_index = None
+        quantized_bytes = self.item_codes.nbytes + self.item_scales.nbytes
+        logger.info(f"Quantized {len(codes)} item factor rows to {quantization}: "
+                    f"{factors.nbytes / 2**20:.1f} MiB -> {quantized_bytes / 2**20:.1f} MiB")
+
+    def _predict_rows(self, user, item, day):
+        """
+        Predict the rating for already-encoded parameter rows.
+        Args:
+            user (int): User row.
+            item (int): Item row.
+            day (int): Day number.
+        Returns:
+            float: Predicted rating.
+        """
+        bin_, user_time_bias = self._user_time_terms(user, day)
+        pred = self.global_mean + self.user_bias[user] + user_time_bias + self.item_bias[item]
+        pred += self.item_bin_bias[item, bin_]
+        if self.item_quantization is None:
+            pred += np.dot(self.user_factors[user], self.item_factors[item])
+        else:
+            pred += np.dot(self.user_factors[user], self.item_codes[item].astype(self.dtype)) * self.item_scales[item]
+        return float(pred)
+
+    def _user_time_terms(self, user, day):
+        """
+        Compute the item time bin of a day and the user's time-dependent bias on that day.
+        Args:
+            user (int): User row.
+            day (int): Day number.
+        Returns:
+            tuple: (item time bin, user drift plus user-day offset).
+        """
+        offset = day - self.day_min
+        bin_ = min(max(offset // self.bin_width, 0), self.last_bin)
+        delta = day - self.user_mean_day[user]
+        day_col = offset + 1 if self.use_user_day_bias and 0 <= offset < self.n_days else 0
+        user_time_bias = (self.user_drift[user] * math.copysign(abs(delta) ** self.beta, delta)
+                          + self.user_day_bias[user, day_col])
+        return bin_, user_time_bias
+
     def predict(self, user, item, date):
         """
         Predict the rating for a given user, item, and date.
@@ -97,9 +1108,190 @@ class TimeAwareFactorModel:
         Returns:
             float: Predicted rating.
         """
-        pred = self.global_mean + self.user_bias.get(user, 0) + self.item_bias.get(item, 0)
-        pred += self.user_time_bias.get(user, {}).get(date, 0)
-        pred += self.item_time_bias.get(item, {}).get(date, 0)
-        pred += np.dot(self.user_factors.get(user, np.zeros(self.n_factors)),
-                       self.item_factors.get(item, np.zeros(self.n_factors)))
-        return pred
+        return self.predict_row(self.user_index.get(user), self.item_index.get(item), date)
+
+    def predict_row(self, user, item, date):
+        """
+        Predict the rating for one already-encoded (user, item) pair, e.g. from IdIndex.get.
+        Args:
+            user (int): User row, UNKNOWN_ROW for an unknown user.
+            item (int): Item row, UNKNOWN_ROW for an unknown item.
+            date (str): Purchase date.
+        Returns:
+            float: Predicted rating.
+        """
+        return self._predict_rows(user, item, to_days(date))
+
+    def predict_batch(self, users, items, dates, chunk_size=262144):
+        """
+        Predict ratings for many (user, item, date) triples at once.
+        IDs and dates are encoded in bulk and the factor rows are gathered chunk by chunk, so memory
+        stays bounded by chunk_size rather than by the number of rows.
+        Args:
+            users (array-like): User IDs.
+            items (array-like): Product IDs.
+            dates (array-like or scalar): Purchase dates, or a single date shared by every row.
+            chunk_size (int): Number of rows scored per vectorized chunk.
+        Returns:
+            np.ndarray: Predicted ratings.
+        """
+        users, items = self.encode_ids(users, items)
+        return self.predict_batch_rows(users, items, dates, chunk_size)
+
+    def encode_ids(self, users, items):
+        """
+        Look up the parameter rows of many user and item IDs.
+        Args:
+            users (array-like): User IDs.
+            items (array-like): Product IDs.
+        Returns:
+            tuple: (user rows, item rows) as np.ndarray; unknown IDs map to UNKNOWN_ROW.
+        """
+        return self.user_index.encode(users), self.item_index.encode(items)
+
+    def predict_batch_rows(self, users, items, dates, chunk_size=262144):
+        """
+        Predict ratings for parameter rows already looked up with encode_ids.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            dates (array-like or scalar): Purchase dates, or a single date shared by every row.
+            chunk_size (int): Number of rows scored per vectorized chunk.
+        Returns:
+            np.ndarray: Predicted ratings.
+        """
+        return self.predict_encoded(users, items, np.broadcast_to(to_days(dates), users.shape), chunk_size)
+
+    def predict_encoded(self, users, items, days, chunk_size=262144):
+        """
+        Predict ratings for parameter rows and day numbers.
+        Args:
+            users (np.ndarray): User rows.
+            items (np.ndarray): Item rows.
+            days (np.ndarray): Day numbers.
+            chunk_size (int): Number of rows scored per vectorized chunk.
+        Returns:
+            np.ndarray: Predicted ratings.
+        """
+        preds = np.empty(len(users))
+        for start in range(0, len(users), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            bins, devs, day_cols = self._encode_time(users[chunk], days[chunk])
+            preds[chunk] = self._predict_encoded(users[chunk], items[chunk], bins, devs, day_cols)
+        return preds
+
+    def build_ann_index(self, n_lists=None, n_probe=8):
+        """
+        Build an approximate nearest-neighbour (IVF) index over the item factors for score_catalog.
+        Item vectors are augmented with the static item bias so the coarse search already accounts for it.
+        Args:
+            n_lists (int): Number of IVF lists; defaults to sqrt(number of items).
+            n_probe (int): Number of lists scanned per query.
+        Returns:
+            IVFIndex: The built index, also kept on the model.
+        """
+        from models.ann_index import IVFIndex
+
+        rows = np.arange(1, len(self.item_bias))
+        vectors = np.hstack([self.item_vectors(slice(1, None)), np.asarray(self.item_bias[1:])[:, None]])
+        self.ann_index = IVFIndex(n_lists=n_lists, n_probe=n_probe).build(vectors, rows)
+        return self.ann_index
+
+    def score_catalog(self, user, date, k=10, use_ann=False, n_probe=None):
+        """
+        Find the k products a user is predicted to rate highest on a date.
+        All item scores come from one matrix-vector product plus the item bias vectors, and the top k are
+        selected with argpartition. With use_ann only the items in the probed IVF lists are scored.
+        Args:
+            user (str): User ID.
+            date (str): Purchase date.
+            k (int): Number of products to return.
+            use_ann (bool): Score only approximate-nearest-neighbour candidates; builds the index if needed.
+            n_probe (int): Number of IVF lists to scan; defaults to the index setting.
+        Returns:
+            tuple: (product IDs, predicted ratings) ordered from highest to lowest rating.
+        """
+        user = self.user_index.get(user)
+        bin_, user_time_bias = self._user_time_terms(user, to_days(date))
+        user_factors = self.user_factors[user]
+
+        if use_ann:
+            if self.ann_index is None:
+                self.build_ann_index()
+            rows = self.ann_index.candidates(np.append(user_factors, 1.0), n_probe)
+        else:
+            rows = slice(1, None)
+        scores = (self.global_mean + self.user_bias[user] + user_time_bias + self.item_bias[rows]
+                  + self.item_bin_bias[rows, bin_] + self._catalog_dots(rows, user_factors))
+        rows = np.arange(1, len(self.item_bias)) if isinstance(rows, slice) else rows
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return [], np.empty(0)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        ids = self.item_index.ids
+        return [ids[row - 1] for row in rows[top]], scores[top]
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled model, converting legacy dict-based parameters to arrays.
+        Args:
+            state (dict): Pickled instance attributes.
+        """
+        self.__dict__.update(state)
+        self.__dict__.setdefault('ann_index', None)
+        for name, value in (('lr_schedule', 'constant'), ('lr_decay', 0.95), ('lr_step', 10), ('best_epoch', None),
+                            ('dtype', 'float64'), ('item_quantization', None), ('item_codes', None),
+                            ('item_scales', None)):
+            self.__dict__.setdefault(name, value)
+        if isinstance(self.user_factors, dict):
+            self._migrate_dict_params()
+        if getattr(self, 'version', None) is None:
+            self.version = uuid.uuid4().hex
+
+    def _migrate_dict_params(self):
+        """
+        Convert parameters stored in per-ID dicts into the array-backed layout.
+        Legacy per-date user offsets become per-user-day offsets, and legacy per-date item offsets are
+        averaged into the item time bins.
+        """
+        user_factors, item_factors = self.user_factors, self.item_factors
+        user_bias, item_bias = self.user_bias, self.item_bias
+        user_time_bias = self.__dict__.pop('user_time_bias')
+        item_time_bias = self.__dict__.pop('item_time_bias')
+        defaults = TimeAwareFactorModel(self.n_factors, self.lr, self.reg, self.n_epochs, user_day_bias=True)
+        for name, value in vars(defaults).items():
+            self.__dict__.setdefault(name, value)
+        self.use_user_day_bias = True
+        self._init_params(user_factors, item_factors)
+
+        for index, factors, bias, new_factors, new_bias in (
+                (self.user_index, user_factors, user_bias, self.user_factors, self.user_bias),
+                (self.item_index, item_factors, item_bias, self.item_factors, self.item_bias)):
+            for id_, row in index.rows.items():
+                new_factors[row] = factors[id_]
+                new_bias[row] = bias.get(id_, 0)
+
+        def flatten(index, time_bias):
+            rows, days, values = [], [], []
+            for id_, by_date in time_bias.items():
+                for date, value in by_date.items():
+                    rows.append(index.get(id_))
+                    days.append(to_days(date))
+                    values.append(value)
+            return (np.asarray(rows, dtype=np.int64), np.asarray(days, dtype=np.int64),
+                    np.asarray(values, dtype=np.float64))
+
+        users, user_days, user_values = flatten(self.user_index, user_time_bias)
+        items, item_days, item_values = flatten(self.item_index, item_time_bias)
+        # Item dates are attributed to the unknown-user row so they only widen the time axis
+        self._init_time_params(np.concatenate([users, np.full(len(items), UNKNOWN_ROW)]),
+                               np.concatenate([user_days, item_days]))
+        self.user_day_bias[users, user_days - self.day_min + 1] = user_values
+        bins = np.clip((item_days - self.day_min) // self.bin_width, 0, self.n_bins - 1)
+        totals = np.zeros_like(self.item_bin_bias)
+        counts = np.zeros_like(self.item_bin_bias)
+        np.add.at(totals, (items, bins), item_values)
+        np.add.at(counts, (items, bins), 1)
+        self.item_bin_bias = totals / np.maximum(counts, 1)
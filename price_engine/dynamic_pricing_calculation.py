@@ -1,54 +1,294 @@
 import logging
 import pickle
-from config.config_settings import get_config
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from models.model_artifact import is_artifact, load_artifact
+from models.time_aware_factor_model import UNKNOWN_ROW
+from price_engine.price_table import is_price_table, load_price_table
+from price_engine.pricing_rules import PricingRules
+from utils.time_parsing import parse_hour
+from utils.logger import HOT_PATH
+from utils.metrics import metrics
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+
+class PredictionCache:
+    """
+    Bounded, thread-safe cache of predicted ratings.
+    Entries are keyed by (model version, user, product, date), expire after ttl_seconds and are evicted
+    least-recently-used first once max_size entries are held.
+    """
+    def __init__(self, max_size=100000, ttl_seconds=300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """
+        Look up cached predictions.
+        Args:
+            keys (list): Cache keys.
+        Returns:
+            list: Cached prediction for each key, or None on a miss.
+        """
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    values.append(None)
+                    self.misses += 1
+        return values
+
+    def put_many(self, keys, values):
+        """
+        Store predictions, evicting the least recently used entries beyond max_size.
+        Args:
+            keys (list): Cache keys.
+            values (list): Predictions matching the keys.
+        """
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = (value, expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def configure(self, max_size, ttl_seconds):
+        """
+        Resize the cache and change the entry lifetime; existing entries are dropped.
+        Args:
+            max_size (int): Maximum number of cached predictions.
+            ttl_seconds (float): Lifetime of a cached prediction in seconds.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clear()
+
+    def clear(self):
+        """
+        Drop every cached prediction.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Report cache size and hit/miss counters.
+        Returns:
+            dict: Size, capacity, TTL, hits, misses and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+# Process-wide prediction cache, cleared whenever a model is loaded
+prediction_cache = PredictionCache()
+
+# Process-wide compiled pricing rules, replaced by configure_pricing_rules
+pricing_rules = PricingRules()
+
+def configure_pricing_rules(rules):
+    """
+    Compile pricing rules from configuration and use them for every later price.
+    Args:
+        rules (dict): Rule configuration with a 'default' tier table and optional segment 'tables'.
+    Returns:
+        PricingRules: The compiled rules.
+    """
+    global pricing_rules
+    pricing_rules = PricingRules(rules)
+    return pricing_rules
+
+# Process-wide materialized price table checked before the model, replaced by configure_price_table
+price_table = None
+
+def configure_price_table(path):
+    """
+    Memory-map a price table built by price_engine/materialize_prices.py and serve its hits without the model.
+    Args:
+        path (str): Table directory; None or a missing table prices every request live.
+    Returns:
+        PriceTable: The loaded table, or None.
+    """
+    global price_table
+    if path and is_price_table(path):
+        price_table = load_price_table(path)
+    else:
+        if path:
+            logger.info("No price table at %s, every price is predicted live", path)
+        price_table = None
+    return price_table
+
+def purchase_hours(purchase_times):
+    """
+    Parse the hour of day of many purchase times.
+    Args:
+        purchase_times (array-like): HH:MM times; None entries mark an unknown time.
+    Returns:
+        list: Hours, -1 for unknown times.
+    """
+    return [-1 if purchase_time is None else parse_hour(purchase_time) for purchase_time in purchase_times]
+
 def load_model(model_path):
     """
     Load the trained model from disk.
+    Artifact directories are memory-mapped; legacy .pkl files are unpickled.
     Args:
         model_path (str): Path to the saved model.
     Returns:
         model: Loaded model.
     """
     try:
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        logger.info(f"Model loaded from {model_path}")
+        if is_artifact(model_path):
+            model = load_artifact(model_path)
+        else:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+        prediction_cache.clear()
+        logger.info("Model loaded from %s", model_path)
         return model
     except Exception as e:
-        logger.error(f"Error loading the model: {e}")
+        logger.error("Error loading the model: %s", e)
         raise
 
-def apply_pricing_rules(base_price, predicted_rating):
+def apply_pricing_rules(base_price, predicted_rating, category=None, location=None, hour=None):
     """
     Apply business rules to adjust the base price based on the predicted rating.
+    The tier table is chosen by category, location and hour of day; see PricingRules.
     Args:
         base_price (float): Base price of the product.
         predicted_rating (float): Predicted rating from the model.
+        category (str): Product category.
+        location (str): Purchase location.
+        hour (int): Hour of day of the purchase.
     Returns:
         float: Adjusted price after applying pricing rules.
     """
     try:
-        logger.info(f"Applying pricing rules for base price: {base_price}, predicted rating: {predicted_rating}")
+        logger.info("Applying pricing rules for base price: %s, predicted rating: %s", base_price, predicted_rating,
+                    extra=HOT_PATH)
 
-        # Example pricing rule: Adjust price based on predicted rating
-        if predicted_rating >= 4.5:
-            final_price = base_price * 1.20  # Increase by 20% for high predicted ratings
-        elif predicted_rating >= 3.0:
-            final_price = base_price * 1.10  # Increase by 10% for moderate predicted ratings
-        else:
-            final_price = base_price * 0.90  # Decrease by 10% for low predicted ratings
+        # Adjust the price by the multiplier of the predicted rating's tier
+        final_price = base_price * pricing_rules.multiplier(predicted_rating, category, location, hour)
 
-        logger.info(f"Final price after applying rules: {final_price}")
+        logger.info("Final price after applying rules: %s", final_price, extra=HOT_PATH)
         return final_price
     except Exception as e:
-        logger.error(f"Error applying pricing rules: {e}")
+        logger.error("Error applying pricing rules: %s", e)
+        raise
+
+def apply_pricing_rules_batch(base_prices, predicted_ratings, categories=None, locations=None, hours=None):
+    """
+    Apply the pricing rules to many prices at once with vectorized threshold selection.
+    Args:
+        base_prices (array-like): Base prices of the products.
+        predicted_ratings (array-like): Predicted ratings from the model.
+        categories (array-like): Product categories, or None.
+        locations (array-like): Purchase locations, or None.
+        hours (array-like): Hours of day of the purchases (-1 for unknown), or None.
+    Returns:
+        np.ndarray: Adjusted prices after applying pricing rules.
+    """
+    try:
+        multipliers = pricing_rules.multipliers_for(predicted_ratings, categories, locations, hours)
+        return np.asarray(base_prices, dtype=np.float64) * multipliers
+    except Exception as e:
+        logger.error("Error applying pricing rules to a batch: %s", e)
         raise
 
-def calculate_price(model, user_id, product_id, purchase_date, base_price):
+def predict_ratings(model, user_ids, product_ids, purchase_dates, use_cache=True, use_table=True):
+    """
+    Predict ratings for many (user, product, date) triples, serving precomputed ones from the price table and
+    repeats from the prediction cache.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        user_ids (array-like): User IDs.
+        product_ids (array-like): Product IDs.
+        purchase_dates (array-like or str): Dates of purchase, or one date shared by every row.
+        use_cache (bool): Whether to read and populate the prediction cache.
+        use_table (bool): Whether to read the price table first.
+    Returns:
+        np.ndarray: Predicted ratings, in input order.
+    """
+    if use_table and price_table is not None:
+        with metrics.stage('lookup'):
+            predicted_ratings = price_table.lookup(user_ids, product_ids, purchase_dates, model.version)
+        missing = np.flatnonzero(np.isnan(predicted_ratings))
+        if len(missing):
+            if np.ndim(purchase_dates) != 0:
+                purchase_dates = [purchase_dates[idx] for idx in missing]
+            predicted_ratings[missing] = predict_ratings(model, [user_ids[idx] for idx in missing],
+                                                         [product_ids[idx] for idx in missing], purchase_dates,
+                                                         use_cache, use_table=False)
+        return predicted_ratings
+
+    if not use_cache:
+        return predict_uncached(model, user_ids, product_ids, purchase_dates)
+
+    with metrics.stage('lookup'):
+        if np.ndim(purchase_dates) == 0:
+            purchase_dates = [purchase_dates] * len(user_ids)
+        keys = [(model.version, user_id, product_id, purchase_date)
+                for user_id, product_id, purchase_date in zip(user_ids, product_ids, purchase_dates)]
+        cached = prediction_cache.get_many(keys)
+        predicted_ratings = np.array([np.nan if value is None else value for value in cached], dtype=np.float64)
+
+    # Predict each distinct missing key once, even if it repeats within the batch
+    missing = [idx for idx, value in enumerate(cached) if value is None]
+    if missing:
+        slots = {}
+        for idx in missing:
+            slots.setdefault(keys[idx], len(slots))
+        unique_keys = list(slots)
+        predictions = predict_uncached(model, [key[1] for key in unique_keys], [key[2] for key in unique_keys],
+                                       [key[3] for key in unique_keys])
+        predicted_ratings[missing] = predictions[[slots[keys[idx]] for idx in missing]]
+        prediction_cache.put_many(unique_keys, predictions.tolist())
+    return predicted_ratings
+
+def predict_uncached(model, user_ids, product_ids, purchase_dates):
+    """
+    Predict ratings with the model, timing the ID lookup and the prediction and counting unknown IDs.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        user_ids (array-like): User IDs.
+        product_ids (array-like): Product IDs.
+        purchase_dates (array-like or str): Dates of purchase, or one date shared by every row.
+    Returns:
+        np.ndarray: Predicted ratings.
+    """
+    with metrics.stage('lookup'):
+        user_rows, item_rows = model.encode_ids(user_ids, product_ids)
+    # Unknown IDs fall back to the shared zero row, i.e. to the bias-only prediction
+    metrics.inc('pricing_unknown_users_total', int(np.count_nonzero(user_rows == UNKNOWN_ROW)))
+    metrics.inc('pricing_unknown_items_total', int(np.count_nonzero(item_rows == UNKNOWN_ROW)))
+    with metrics.stage('predict'):
+        return model.predict_batch_rows(user_rows, item_rows, purchase_dates)
+
+def calculate_price(model, user_id, product_id, purchase_date, base_price, category=None, location=None,
+                    purchase_time=None):
     """
     Calculate the dynamic price for a given product based on model predictions and pricing rules.
     Args:
@@ -57,31 +297,127 @@ def calculate_price(model, user_id, product_id, purchase_date, base_price):
         product_id (str): Product ID.
         purchase_date (str): Date of purchase.
         base_price (float): Base price of the product.
+        category (str): Product category, selecting category-specific pricing tiers.
+        location (str): Purchase location, selecting location-specific pricing tiers.
+        purchase_time (str): Time of purchase as HH:MM, selecting time-of-day pricing tiers.
     Returns:
         float: Final dynamic price for the product.
     """
     try:
-        logger.info(f"Calculating price for User: {user_id}, Product: {product_id}, Date: {purchase_date}")
+        logger.info("Calculating price for User: %s, Product: %s, Date: %s", user_id, product_id, purchase_date,
+                    extra=HOT_PATH)
 
-        # Predict the rating
-        predicted_rating = model.predict(user_id, product_id, purchase_date)
+        # Predict the rating, reusing a precomputed or cached prediction when available
+        with metrics.stage('lookup'):
+            predicted_rating = None
+            if price_table is not None:
+                predicted_rating = price_table.lookup_one(user_id, product_id, purchase_date, model.version)
+            key = (model.version, user_id, product_id, purchase_date)
+            if predicted_rating is None:
+                predicted_rating = prediction_cache.get_many([key])[0]
+        if predicted_rating is None:
+            # Look each ID up once, for both the prediction and the unknown-ID counters
+            with metrics.stage('lookup'):
+                user_row, item_row = model.user_index.get(user_id), model.item_index.get(product_id)
+            metrics.inc('pricing_unknown_users_total', int(user_row == UNKNOWN_ROW))
+            metrics.inc('pricing_unknown_items_total', int(item_row == UNKNOWN_ROW))
+            with metrics.stage('predict'):
+                predicted_rating = model.predict_row(user_row, item_row, purchase_date)
+            prediction_cache.put_many([key], [predicted_rating])
 
         # Apply pricing rules
-        final_price = apply_pricing_rules(base_price, predicted_rating)
+        with metrics.stage('rules'):
+            hour = None if purchase_time is None else parse_hour(purchase_time)
+            final_price = apply_pricing_rules(base_price, predicted_rating, category, location, hour)
 
-        logger.info(f"Calculated price for User: {user_id}, Product: {product_id} is {final_price}")
+        logger.info("Calculated price for User: %s, Product: %s is %s", user_id, product_id, final_price,
+                    extra=HOT_PATH)
         return final_price
     except Exception as e:
-        logger.error(f"Error calculating price for User: {user_id}, Product: {product_id}: {e}")
+        logger.error("Error calculating price for User: %s, Product: %s: %s", user_id, product_id, e)
+        raise
+
+def calculate_prices(model, user_ids, product_ids, purchase_dates, base_prices, categories=None, locations=None,
+                     purchase_times=None, use_cache=True):
+    """
+    Calculate dynamic prices for many products with one batched model prediction.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        user_ids (array-like): User IDs.
+        product_ids (array-like): Product IDs.
+        purchase_dates (array-like or str): Dates of purchase, or one date shared by every row.
+        base_prices (array-like): Base prices of the products.
+        categories (array-like): Product categories, or None.
+        locations (array-like): Purchase locations, or None.
+        purchase_times (array-like): HH:MM purchase times (None entries for unknown), or None.
+        use_cache (bool): Whether to use the prediction cache; disable for large offline batches.
+    Returns:
+        np.ndarray: Final dynamic prices, in input order.
+    """
+    try:
+        logger.info("Calculating %d prices in one batch", len(user_ids), extra=HOT_PATH)
+        predicted_ratings = predict_ratings(model, user_ids, product_ids, purchase_dates, use_cache)
+        with metrics.stage('rules'):
+            hours = None if purchase_times is None else purchase_hours(purchase_times)
+            return apply_pricing_rules_batch(base_prices, predicted_ratings, categories, locations, hours)
+    except Exception as e:
+        logger.error("Error calculating a batch of %d prices: %s", len(user_ids), e)
         raise
 
+def score_catalog(model, user_id, purchase_date, k=10, use_ann=False, n_probe=None):
+    """
+    Find the products a user is predicted to rate highest, e.g. to pick which ones carry a premium.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        user_id (str): User ID.
+        purchase_date (str): Date of purchase.
+        k (int): Number of products to return.
+        use_ann (bool): Use the approximate nearest-neighbour index instead of scoring the whole catalog.
+        n_probe (int): Number of index lists scanned with use_ann; more lists trade speed for recall.
+    Returns:
+        list: (product ID, predicted rating) pairs, highest rating first.
+    """
+    try:
+        product_ids, predicted_ratings = model.score_catalog(user_id, purchase_date, k, use_ann=use_ann,
+                                                             n_probe=n_probe)
+        return list(zip(product_ids, predicted_ratings.tolist()))
+    except Exception as e:
+        logger.error("Error scoring the catalog for User: %s: %s", user_id, e)
+        raise
+
+def price_catalog(model, user_id, purchase_date, base_prices, k=10, use_ann=False, n_probe=None):
+    """
+    Pre-price a user's top-k recommendation slate.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        user_id (str): User ID.
+        purchase_date (str): Date of purchase.
+        base_prices (dict): Base price per product ID; products without one are returned unpriced.
+        k (int): Number of products to return.
+        use_ann (bool): Use the approximate nearest-neighbour index instead of scoring the whole catalog.
+        n_probe (int): Number of index lists scanned with use_ann.
+    Returns:
+        list: Dicts with product_id, predicted_rating and final_price (None without a base price).
+    """
+    slate = score_catalog(model, user_id, purchase_date, k, use_ann, n_probe)
+    priced = [(product_id, rating) for product_id, rating in slate if product_id in base_prices]
+    final_prices = dict(zip(
+        (product_id for product_id, _ in priced),
+        apply_pricing_rules_batch([base_prices[product_id] for product_id, _ in priced],
+                                  [rating for _, rating in priced]).tolist()
+    ))
+    return [{'product_id': product_id, 'predicted_rating': rating, 'final_price': final_prices.get(product_id)}
+            for product_id, rating in slate]
+
 if __name__ == '__main__':
+    from config.config_settings import get_config
+
     # Load configuration
     CONFIG_PATH = 'config/development.yaml'
     config = get_config(CONFIG_PATH)
 
     # Load trained model
-    model_path = 'models/trained_model.pkl'
+    model_path = 'models/trained_model'
     model = load_model(model_path)
 
     # Example
@@ -0,0 +1,186 @@
+"""
+materialize_prices.py - Precompute prices for hot (user, product) pairs into a price table.
+
+Objective:
+    Most pricing traffic comes from a small set of frequent buyers and popular products, whose prices only change
+    when the model or the rules change. This batch job predicts their ratings for the next days once, with the same
+    model and pricing rules as live pricing, and writes them to a sorted, memory-mapped price table that the API
+    checks before calling the model.
+
+Integration with Other Files:
+    - price_engine/price_table.py stores and looks up the table.
+    - price_engine/dynamic_pricing_calculation.py serves table hits and prices misses live.
+    - Settings come from the pricing.price_table section of the configuration.
+
+Usage:
+    python -m price_engine.materialize_prices
+"""
+
+import logging
+import time
+import numpy as np
+import pandas as pd
+from models.time_aware_factor_model import to_days
+from price_engine.dynamic_pricing_calculation import apply_pricing_rules_batch
+from price_engine.price_table import PriceTable, save_price_table
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+
+def most_frequent(values, n):
+    """
+    Find the most frequent values, ties broken by value.
+    Args:
+        values (pd.Series): Values, one per purchase.
+        n (int): Number of values to return; None returns all of them.
+    Returns:
+        np.ndarray: Up to n values, most frequent first.
+    """
+    counts = values.groupby(values).size().sort_values(ascending=False, kind='stable')
+    return counts.index[:n].to_numpy()
+
+
+def select_hot_pairs(data, hot_users=1000, hot_products=200, segment_column=None):
+    """
+    Select the (user, product) pairs to precompute: the cross product of the most frequent buyers and the most
+    purchased products, optionally per segment.
+    Args:
+        data (pd.DataFrame): Purchase history with User_ID and Product_ID.
+        hot_users (int): Number of users per segment; None takes every user.
+        hot_products (int): Number of products per segment; None takes every product.
+        segment_column (str): Column splitting the history into segments, e.g. Location; None uses one segment.
+    Returns:
+        tuple: (user IDs, product IDs) of the distinct pairs as np.ndarray.
+    """
+    groups = [data] if segment_column is None else [group for _, group in data.groupby(segment_column)]
+    pairs = []
+    for group in groups:
+        users = most_frequent(group['User_ID'], hot_users)
+        products = most_frequent(group['Product_ID'], hot_products)
+        pairs.append(pd.DataFrame({'User_ID': np.repeat(users, len(products)),
+                                   'Product_ID': np.tile(products, len(users))}))
+    pairs = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    logger.info("Selected %d hot pairs from %d segments", len(pairs), len(groups))
+    return pairs['User_ID'].to_numpy(dtype=str), pairs['Product_ID'].to_numpy(dtype=str)
+
+
+def product_base_prices(data):
+    """
+    Estimate each product's base price as the median price paid for it.
+    Args:
+        data (pd.DataFrame): Raw purchase history with Product_ID and Price_Paid.
+    Returns:
+        dict: Product ID -> base price.
+    """
+    return data.groupby('Product_ID')['Price_Paid'].median().to_dict()
+
+
+def build_price_table(model, user_ids, product_ids, base_prices, start_date=None, days_ahead=7, chunk_size=100000):
+    """
+    Predict the ratings and prices of (user, product) pairs for every day of a date range.
+    Entries are generated in key order, so the table needs no sort.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        user_ids (np.ndarray): User ID of each pair.
+        product_ids (np.ndarray): Product ID of each pair.
+        base_prices (dict): Base price per product ID; products without one get NaN prices.
+        start_date (str): First date covered; today when not given.
+        days_ahead (int): Number of days covered.
+        chunk_size (int): Number of entries predicted per vectorized chunk.
+    Returns:
+        PriceTable: In-memory table for the model's version.
+    """
+    started = time.perf_counter()
+    start_day = to_days(np.datetime64('today') if start_date is None else start_date)
+    table_users, user_codes = np.unique(np.asarray(user_ids, dtype=str), return_inverse=True)
+    table_products, product_codes = np.unique(np.asarray(product_ids, dtype=str), return_inverse=True)
+    pair_keys = np.unique(user_codes.astype(np.int64) * len(table_products) + product_codes)
+    pair_users, pair_products = np.divmod(pair_keys, len(table_products))
+
+    # Look the IDs up in the model once instead of once per day
+    user_rows, item_rows = model.encode_ids(table_users, table_products)
+    product_prices = np.array([base_prices.get(product_id, np.nan) for product_id in table_products],
+                              dtype=np.float64)
+
+    n_entries = len(pair_keys) * days_ahead
+    keys = (pair_keys[:, None] * days_ahead + np.arange(days_ahead)).ravel()
+    ratings = np.empty(n_entries)
+    prices = np.empty(n_entries)
+    for start in range(0, n_entries, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        pairs, days = np.divmod(np.arange(start, min(start + chunk_size, n_entries)), days_ahead)
+        ratings[chunk] = model.predict_encoded(user_rows[pair_users[pairs]], item_rows[pair_products[pairs]],
+                                               start_day + days)
+        prices[chunk] = apply_pricing_rules_batch(product_prices[pair_products[pairs]], ratings[chunk])
+
+    seconds = time.perf_counter() - started
+    build = {
+        'pairs': len(pair_keys),
+        'users': len(table_users),
+        'products': len(table_products),
+        'days': days_ahead,
+        'seconds': seconds,
+        'entries_per_sec': n_entries / max(seconds, 1e-9),
+    }
+    logger.info("Built %d price table entries in %.2f s (%.0f entries/s)", n_entries, seconds,
+                build['entries_per_sec'])
+    return PriceTable(table_users, table_products, keys, ratings, prices, product_prices, model.version,
+                      start_day, days_ahead, build)
+
+
+def history_hit_rate(table, data):
+    """
+    Estimate the table's hit rate on traffic shaped like the purchase history: the share of purchases whose
+    (user, product) pair is precomputed.
+    Args:
+        table (PriceTable): Price table.
+        data (pd.DataFrame): Purchase history with User_ID and Product_ID.
+    Returns:
+        float: Share of purchases covered by the table.
+    """
+    if not len(data):
+        return 0.0
+    return float(table.contains_pairs(data['User_ID'].to_numpy(), data['Product_ID'].to_numpy()).mean())
+
+
+def materialize_prices(model, data, path, settings):
+    """
+    Select the hot set from the purchase history, build its price table and save it.
+    Args:
+        model: Trained Time-Aware Factor Model.
+        data (pd.DataFrame): Raw purchase history.
+        path (str): Table directory to create or replace.
+        settings (dict): The pricing.price_table configuration section.
+    Returns:
+        dict: Build report with throughput and the history hit rate.
+    """
+    user_ids, product_ids = select_hot_pairs(data, settings.get('hot_users', 1000),
+                                             settings.get('hot_products', 200), settings.get('segment_column'))
+    table = build_price_table(model, user_ids, product_ids, product_base_prices(data), settings.get('start_date'),
+                              settings.get('days_ahead', 7), settings.get('chunk_size', 100000))
+    table.build['history_hit_rate'] = history_hit_rate(table, data)
+    save_price_table(table, path)
+    return dict(table.build, entries=len(table), model_version=table.model_version)
+
+
+if __name__ == '__main__':
+    from config.config_settings import get_config
+    from data.data_loader import load_data
+    from price_engine.dynamic_pricing_calculation import configure_pricing_rules, load_model
+    from utils.logger import setup_logging
+
+    setup_logging()
+
+    # Load configuration
+    CONFIG_PATH = 'config/development.yaml'
+    config = get_config(CONFIG_PATH)
+    configure_pricing_rules(config['pricing'].get('rules'))
+    table_config = config['pricing'].get('price_table', {})
+
+    model = load_model(config['api'].get('model_path', 'models/trained_model'))
+    data = load_data('data/Customer_Purchase_History.xlsx', columns=['User_ID', 'Product_ID', 'Price_Paid',
+                                                                    'Location'])
+
+    report = materialize_prices(model, data, table_config.get('path') or 'models/price_table', table_config)
+    print(report)
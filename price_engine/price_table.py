@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+from models.time_aware_factor_model import to_days
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes incompatibly
+TABLE_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+# Arrays of a price table, each stored as one .npy file
+TABLE_ARRAYS = ('user_ids', 'product_ids', 'keys', 'ratings', 'prices', 'base_prices')
+# Code of IDs and days the table does not cover
+MISSING_CODE = -1
+
+
+class PriceTable:
+    """
+    Sorted, memory-mapped table of precomputed ratings and prices for hot (user, product, day) keys.
+
+    Users and products are numbered by their position in sorted ID arrays, and every entry is keyed by one int64
+    (user_code * n_products + product_code) * n_days + (day - start_day), kept in ascending order. A lookup is two
+    dict lookups for the codes and one binary search over the keys; a dense table, holding the full cross product
+    of its users, products and days, needs no search since every key equals its position.
+
+    The table stores the predicted rating of every key next to the price at the product's base price, and is only
+    valid for the model version it was built from. Serving reads the rating and applies the pricing rules to the
+    request's own base price and segment, so changing the rules does not require a rebuild.
+    """
+    def __init__(self, user_ids, product_ids, keys, ratings, prices, base_prices, model_version, start_day, n_days,
+                 build=None):
+        """
+        Args:
+            user_ids (np.ndarray): Sorted user IDs.
+            product_ids (np.ndarray): Sorted product IDs.
+            keys (np.ndarray): Sorted entry keys.
+            ratings (np.ndarray): Predicted rating of each key.
+            prices (np.ndarray): Price of each key at its product's base price under the default pricing rules.
+            base_prices (np.ndarray): Base price of each product, aligned with product_ids.
+            model_version (str): Version of the model the ratings were predicted with.
+            start_day (int): First day number covered.
+            n_days (int): Number of days covered.
+            build (dict): Build statistics.
+        """
+        self.user_ids = user_ids
+        self.product_ids = product_ids
+        self.keys = keys
+        self.ratings = ratings
+        self.prices = prices
+        self.base_prices = base_prices
+        self.model_version = model_version
+        self.start_day = start_day
+        self.n_days = n_days
+        self.build = build or {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.dense = len(keys) == len(user_ids) * len(product_ids) * n_days
+        self._lock = threading.Lock()
+        # ID -> code dicts, built on first lookup
+        self._user_codes = None
+        self._product_codes = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _code_dicts(self):
+        """
+        Get the ID -> code dicts of users and products, building them on first use.
+        Returns:
+            tuple: (user codes, product codes) as dicts.
+        """
+        if self._user_codes is None:
+            self._product_codes = {product: code for code, product in enumerate(self.product_ids.tolist())}
+            self._user_codes = {user: code for code, user in enumerate(self.user_ids.tolist())}
+        return self._user_codes, self._product_codes
+
+    @staticmethod
+    def _codes(codes, ids):
+        """
+        Look up the codes of many IDs.
+        Args:
+            codes (dict): ID -> code.
+            ids (array-like): IDs to look up.
+        Returns:
+            np.ndarray: Codes, MISSING_CODE for IDs not in the table.
+        """
+        return np.fromiter((codes.get(id_, MISSING_CODE) for id_ in ids), dtype=np.int64, count=len(ids))
+
+    def _positions(self, keys):
+        """
+        Find the entry position of many keys.
+        Args:
+            keys (np.ndarray): Keys of covered triples.
+        Returns:
+            tuple: (positions, found) as np.ndarray.
+        """
+        if self.dense:
+            return keys, np.ones(len(keys), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return pos, self.keys[pos] == keys
+
+    def encode(self, user_ids, product_ids, purchase_dates):
+        """
+        Compute the table keys of many (user, product, date) triples.
+        Args:
+            user_ids (array-like): User IDs.
+            product_ids (array-like): Product IDs.
+            purchase_dates (array-like or str): Dates of purchase, or one date shared by every row.
+        Returns:
+            tuple: (keys, covered) as np.ndarray; keys of uncovered triples are meaningless.
+        """
+        user_codes, product_codes = self._code_dicts()
+        users = self._codes(user_codes, user_ids)
+        products = self._codes(product_codes, product_ids)
+        days = np.broadcast_to(to_days(purchase_dates), users.shape) - self.start_day
+        covered = (users != MISSING_CODE) & (products != MISSING_CODE) & (days >= 0) & (days < self.n_days)
+        keys = (users * len(self.product_ids) + products) * self.n_days + days
+        return keys, covered
+
+    def contains_pairs(self, user_ids, product_ids):
+        """
+        Check which (user, product) pairs have entries, on any day.
+        Args:
+            user_ids (array-like): User IDs.
+            product_ids (array-like): Product IDs.
+        Returns:
+            np.ndarray: True for pairs in the table.
+        """
+        user_codes, product_codes = self._code_dicts()
+        users = self._codes(user_codes, user_ids)
+        products = self._codes(product_codes, product_ids)
+        covered = (users != MISSING_CODE) & (products != MISSING_CODE)
+        contained = np.zeros(len(users), dtype=bool)
+        if len(self.keys):
+            # Every pair has an entry for each day, so the first day's key is present
+            _, found = self._positions((users[covered] * len(self.product_ids) + products[covered]) * self.n_days)
+            contained[covered] = found
+        return contained
+
+    def lookup_one(self, user_id, product_id, purchase_date, model_version=None):
+        """
+        Look up one precomputed rating with dict lookups and at most one binary search.
+        Args:
+            user_id (str): User ID.
+            product_id (str): Product ID.
+            purchase_date (str): Date of purchase.
+            model_version (str): Version of the serving model; a table built from another version never hits.
+        Returns:
+            float: Predicted rating, or None if the key is not in the table.
+        """
+        rating = None
+        if model_version is None or model_version == self.model_version:
+            user_codes, product_codes = self._code_dicts()
+            user = user_codes.get(user_id)
+            product = product_codes.get(product_id)
+            day = to_days(purchase_date) - self.start_day
+            if user is not None and product is not None and 0 <= day < self.n_days:
+                key = (user * len(self.product_ids) + product) * self.n_days + day
+                pos = key if self.dense else int(np.searchsorted(self.keys, key))
+                if pos < len(self.keys) and self.keys[pos] == key:
+                    rating = float(self.ratings[pos])
+        with self._lock:
+            if rating is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                if model_version is not None and model_version != self.model_version:
+                    self.stale += 1
+        return rating
+
+    def lookup(self, user_ids, product_ids, purchase_dates, model_version=None):
+        """
+        Look up precomputed ratings.
+        Args:
+            user_ids (array-like): User IDs.
+            product_ids (array-like): Product IDs.
+            purchase_dates (array-like or str): Dates of purchase, or one date shared by every row.
+            model_version (str): Version of the serving model; a table built from another version never hits.
+        Returns:
+            np.ndarray: Predicted ratings, NaN for keys not in the table.
+        """
+        n = len(user_ids)
+        ratings = np.full(n, np.nan)
+        if model_version is not None and model_version != self.model_version:
+            with self._lock:
+                self.stale += n
+                self.misses += n
+            return ratings
+        found = np.zeros(n, dtype=bool)
+        if len(self.keys) and n:
+            keys, covered = self.encode(user_ids, product_ids, purchase_dates)
+            pos, found[covered] = self._positions(keys[covered])
+            ratings[found] = self.ratings[pos[found[covered]]]
+        hits = int(np.count_nonzero(found))
+        with self._lock:
+            self.hits += hits
+            self.misses += n - hits
+        return ratings
+
+    def stats(self):
+        """
+        Report table size, build throughput and hit/miss counters.
+        Returns:
+            dict: Entries, model version, build rate, hits, misses, stale lookups and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.keys),
+            'model_version': self.model_version,
+            'build_entries_per_sec': self.build.get('entries_per_sec', 0.0),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def is_price_table(path):
+    """
+    Check whether a path holds a price table directory.
+    Args:
+        path (str): Table path.
+    Returns:
+        bool: True if the path is a price table.
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def save_price_table(table, path):
+    """
+    Save a price table as a directory of .npy arrays and a JSON manifest.
+    The directory is written next to the target and renamed into place, so readers never see a partially
+    written table.
+    Args:
+        table (PriceTable): Price table.
+        path (str): Table directory to create or replace.
+    """
+    path = os.path.normpath(path)
+    staging = f"{path}.tmp-{uuid.uuid4().hex}"
+    os.makedirs(staging)
+    try:
+        for name in TABLE_ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), np.ascontiguousarray(getattr(table, name)),
+                    allow_pickle=False)
+        manifest = {
+            'format_version': TABLE_FORMAT_VERSION,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'model_version': table.model_version,
+            'start_day': int(table.start_day),
+            'n_days': int(table.n_days),
+            'entries': len(table),
+            'build': table.build,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+        # Swap the finished directory into place
+        previous = None
+        if os.path.exists(path):
+            previous = f"{path}.old-{uuid.uuid4().hex}"
+            os.rename(path, previous)
+        os.rename(staging, path)
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+        logger.info("Price table with %d entries saved to %s", len(table), path)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_price_table(path, mmap=True):
+    """
+    Load a price table directory.
+    Args:
+        path (str): Table directory.
+        mmap (bool): Memory-map the arrays instead of reading them into memory.
+    Returns:
+        PriceTable: Loaded table.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as file:
+        manifest = json.load(file)
+    if manifest.get('format_version') != TABLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported price table format {manifest.get('format_version')} in {path}")
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None,
+                            allow_pickle=False)
+              for name in TABLE_ARRAYS}
+    table = PriceTable(model_version=manifest['model_version'], start_day=manifest['start_day'],
+                       n_days=manifest['n_days'], build=manifest.get('build'), **arrays)
+    logger.info("Loaded price table with %d entries for model %s from %s", len(table), table.model_version, path)
+    return table
@@ -0,0 +1,216 @@
+import logging
+import numpy as np
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Rating tiers used when no rules are configured: below 3.0 decrease by 10%, from 3.0 increase by 10%,
+# from 4.5 increase by 20%
+DEFAULT_RULES = {
+    'default': {'thresholds': [3.0, 4.5], 'multipliers': [0.90, 1.10, 1.20]},
+    'tables': [],
+}
+# Segment dimensions a tier table can be restricted to
+SEGMENT_KEYS = ('category', 'location', 'hours')
+HOURS_PER_DAY = 24
+
+
+class PricingRules:
+    """
+    Tiered pricing rules compiled into flat arrays.
+
+    Each tier table maps predicted-rating thresholds (ascending) to price multipliers; a rating at or above
+    thresholds[i] and below thresholds[i + 1] gets multipliers[i + 1]. Tables can be restricted to a category,
+    a location and an inclusive hour-of-day window, and the most specific matching table applies, ties going
+    to the table listed first.
+
+    Compilation resolves the applicable table for every (category, location, hour) combination into one
+    lookup array, and shifts each table's thresholds into a disjoint range of a single sorted array. Pricing is
+    then one O(1) table lookup plus one O(log tiers) searchsorted per price, for scalars and batches alike.
+    """
+    def __init__(self, rules=None):
+        """
+        Args:
+            rules (dict): Rule configuration with a 'default' tier table and a list of segment 'tables';
+                DEFAULT_RULES when not given.
+        """
+        rules = rules or DEFAULT_RULES
+        tables = [dict(rules['default'])] + [dict(table) for table in rules.get('tables') or []]
+        for i, table in enumerate(tables):
+            self._validate(table, i)
+        self.n_tables = len(tables)
+
+        # Segment vocabularies; code 0 stands for values no table mentions
+        self.category_codes = self._vocabulary(tables, 'category')
+        self.location_codes = self._vocabulary(tables, 'location')
+        self.table_lookup = self._compile_lookup(tables)
+
+        # Shift every table's thresholds into its own range of one sorted array
+        thresholds = [np.asarray(table['thresholds'], dtype=np.float64) for table in tables]
+        all_thresholds = np.concatenate(thresholds)
+        self._low = float(all_thresholds.min()) - 1.0 if len(all_thresholds) else -1.0
+        self._high = float(all_thresholds.max()) + 1.0 if len(all_thresholds) else 1.0
+        self._width = self._high - self._low + 1.0
+        self.thresholds = np.concatenate([
+            i * self._width + (table_thresholds - self._low) for i, table_thresholds in enumerate(thresholds)
+        ])
+        self.threshold_starts = np.cumsum([0] + [len(t) for t in thresholds])[:-1]
+        self.multipliers = np.concatenate([np.asarray(table['multipliers'], dtype=np.float64) for table in tables])
+        self.multiplier_starts = self.threshold_starts + np.arange(self.n_tables)
+        logger.info("Compiled %d pricing tier tables with %d thresholds", self.n_tables, len(self.thresholds))
+
+    @staticmethod
+    def _validate(table, index):
+        """
+        Check that a tier table is well formed.
+        Args:
+            table (dict): Tier table.
+            index (int): Position of the table, for error messages.
+        """
+        thresholds = table.get('thresholds', [])
+        multipliers = table.get('multipliers', [])
+        if len(multipliers) != len(thresholds) + 1:
+            raise ValueError(f"Pricing table {index} needs one more multiplier than thresholds")
+        if any(b <= a for a, b in zip(thresholds, thresholds[1:])):
+            raise ValueError(f"Pricing table {index} thresholds must be strictly ascending")
+        hours = table.get('hours')
+        if hours is not None and (len(hours) != 2 or not all(0 <= hour < HOURS_PER_DAY for hour in hours)):
+            raise ValueError(f"Pricing table {index} hours must be a [start, end] pair within 0-23")
+
+    @staticmethod
+    def _vocabulary(tables, key):
+        """
+        Number the distinct values of a segment key from 1.
+        Args:
+            tables (list): Tier tables.
+            key (str): Segment key.
+        Returns:
+            dict: Value -> code.
+        """
+        codes = {}
+        for table in tables:
+            if table.get(key) is not None:
+                codes.setdefault(table[key], len(codes) + 1)
+        return codes
+
+    def _compile_lookup(self, tables):
+        """
+        Resolve the applicable tier table for every (category, location, hour) combination.
+        Args:
+            tables (list): Tier tables, the default first.
+        Returns:
+            np.ndarray: Table index by category code, location code and hour (HOURS_PER_DAY for an unknown hour).
+        """
+        shape = (len(self.category_codes) + 1, len(self.location_codes) + 1, HOURS_PER_DAY + 1)
+        lookup = np.zeros(shape, dtype=np.int64)
+        specificity = np.full(shape, -1)
+        for i, table in enumerate(tables):
+            matches = np.ones(shape, dtype=bool)
+            score = 0
+            if table.get('category') is not None:
+                category = np.zeros(shape[0], dtype=bool)
+                category[self.category_codes[table['category']]] = True
+                matches &= category[:, None, None]
+                score += 1
+            if table.get('location') is not None:
+                location = np.zeros(shape[1], dtype=bool)
+                location[self.location_codes[table['location']]] = True
+                matches &= location[None, :, None]
+                score += 1
+            if table.get('hours') is not None:
+                start, end = table['hours']
+                hours = np.arange(shape[2])
+                # Windows may wrap around midnight, e.g. [22, 5]
+                window = (hours >= start) & (hours <= end) if start <= end else (hours >= start) | (hours <= end)
+                window[HOURS_PER_DAY] = False
+                matches &= window[None, None, :]
+                score += 1
+            better = matches & (score > specificity)
+            lookup[better] = i
+            specificity[better] = score
+        return lookup
+
+    def table_index(self, category=None, location=None, hour=None):
+        """
+        Find the tier table applying to one segment.
+        Args:
+            category (str): Product category.
+            location (str): Purchase location.
+            hour (int): Hour of day; None or out of range for an unknown hour.
+        Returns:
+            int: Table index.
+        """
+        if hour is None or not 0 <= hour < HOURS_PER_DAY:
+            hour = HOURS_PER_DAY
+        return int(self.table_lookup[self.category_codes.get(category, 0), self.location_codes.get(location, 0),
+                                     hour])
+
+    def table_indices(self, n, categories=None, locations=None, hours=None):
+        """
+        Find the tier table applying to each of many segments.
+        Args:
+            n (int): Number of prices.
+            categories (array-like): Product categories, or None.
+            locations (array-like): Purchase locations, or None.
+            hours (array-like): Hours of day (negative for unknown), or None.
+        Returns:
+            np.ndarray: Table index per price.
+        """
+        if self.n_tables == 1:
+            return np.zeros(n, dtype=np.int64)
+        category_codes = self._encode(categories, self.category_codes, n)
+        location_codes = self._encode(locations, self.location_codes, n)
+        if hours is None:
+            hour_codes = np.full(n, HOURS_PER_DAY)
+        else:
+            hour_codes = np.asarray(hours, dtype=np.int64)
+            hour_codes = np.where((hour_codes >= 0) & (hour_codes < HOURS_PER_DAY), hour_codes, HOURS_PER_DAY)
+        return self.table_lookup[category_codes, location_codes, hour_codes]
+
+    @staticmethod
+    def _encode(values, codes, n):
+        """
+        Encode segment values, mapping unknown or missing ones to 0.
+        Args:
+            values (array-like): Segment values, or None.
+            codes (dict): Value -> code.
+            n (int): Number of prices.
+        Returns:
+            np.ndarray: Codes.
+        """
+        if values is None or not codes:
+            return np.zeros(n, dtype=np.int64)
+        return np.fromiter((codes.get(value, 0) for value in values), dtype=np.int64, count=n)
+
+    def multiplier(self, predicted_rating, category=None, location=None, hour=None):
+        """
+        Look up the price multiplier for one predicted rating.
+        Args:
+            predicted_rating (float): Predicted rating.
+            category (str): Product category.
+            location (str): Purchase location.
+            hour (int): Hour of day.
+        Returns:
+            float: Price multiplier.
+        """
+        table = self.table_index(category, location, hour)
+        key = table * self._width + (min(max(predicted_rating, self._low), self._high) - self._low)
+        tier = int(np.searchsorted(self.thresholds, key, side='right')) - self.threshold_starts[table]
+        return float(self.multipliers[self.multiplier_starts[table] + tier])
+
+    def multipliers_for(self, predicted_ratings, categories=None, locations=None, hours=None):
+        """
+        Look up the price multipliers for many predicted ratings with one searchsorted.
+        Args:
+            predicted_ratings (array-like): Predicted ratings.
+            categories (array-like): Product categories, or None.
+            locations (array-like): Purchase locations, or None.
+            hours (array-like): Hours of day, or None.
+        Returns:
+            np.ndarray: Price multipliers.
+        """
+        predicted_ratings = np.asarray(predicted_ratings, dtype=np.float64)
+        tables = self.table_indices(len(predicted_ratings), categories, locations, hours)
+        keys = tables * self._width + (np.clip(predicted_ratings, self._low, self._high) - self._low)
+        tiers = np.searchsorted(self.thresholds, keys, side='right') - self.threshold_starts[tables]
+        return self.multipliers[self.multiplier_starts[tables] + tiers]
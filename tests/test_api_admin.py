@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+from api import api_endpoints
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    model_dir = tmp_path / 'models'
+    model_dir.mkdir()
+    monkeypatch.setattr(api_endpoints, 'admin_config', {'enabled': True, 'model_dir': str(model_dir)})
+    monkeypatch.setattr(api_endpoints, 'model_path', str(model_dir / 'trained_model'))
+    return TestClient(api_endpoints.app)
+
+
+def test_admin_routes_are_disabled_by_default(client, monkeypatch):
+    monkeypatch.setattr(api_endpoints, 'admin_config', {})
+
+    assert client.get('/admin/model').status_code == 403
+    assert client.post('/admin/model/reload', json={'path': '/etc/passwd'}).status_code == 403
+    assert client.post('/admin/model/rollback').status_code == 403
+    assert client.post('/admin/price_table/reload').status_code == 403
+
+
+@pytest.mark.parametrize('path', ['/etc/passwd', '{models}/model.pkl', '{models}/../outside', '{models}/missing'])
+def test_reload_refuses_paths_outside_model_artifacts(client, tmp_path, path):
+    models = tmp_path / 'models'
+    (models / 'model.pkl').write_bytes(b'not a model')
+    (tmp_path / 'outside').mkdir()
+    (tmp_path / 'outside' / 'manifest.json').write_text('{}')
+
+    response = client.post('/admin/model/reload', json={'path': path.format(models=models)})
+
+    assert response.status_code == 400
+    assert not api_endpoints.registry.status()['reloading']
+
+
+def test_reload_path_accepts_artifacts_in_the_model_dir(client, tmp_path):
+    artifact = tmp_path / 'models' / 'candidate'
+    artifact.mkdir()
+    (artifact / 'manifest.json').write_text('{}')
+
+    assert api_endpoints.resolve_reload_path(str(artifact)) == str(artifact.resolve())
+    assert api_endpoints.resolve_reload_path(None) == api_endpoints.model_path
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from api import api_endpoints
+
+
+@pytest.fixture
+def priced_chunks(monkeypatch):
+    chunks = []
+
+    def fake_calculate_prices(model, user_ids, product_ids, purchase_dates, base_prices, *args):
+        chunks.append(list(user_ids))
+        return np.asarray(base_prices) * 2
+
+    monkeypatch.setattr(api_endpoints, 'calculate_prices', fake_calculate_prices)
+    monkeypatch.setattr(api_endpoints.registry, 'current', object())
+    monkeypatch.setattr(api_endpoints, 'NDJSON_CHUNK_SIZE', 2)
+    return chunks
+
+
+def bulk_request(n):
+    return {'requests': [{'user_id': f'u{i}', 'product_id': f'p{i}', 'purchase_date': '2024-01-01',
+                          'base_price': float(i)} for i in range(n)]}
+
+
+def test_bulk_pricing_prices_the_batch_in_one_call(priced_chunks):
+    response = TestClient(api_endpoints.app).post('/api/calculate_prices', json=bulk_request(5))
+
+    assert response.json() == {'final_prices': [0.0, 2.0, 4.0, 6.0, 8.0]}
+    assert priced_chunks == [['u0', 'u1', 'u2', 'u3', 'u4']]
+
+
+def test_streamed_bulk_pricing_prices_chunk_by_chunk(priced_chunks):
+    response = TestClient(api_endpoints.app).post('/api/calculate_prices?stream=true', json=bulk_request(5))
+
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{'user_id': f'u{i}', 'product_id': f'p{i}', 'final_price': 2.0 * i} for i in range(5)]
+    assert priced_chunks == [['u0', 'u1'], ['u2', 'u3'], ['u4']]
+
+
+def test_streamed_bulk_pricing_waits_for_the_model(priced_chunks, monkeypatch):
+    monkeypatch.setattr(api_endpoints.registry, 'current', None)
+
+    response = TestClient(api_endpoints.app).post('/api/calculate_prices?stream=true', json=bulk_request(3))
+
+    assert response.status_code == 503
+    assert priced_chunks == []
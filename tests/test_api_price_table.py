@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from api import api_endpoints, model_registry
+from api.model_registry import ModelRegistry
+from price_engine.price_table import PriceTable, save_price_table
+
+
+class FakeModel:
+    def __init__(self, version):
+        self.version = version
+
+
+@pytest.fixture(autouse=True)
+def no_warm_up(monkeypatch):
+    monkeypatch.setattr(model_registry, 'warm_up', lambda model: None)
+
+
+def build_table(path, model_version):
+    table = PriceTable(np.array(['u1']), np.array(['p1']), np.array([0]), np.array([4.0]), np.array([11.0]),
+                       np.array([10.0]), model_version, start_day=19000, n_days=1)
+    save_price_table(table, str(path))
+
+
+def test_price_table_follows_model_swaps(tmp_path, monkeypatch):
+    table_path = tmp_path / 'price_table'
+    monkeypatch.setattr(api_endpoints, 'config', {'pricing': {'price_table': {'path': str(table_path)}}})
+    monkeypatch.setattr(api_endpoints, 'price_table', None)
+    registry = ModelRegistry(FakeModel)
+    registry.add_swap_listener(api_endpoints.reload_price_table)
+
+    build_table(table_path, 'v1')
+    registry.load('v1')
+    assert api_endpoints.price_table.model_version == 'v1'
+
+    # A table rebuilt for the next model is picked up by its swap, and by the rollback after it
+    build_table(table_path, 'v2')
+    registry.load('v2')
+    assert api_endpoints.price_table.model_version == 'v2'
+    build_table(table_path, 'v1')
+    registry.rollback()
+    assert api_endpoints.price_table.model_version == 'v1'
+
+
+def test_price_table_reload_endpoint_picks_up_a_rebuild(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    table_path = tmp_path / 'price_table'
+    monkeypatch.setattr(api_endpoints, 'config', {'pricing': {'price_table': {'path': str(table_path)}}})
+    monkeypatch.setattr(api_endpoints, 'price_table', None)
+    monkeypatch.setattr(api_endpoints, 'admin_config', {'enabled': True})
+    client = TestClient(api_endpoints.app)
+
+    assert client.post('/admin/price_table/reload').status_code == 404
+    build_table(table_path, 'v2')
+    response = client.post('/admin/price_table/reload')
+    assert response.status_code == 200
+    assert response.json()['model_version'] == 'v2'
+    assert client.get('/api/price_table_stats').json()['entries'] == 1
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from data import data_loader
+from data.data_loader import cached_source, compute_price_stats, preprocess_data, stream_data
+
+
+def history_with_missing_values(n_rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'User_ID': rng.integers(1, 50, n_rows).astype(str),
+        'Product_ID': rng.integers(1, 20, n_rows).astype(str),
+        'Price_Paid': rng.gamma(2.0, 20.0, n_rows),
+        'Location': rng.choice(['London', 'Paris'], n_rows),
+    })
+    # Missing values in other columns must drop the row's price from the statistics too
+    data.loc[rng.random(n_rows) < 0.1, 'Location'] = None
+    data.loc[rng.random(n_rows) < 0.05, 'Price_Paid'] = np.nan
+    return data
+
+
+def test_streamed_stats_match_in_memory_preprocessing(tmp_path):
+    data = history_with_missing_values()
+    path = tmp_path / 'history.csv'
+    data.to_csv(path, index=False)
+    expected = preprocess_data(pd.read_csv(path))
+    kept = pd.read_csv(path).dropna()['Price_Paid']
+
+    stats = compute_price_stats(str(path), chunk_size=128)
+    streamed = pd.concat(stream_data(str(path), chunk_size=128, price_stats=stats))
+
+    assert stats.count == len(kept)
+    assert np.isclose(stats.mean, kept.mean())
+    assert np.isclose(stats.std, kept.std())
+    np.testing.assert_allclose(streamed['Price_Paid'].to_numpy(), expected['Price_Paid'].to_numpy())
+
+
+@pytest.mark.parametrize('cache_format', ['parquet', 'feather'])
+def test_cached_source_is_rebuilt_only_when_the_source_changes(tmp_path, monkeypatch, cache_format):
+    source = tmp_path / 'history.csv'
+    source.write_text('User_ID,Price_Paid\nu1,10.0\nu2,20.0\n')
+    conversions = []
+    read_source = data_loader.read_source
+    monkeypatch.setattr(data_loader, 'read_source', lambda path: conversions.append(path) or read_source(path))
+
+    def load():
+        path = cached_source(str(source), str(tmp_path / 'cache'), cache_format)
+        return pd.read_parquet(path) if cache_format == 'parquet' else pd.read_feather(path)
+
+    def touch():
+        mtime = source.stat().st_mtime_ns + 10**9
+        os.utime(source, ns=(mtime, mtime))
+
+    assert load()['Price_Paid'].tolist() == [10.0, 20.0]
+    assert load()['Price_Paid'].tolist() == [10.0, 20.0]
+    assert len(conversions) == 1
+
+    # A new mtime with the same content keeps the cache
+    touch()
+    load()
+    assert len(conversions) == 1
+
+    # Same size, different content
+    source.write_text('User_ID,Price_Paid\nu1,30.0\nu2,40.0\n')
+    touch()
+    assert load()['Price_Paid'].tolist() == [30.0, 40.0]
+    assert len(conversions) == 2
+
+    source.write_text('User_ID,Price_Paid\nu1,30.0\n')
+    assert load()['Price_Paid'].tolist() == [30.0]
+    assert len(conversions) == 3
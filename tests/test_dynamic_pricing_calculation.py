@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from price_engine import dynamic_pricing_calculation
+from price_engine.dynamic_pricing_calculation import PredictionCache, predict_ratings
+
+
+class FakeModel:
+    def __init__(self, version, rating):
+        self.version = version
+        self.rating = rating
+        self.predicted = 0
+
+    def encode_ids(self, users, items):
+        return np.ones(len(users), dtype=np.int64), np.ones(len(items), dtype=np.int64)
+
+    def predict_batch_rows(self, users, items, dates):
+        self.predicted += len(users)
+        return np.full(len(users), self.rating)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = PredictionCache(max_size=100, ttl_seconds=300)
+    monkeypatch.setattr(dynamic_pricing_calculation, 'prediction_cache', cache)
+    monkeypatch.setattr(dynamic_pricing_calculation, 'price_table', None)
+    return cache
+
+
+def test_cache_entries_are_invalidated_by_a_new_model_version(cache):
+    users, items = ['u1', 'u2', 'u1'], ['p1', 'p2', 'p1']
+    old, new = FakeModel('v1', 3.0), FakeModel('v2', 4.0)
+
+    assert predict_ratings(old, users, items, '2023-06-01').tolist() == [3.0, 3.0, 3.0]
+    assert predict_ratings(old, users, items, '2023-06-01').tolist() == [3.0, 3.0, 3.0]
+    # Repeats within a batch and across batches are predicted once
+    assert old.predicted == 2
+
+    assert predict_ratings(new, users, items, '2023-06-01').tolist() == [4.0, 4.0, 4.0]
+    assert new.predicted == 2
+    assert cache.stats()['hits'] == 3 and cache.stats()['misses'] == 6
+
+
+def test_cache_expires_and_evicts_least_recently_used(cache):
+    cache.put_many(['a', 'b'], [1.0, 2.0])
+    assert cache.get_many(['a']) == [1.0]
+    cache.put_many(['c'], [3.0])
+    cache.max_size = 2
+    cache.put_many(['d'], [4.0])
+    assert cache.get_many(['a', 'b', 'c', 'd']) == [None, None, 3.0, 4.0]
+
+    cache.configure(max_size=10, ttl_seconds=0)
+    cache.put_many(['a'], [1.0])
+    assert cache.get_many(['a']) == [None]
+    assert cache.stats()['size'] == 0
+
+
+class CountingIndex:
+    def __init__(self, ids):
+        self.rows = {id_: row for row, id_ in enumerate(ids, start=1)}
+        self.lookups = 0
+
+    def get(self, id_):
+        self.lookups += 1
+        return self.rows.get(id_, 0)
+
+    def __contains__(self, id_):
+        self.lookups += 1
+        return id_ in self.rows
+
+
+class FakeRowModel(FakeModel):
+    def __init__(self, version, rating):
+        super().__init__(version, rating)
+        self.user_index = CountingIndex(['u1'])
+        self.item_index = CountingIndex(['p1'])
+
+    def predict_row(self, user, item, date):
+        self.predicted += 1
+        return self.rating + user + item
+
+
+def test_calculate_price_looks_each_id_up_once(cache, monkeypatch):
+    from utils.metrics import ServiceMetrics
+
+    metrics = ServiceMetrics()
+    monkeypatch.setattr(dynamic_pricing_calculation, 'metrics', metrics)
+    model = FakeRowModel('v1', 3.0)
+
+    # Known user, unknown item: rating 3.0 + 1 + 0 falls in the middle default tier (x1.1)
+    price = dynamic_pricing_calculation.calculate_price(model, 'u1', 'p9', '2023-06-01', 10.0)
+    assert price == pytest.approx(11.0)
+    assert model.user_index.lookups == 1 and model.item_index.lookups == 1
+    counters = metrics.render()
+    assert 'pricing_unknown_users_total 0' in counters and 'pricing_unknown_items_total 1' in counters
+
+    # A cached prediction needs no lookup at all
+    dynamic_pricing_calculation.calculate_price(model, 'u1', 'p9', '2023-06-01', 10.0)
+    assert model.user_index.lookups == 1 and model.predicted == 1
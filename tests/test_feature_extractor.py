@@ -0,0 +1,28 @@
+import pandas as pd
+from data.feature_extractor import UNKNOWN_CODE, FeatureEncoders, extract_features, load_encoders
+
+
+def purchases(locations):
+    return pd.DataFrame({
+        'User_ID': ['U1'] * len(locations),
+        'Product_ID': ['P1'] * len(locations),
+        'Purchase_Date': ['2023-06-15'] * len(locations),
+        'Purchase_Time': ['18:30'] * len(locations),
+        'Location': locations,
+    })
+
+
+def test_saved_encoders_keep_training_codes(tmp_path):
+    path = str(tmp_path / 'feature_encoders.json')
+    FeatureEncoders.fit(purchases(['London', 'Paris'])).save(path)
+
+    features = extract_features(purchases(['Paris', 'Tokyo', 'London']), load_encoders(path))
+
+    assert features['Location_Code'].tolist() == [2, UNKNOWN_CODE, 1]
+    assert features['Hour'].tolist() == [18, 18, 18]
+
+
+def test_missing_encoders_fall_back_to_fitting(tmp_path):
+    assert load_encoders(str(tmp_path / 'missing.json')) is None
+    features = extract_features(purchases(['Paris', 'London']), None)
+    assert features['Location_Code'].tolist() == [1, 2]
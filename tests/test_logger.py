@@ -0,0 +1,51 @@
+import contextvars
+import logging
+import random
+
+import pytest
+
+from utils import logger
+from utils.logger import HOT_PATH, HotPathSampler, sample_request
+
+
+def make_record(hot):
+    record = logging.LogRecord('test', logging.INFO, __file__, 0, 'message', None, None)
+    if hot:
+        record.__dict__.update(HOT_PATH)
+    return record
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    monkeypatch.setattr(logger, '_sample_rate', 0.25)
+    random.seed(0)
+    return HotPathSampler()
+
+
+def test_records_off_the_hot_path_always_pass(sampler):
+    assert all(sampler.filter(make_record(hot=False)) for _ in range(1000))
+
+
+def test_hot_records_outside_a_request_are_kept_at_the_sample_rate(sampler):
+    kept = sum(sampler.filter(make_record(hot=True)) for _ in range(20000))
+    assert kept / 20000 == pytest.approx(0.25, abs=0.02)
+
+
+def test_sample_request_keeps_or_drops_a_whole_request(sampler):
+    def handle_request():
+        sampled = sample_request()
+        decisions = {sampler.filter(make_record(hot=True)) for _ in range(20)}
+        assert decisions == {sampled}
+        assert sampler.filter(make_record(hot=False))
+        return sampled
+
+    kept = sum(contextvars.copy_context().run(handle_request) for _ in range(4000))
+    assert kept / 4000 == pytest.approx(0.25, abs=0.03)
+
+
+@pytest.mark.parametrize('rate, expected', [(1.0, True), (0.0, False)])
+def test_extreme_rates_keep_everything_or_nothing(monkeypatch, rate, expected):
+    monkeypatch.setattr(logger, '_sample_rate', rate)
+    sampler = HotPathSampler()
+    assert all(sampler.filter(make_record(hot=True)) == expected for _ in range(1000))
+    assert contextvars.copy_context().run(sample_request) == expected
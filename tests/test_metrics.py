@@ -0,0 +1,56 @@
+import math
+from utils.metrics import LATENCY_BUCKETS, ServiceMetrics
+
+
+def parse(text):
+    """
+    Parse Prometheus text into ({series: value}, {metric: type}).
+    """
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ')
+            assert name not in types, f'{name} typed twice'
+            types[name] = kind
+        else:
+            series, value = line.rsplit(' ', 1)
+            samples[series] = float(value)
+    return samples, types
+
+
+def test_render_counters_histograms_summaries_and_gauges():
+    metrics = ServiceMetrics()
+    metrics.inc('pricing_requests_total', route='/a', status=200)
+    metrics.inc('pricing_requests_total', 2, route='/a', status=200)
+    metrics.inc('pricing_requests_total', route='/b "x"', status=500)
+    for seconds in (0.0002, 0.003, 0.003, 20.0):
+        metrics.observe('pricing_request_seconds', seconds, route='/a')
+    metrics.add_gauges(lambda: {'pricing_model_ready': True})
+
+    samples, types = parse(metrics.render())
+
+    assert types == {'pricing_requests_total': 'counter', 'pricing_request_seconds': 'histogram',
+                     'pricing_request_seconds_recent': 'summary', 'pricing_model_ready': 'gauge'}
+    assert samples['pricing_requests_total{route="/a",status="200"}'] == 3
+    assert samples['pricing_requests_total{route="/b \\"x\\"",status="500"}'] == 1
+    buckets = [samples[f'pricing_request_seconds_bucket{{route="/a",le="{float(bound)!r}"}}']
+               for bound in LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)
+    assert samples['pricing_request_seconds_bucket{route="/a",le="0.00025"}'] == 1
+    assert samples['pricing_request_seconds_bucket{route="/a",le="0.005"}'] == 3
+    assert samples['pricing_request_seconds_bucket{route="/a",le="10.0"}'] == 3
+    assert samples['pricing_request_seconds_bucket{route="/a",le="+Inf"}'] == 4
+    assert samples['pricing_request_seconds_count{route="/a"}'] == 4
+    assert math.isclose(samples['pricing_request_seconds_sum{route="/a"}'], 20.0062)
+    assert samples['pricing_request_seconds_recent{route="/a",quantile="0.5"}'] == 0.003
+    assert samples['pricing_model_ready'] == 1.0
+
+
+def test_stage_timer_and_reset():
+    metrics = ServiceMetrics()
+    with metrics.stage('predict'):
+        pass
+
+    assert metrics.snapshot()['pricing_stage_seconds[predict]']['count'] == 1
+    metrics.reset()
+    assert metrics.render() == '\n'
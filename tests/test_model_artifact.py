@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic_data import generate_purchase_history
+from data.feature_extractor import extract_features
+from models.model_artifact import is_artifact, load_artifact, save_artifact
+from models.time_aware_factor_model import TimeAwareFactorModel
+
+
+@pytest.fixture(scope='module')
+def trained():
+    data = extract_features(generate_purchase_history(3000, seed=1))
+    np.random.seed(0)
+    model = TimeAwareFactorModel(n_factors=8, lr=0.005, reg=0.02, n_epochs=2, engine='minibatch')
+    model.fit(data)
+    return model, data
+
+
+@pytest.mark.parametrize('variant', ['float64', 'float32', 'int8'])
+@pytest.mark.parametrize('mmap_mode', ['r', None])
+def test_artifact_round_trip_predicts_identically(trained, tmp_path, variant, mmap_mode):
+    model, data = trained
+    if variant == 'int8':
+        model = model.quantize_items('int8')
+    else:
+        model = model.astype(variant)
+    path = str(tmp_path / 'model')
+
+    save_artifact(model, path)
+    loaded = load_artifact(path, mmap_mode=mmap_mode)
+
+    assert is_artifact(path)
+    assert loaded.version == model.version
+    assert loaded.dtype == model.dtype and loaded.item_quantization == model.item_quantization
+    for name in model.state_arrays():
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(model, name))
+        assert getattr(loaded, name).dtype == getattr(model, name).dtype
+    # Unknown IDs take the same fallback path as before saving
+    users = np.append(data['User_ID'].to_numpy()[:500], 'unknown-user')
+    items = np.append(data['Product_ID'].to_numpy()[:500], 'unknown-item')
+    dates = np.append(data['Purchase_Date'].astype(str).to_numpy()[:500], '2023-06-01')
+    np.testing.assert_array_equal(loaded.predict_batch(users, items, dates), model.predict_batch(users, items, dates))
+    assert loaded.predict(users[0], items[0], dates[0]) == model.predict(users[0], items[0], dates[0])
+    assert loaded.score_catalog(users[0], dates[0], k=5)[0] == model.score_catalog(users[0], dates[0], k=5)[0]
+
+
+def test_saving_replaces_an_existing_artifact(trained, tmp_path):
+    model, _ = trained
+    path = str(tmp_path / 'model')
+    save_artifact(model.astype('float32'), path)
+    save_artifact(model, path)
+
+    assert load_artifact(path).dtype == 'float64'
+    assert [entry.name for entry in tmp_path.iterdir()] == ['model']
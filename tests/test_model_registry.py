@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+import pytest
+from api import model_registry
+from api.model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, version):
+        self.version = version
+
+
+@pytest.fixture(autouse=True)
+def no_warm_up(monkeypatch):
+    monkeypatch.setattr(model_registry, 'warm_up', lambda model: None)
+
+
+def slow_loader(release, started):
+    versions = iter(range(100))
+
+    def load(path):
+        started.set()
+        release.wait(5)
+        return FakeModel(f'{path}-{next(versions)}')
+    return load
+
+
+def test_watcher_reload_waits_for_reload_in_progress(tmp_path):
+    model_file = tmp_path / 'model.pkl'
+    model_file.write_text('v0')
+    release, started = threading.Event(), threading.Event()
+    registry = ModelRegistry(slow_loader(release, started))
+
+    assert registry.load_in_background(str(model_file))
+    started.wait(5)
+    registry.watch(str(model_file), interval=0.01)
+    model_file.write_text('v1')
+    # Bump the mtime explicitly; two quick writes can share a timestamp tick
+    mtime = model_file.stat().st_mtime_ns + 10**9
+    os.utime(model_file, ns=(mtime, mtime))
+    time.sleep(0.1)
+    # The watcher must not start a second, concurrent load
+    assert registry.status()['reloading']
+    assert not registry.swaps
+
+    release.set()
+    deadline = time.time() + 5
+    while len(registry.swaps) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    registry.stop()
+    assert [swap['version'] for swap in registry.swaps] == [f'{model_file}-0', f'{model_file}-1']
+
+
+def test_rollback_refused_while_loading(tmp_path):
+    release, started = threading.Event(), threading.Event()
+    registry = ModelRegistry(slow_loader(release, started))
+    release.set()
+    registry.load('a')
+    registry.load('b')
+
+    release.clear()
+    started.clear()
+    assert registry.load_in_background('c')
+    started.wait(5)
+    with pytest.raises(RuntimeError, match='in progress'):
+        registry.rollback()
+    release.set()
+    registry._reload_thread.join(5)
+    assert registry.rollback()['version'] == 'b-1'
+
+
+def test_swap_listeners_run_after_loads_and_rollbacks():
+    release, started = threading.Event(), threading.Event()
+    release.set()
+    registry = ModelRegistry(slow_loader(release, started))
+    seen = []
+
+    def failing_listener(model):
+        raise ValueError('listener failed')
+
+    registry.add_swap_listener(failing_listener)
+    registry.add_swap_listener(lambda model: seen.append(model.version))
+    registry.load('a')
+    registry.load('b')
+    registry.rollback()
+
+    assert seen == ['a-0', 'b-1', 'a-0']
+    assert registry.current.version == 'a-0'
+
+
+def test_swap_history_is_bounded(monkeypatch):
+    monkeypatch.setattr(model_registry, 'SWAP_HISTORY', 5)
+    registry = ModelRegistry(FakeModel)
+    for i in range(12):
+        registry.load(f'v{i}')
+    first_ready_at = registry.ready_at
+
+    status = registry.status()
+    assert len(registry.swaps) == 5
+    assert [swap['version'] for swap in status['swaps']] == [f'v{i}' for i in range(7, 12)]
+    assert status['ready_at'] == first_ready_at <= status['swaps'][0]['swapped_at']
@@ -0,0 +1,32 @@
+from benchmarks.synthetic_data import generate_purchase_history
+from data.feature_extractor import extract_features
+from models.model_training import train_model
+from models.time_aware_factor_model import to_days
+
+CONFIG = {'n_factors': 10, 'lr': 0.005, 'reg': 0.02, 'n_epochs': 6, 'engine': 'minibatch', 'patience': 1}
+
+
+def split_latest(data, fraction=0.1):
+    data = data.sort_values('Purchase_Date', kind='stable').reset_index(drop=True)
+    cut = int(len(data) * (1 - fraction))
+    return data.iloc[:cut], data.iloc[cut:]
+
+
+def test_early_stopped_model_is_refit_on_every_row():
+    data, validation = split_latest(extract_features(generate_purchase_history(5000, seed=0)))
+
+    model = train_model(data, CONFIG, validation)
+
+    assert model.best_epoch is None
+    assert 1 <= len(model.history) <= CONFIG['n_epochs']
+    last_day = int(to_days(validation['Purchase_Date'].to_numpy()).max())
+    assert model.day_min + model.n_days - 1 >= last_day
+
+
+def test_refit_can_be_disabled():
+    data, validation = split_latest(extract_features(generate_purchase_history(5000, seed=0)))
+
+    model = train_model(data, dict(CONFIG, refit=False), validation)
+
+    assert model.best_epoch is not None
+    assert 'val_rmse' in model.history[-1]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from models.model_tuning import chronological_splits
+
+
+def test_chronological_splits_cut_on_day_boundaries():
+    # 10 days with 10 rows each
+    days = np.repeat(np.arange(100, 110), 10)
+
+    folds = chronological_splits(days, n_splits=3, val_fraction=0.3)
+
+    assert folds == [(70, 80), (80, 90), (90, 100)]
+
+
+def test_chronological_splits_never_train_on_the_future():
+    rng = np.random.default_rng(0)
+    days = np.sort(rng.integers(0, 60, 5000))
+
+    folds = chronological_splits(days, n_splits=4, val_fraction=0.25)
+
+    assert len(folds) == 4
+    for (start, stop), (next_start, _) in zip(folds, folds[1:]):
+        assert stop == next_start
+    assert folds[-1][1] == len(days)
+    for start, stop in folds:
+        assert 0 < start < stop
+        # A day is never split between train and validation
+        assert days[start - 1] < days[start]
+    assert abs((len(days) - folds[0][0]) / len(days) - 0.25) < 0.05
+
+
+def test_chronological_splits_drop_folds_emptied_by_day_cuts():
+    days = np.array([0] * 50 + [1] * 45 + [2] * 5)
+
+    # Every cut falls back to the first row of day 1, leaving one fold
+    assert chronological_splits(days, n_splits=3, val_fraction=0.3) == [(50, 100)]
+    with pytest.raises(ValueError):
+        chronological_splits(np.zeros(100, dtype=np.int64), n_splits=3)
@@ -0,0 +1,33 @@
+import numpy as np
+from benchmarks.synthetic_data import generate_purchase_history
+from data.feature_extractor import extract_features
+from models import parallel_training
+from models.parallel_training import compare_convergence
+
+
+CONFIG = {'n_factors': 20, 'lr': 0.005, 'reg': 0.02, 'n_epochs': 2, 'engine': 'minibatch'}
+
+
+def test_parallel_minibatch_training_on_skewed_data_converges():
+    data = extract_features(generate_purchase_history(50000, seed=0))
+    comparison = compare_convergence(data, CONFIG, n_workers=2)
+
+    assert comparison['diverged'] == []
+    assert np.isfinite(comparison['final_rmse_gap'])
+    parallel_rmse = [epoch['train_rmse'] for epoch in comparison['parallel']]
+    assert parallel_rmse[-1] < parallel_rmse[0]
+
+
+def test_compare_convergence_reports_divergence(monkeypatch):
+    data = extract_features(generate_purchase_history(5000, seed=0))
+    fit = parallel_training.fit_parallel
+
+    def diverging_fit(model, data, n_workers):
+        fit(model, data, n_workers)
+        model.history[-1]['train_rmse'] = float('nan')
+
+    monkeypatch.setattr(parallel_training, 'fit_parallel', diverging_fit)
+    comparison = compare_convergence(data, CONFIG, n_workers=2)
+
+    assert comparison['diverged'] == ['parallel']
+    assert comparison['final_rmse_gap'] is None
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from price_engine.pricing_rules import PricingRules
+
+RULES = {
+    'default': {'thresholds': [3.0, 4.5], 'multipliers': [0.90, 1.10, 1.20]},
+    'tables': [
+        {'location': 'London', 'hours': [18, 22], 'thresholds': [3.0, 4.0, 4.5],
+         'multipliers': [0.95, 1.10, 1.20, 1.25]},
+        {'hours': [0, 5], 'thresholds': [3.0, 4.5], 'multipliers': [0.85, 1.00, 1.10]},
+    ],
+}
+
+
+@pytest.mark.parametrize('hour', [None, -1, -5, 24, 25])
+def test_out_of_range_hour_prices_as_unknown_hour(hour):
+    rules = PricingRules(RULES)
+    batch = rules.multipliers_for([3.5], ['books'], ['London'], None if hour is None else [hour])
+
+    assert rules.multiplier(3.5, 'books', 'London', hour) == pytest.approx(1.10)
+    assert rules.multiplier(3.5, 'books', 'London', hour) == pytest.approx(batch[0])
+    assert rules.table_index('books', 'London', hour) == rules.table_indices(1, ['books'], ['London'],
+                                                                            None if hour is None else [hour])[0]
+
+
+def test_scalar_and_batch_multipliers_agree_on_every_hour():
+    rules = PricingRules(RULES)
+    ratings = np.linspace(1.0, 5.0, 9)
+    for hour in range(24):
+        batch = rules.multipliers_for(ratings, ['books'] * len(ratings), ['London'] * len(ratings),
+                                      [hour] * len(ratings))
+        assert [rules.multiplier(rating, 'books', 'London', hour) for rating in ratings] == pytest.approx(batch)
@@ -0,0 +1,30 @@
+import asyncio
+import contextvars
+from api.request_batcher import PriceRequestBatcher
+from utils import logger as app_logger
+
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def test_batched_pricing_runs_in_the_request_context():
+    seen = []
+
+    def price_batch(user_ids, product_ids, purchase_dates, base_prices, categories, locations, purchase_times):
+        seen.append((request_id.get(), app_logger._request_sampled.get()))
+        return base_prices
+
+    async def run():
+        batcher = PriceRequestBatcher(price_batch, max_batch_size=8, max_wait_ms=1.0)
+
+        async def request(i):
+            request_id.set(i)
+            app_logger._request_sampled.set(False)
+            return await batcher.submit('U1', 'P1', '2023-06-15', 10.0 + i)
+
+        prices = await asyncio.gather(*(request(i) for i in range(3)))
+        await batcher.close()
+        return prices
+
+    assert asyncio.run(run()) == [10.0, 11.0, 12.0]
+    assert seen == [(0, False)]
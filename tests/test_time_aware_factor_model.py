@@ -0,0 +1,197 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic_data import generate_purchase_history
+from data.feature_extractor import extract_features
+from models.time_aware_factor_model import TimeAwareFactorModel
+
+
+def skewed_history(n_rows=20000, seed=0):
+    """
+    Power-law purchase history where a few users and items appear many times per mini-batch.
+    """
+    return extract_features(generate_purchase_history(n_rows, seed=seed))
+
+
+@pytest.fixture(scope='module')
+def trained():
+    """
+    Small trained model with user-day offsets, and its training data.
+    """
+    data = skewed_history(5000, seed=2)
+    np.random.seed(0)
+    model = TimeAwareFactorModel(n_factors=8, lr=0.005, reg=0.02, n_epochs=2, engine='minibatch',
+                                 user_day_bias=True)
+    model.fit(data)
+    return model, data
+
+
+def sample_triples(data, n=300):
+    """
+    Training triples plus unknown users, unknown items and dates outside the training span.
+    """
+    users = np.append(data['User_ID'].to_numpy()[:n], ['unknown-user', data['User_ID'].iloc[0], 'unknown-user'])
+    items = np.append(data['Product_ID'].to_numpy()[:n], [data['Product_ID'].iloc[0], 'unknown-item', 'unknown-item'])
+    dates = np.append(data['Purchase_Date'].astype(str).to_numpy()[:n], ['2020-01-01', '2030-01-01', '2023-06-01'])
+    return users, items, dates
+
+
+def test_minibatch_training_on_skewed_data_stays_finite_and_converges():
+    np.random.seed(0)
+    model = TimeAwareFactorModel(n_factors=50, lr=0.005, reg=0.02, n_epochs=4, engine='minibatch')
+    model.fit(skewed_history())
+
+    train_rmse = [record['train_rmse'] for record in model.history]
+    assert np.all(np.isfinite(train_rmse))
+    assert all(later < earlier for earlier, later in zip(train_rmse, train_rmse[1:]))
+    for name in model.PARAM_ARRAYS:
+        assert np.all(np.isfinite(getattr(model, name)))
+
+
+def test_resumed_fit_adds_rows_for_ids_missing_from_the_checkpoint(tmp_path):
+    data = skewed_history(5000)
+    first_users = data['User_ID'].unique()[:len(data['User_ID'].unique()) // 2]
+    np.random.seed(0)
+    interrupted = TimeAwareFactorModel(n_factors=10, lr=0.005, reg=0.02, n_epochs=1, engine='minibatch')
+    interrupted.fit(data[data['User_ID'].isin(first_users)], checkpoint_dir=str(tmp_path))
+
+    resumed = TimeAwareFactorModel(n_factors=10, lr=0.005, reg=0.02, n_epochs=2, engine='minibatch')
+    resumed.fit(data, checkpoint_dir=str(tmp_path), resume=True)
+
+    assert len(resumed.history) == 2
+    assert all(user in resumed.user_index for user in data['User_ID'].unique())
+    assert len(resumed.user_factors) == len(resumed.user_index) + 1
+    # The unknown-user row is never trained
+    assert not resumed.user_factors[0].any() and resumed.user_bias[0] == 0
+
+
+def test_predict_batch_matches_predict(trained):
+    model, data = trained
+    users, items, dates = sample_triples(data)
+
+    expected = [model.predict(user, item, date) for user, item, date in zip(users, items, dates)]
+
+    np.testing.assert_allclose(model.predict_batch(users, items, dates), expected, rtol=1e-12)
+    np.testing.assert_allclose(model.predict_batch(users, items, dates, chunk_size=7), expected, rtol=1e-12)
+    # One date shared by every row
+    np.testing.assert_allclose(model.predict_batch(users, items, '2023-06-01'),
+                               [model.predict(user, item, '2023-06-01') for user, item in zip(users, items)],
+                               rtol=1e-12)
+
+
+@pytest.mark.parametrize('user', ['known', 'unknown-user'])
+def test_score_catalog_matches_per_item_predict(trained, user):
+    model, data = trained
+    user = data['User_ID'].iloc[0] if user == 'known' else user
+    items = model.item_index.ids
+    expected = np.array([model.predict(user, item, '2023-06-01') for item in items])
+
+    ids, scores = model.score_catalog(user, '2023-06-01', k=10)
+
+    top = np.argsort(-expected, kind='stable')[:10]
+    np.testing.assert_allclose(scores, expected[top], rtol=1e-12)
+    assert set(ids) == {items[i] for i in top}
+    assert len(model.score_catalog(user, '2023-06-01', k=len(items) + 5)[0]) == len(items)
+
+
+def test_ann_catalog_scores_match_predict(trained):
+    model, data = trained
+    model = model.astype('float64')
+    user = data['User_ID'].iloc[0]
+    model.build_ann_index(n_lists=4)
+
+    # Probing every list scores the whole catalog, so the result equals exact scoring
+    exact_ids, exact_scores = model.score_catalog(user, '2023-06-01', k=10)
+    ann_ids, ann_scores = model.score_catalog(user, '2023-06-01', k=10, use_ann=True, n_probe=4)
+    assert ann_ids == exact_ids
+    np.testing.assert_allclose(ann_scores, exact_scores, rtol=1e-12)
+
+    # Probing fewer lists returns a subset of items, each scored exactly
+    ids, scores = model.score_catalog(user, '2023-06-01', k=10, use_ann=True, n_probe=1)
+    np.testing.assert_allclose(scores, [model.predict(user, item, '2023-06-01') for item in ids], rtol=1e-12)
+    assert all(later <= earlier for earlier, later in zip(scores, scores[1:]))
+
+
+def test_partial_fit_grows_a_memory_mapped_model(trained, tmp_path):
+    from models.model_artifact import load_artifact, save_artifact
+
+    model, data = trained
+    path = str(tmp_path / 'model')
+    save_artifact(model, path)
+    loaded = load_artifact(path)
+    n_users, n_items, n_days = len(loaded.user_index), len(loaded.item_index), loaded.n_days
+    new_rows = data.iloc[:200].copy()
+    new_rows['User_ID'] = 'new-user-' + new_rows['User_ID'].astype(str)
+    new_rows.loc[new_rows.index[:50], 'Product_ID'] = 'new-item'
+    new_rows.loc[new_rows.index[:50], 'Purchase_Date'] = new_rows['Purchase_Date'].max() + np.timedelta64(30, 'D')
+
+    loaded.partial_fit(new_rows, n_epochs=2, replay=data, replay_size=100)
+
+    assert len(loaded.user_index) == n_users + new_rows['User_ID'].nunique()
+    assert len(loaded.item_index) == n_items + 1
+    assert len(loaded.user_factors) == len(loaded.user_index) + 1
+    assert len(loaded.item_bin_bias) == len(loaded.item_index) + 1
+    assert loaded.n_days == n_days + 30
+    assert loaded.user_day_bias.shape == (len(loaded.user_index) + 1, loaded.n_days + 1)
+    assert loaded.version != model.version
+    assert np.isfinite(loaded.predict_batch(new_rows['User_ID'], new_rows['Product_ID'], '2023-06-01')).all()
+    # The artifact the model was loaded from is left untouched
+    reloaded = load_artifact(path)
+    assert len(reloaded.user_index) == n_users
+    np.testing.assert_array_equal(reloaded.user_factors, model.user_factors)
+
+
+def test_id_index_lookups_agree_between_dict_and_sorted_arrays():
+    from models.time_aware_factor_model import UNKNOWN_ROW, IdIndex
+
+    index = IdIndex(['u3', 'u1', 'u2'])
+    assert index.add('u1') == 2 and index.add('u4') == 4
+    queries = ['u1', 'u2', 'u3', 'u4', 'missing']
+    expected = [2, 3, 1, 4, UNKNOWN_ROW]
+
+    loaded = IdIndex.from_sorted(*index.sorted_arrays())
+
+    assert [index.get(id_) for id_ in queries] == expected
+    assert index.encode(queries).tolist() == expected
+    assert [loaded.get(id_) for id_ in queries] == expected
+    assert loaded.encode(queries).tolist() == expected
+    assert loaded.ids == index.ids and len(loaded) == 4
+    # A loaded index becomes mutable on first add
+    assert loaded.add('u5') == 5 and loaded.encode(['u5', 'u1']).tolist() == [5, 2]
+
+
+def test_dates_outside_the_training_span_use_the_edge_time_bins(trained):
+    model, data = trained
+    item = data['Product_ID'].iloc[0]
+    first = np.datetime_as_string(np.datetime64(model.day_min, 'D'))
+    last = np.datetime_as_string(np.datetime64(model.day_min + model.n_days - 1, 'D'))
+
+    assert model.item_bin_bias.shape == (len(model.item_index) + 1, model.n_bins)
+    assert model.n_bins * model.bin_width >= model.n_days
+    # The rounded-up bin width leaves the final bins past the training span untrained
+    assert model.last_bin == (model.n_days - 1) // model.bin_width < model.n_bins - 1
+    assert not model.item_bin_bias[:, model.last_bin + 1:].any()
+    # The unknown user has no drift, so only the item's time bin depends on the date
+    assert model.predict('unknown-user', item, '1990-01-01') == model.predict('unknown-user', item, first)
+    assert model.predict('unknown-user', item, '2090-01-01') == model.predict('unknown-user', item, last)
+    offset = model.item_bin_bias[model.item_index.get(item)]
+    assert model.predict('unknown-user', item, last) - model.predict('unknown-user', item, first) == \
+        pytest.approx(offset[model.last_bin] - offset[0])
+
+
+def test_reduced_precision_models_stay_close_to_float64(trained):
+    model, data = trained
+    users, items, dates = sample_triples(data)
+    expected = model.predict_batch(users, items, dates)
+    user = data['User_ID'].iloc[0]
+
+    for reduced in (model.astype('float32'), model.quantize_items('int8')):
+        assert reduced.item_factors is None or reduced.item_factors.nbytes < model.item_factors.nbytes
+        np.testing.assert_allclose(reduced.predict_batch(users, items, dates), expected, atol=1e-3)
+        ids, scores = reduced.score_catalog(user, '2023-06-01', k=10)
+        np.testing.assert_allclose(scores, [model.predict(user, item, '2023-06-01') for item in ids], atol=1e-3)
+
+    quantized = model.quantize_items('int8')
+    assert quantized.item_codes.dtype == np.int8
+    assert quantized.item_codes.nbytes == model.item_factors.nbytes // 8
+    # The source model is not modified
+    assert model.item_quantization is None and model.item_factors.dtype == np.float64
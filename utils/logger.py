@@ -4,34 +4,139 @@ logger.py - Setup logging for the application.
 Objective:
     Configure the logging settings for the application to ensure that logs are captured consistently across different modules.
     This script initializes the logging configuration and provides a function to set up logging for the entire application.
+    With `queue: true` in the logging configuration, the configured handlers run on a background QueueListener thread,
+    so callers only enqueue records and never wait on console or file I/O. Hot-path messages, logged with
+    `extra=HOT_PATH`, are kept for a sampled fraction of requests (`hot_path_sample_rate`); every other message is kept.
 
 Integration with Other Files:
     - All other modules use this logging configuration for consistent logging.
+    - api/api_endpoints.py makes one sampling decision per request with sample_request().
 
 Usage:
     from utils.logger import setup_logging
     setup_logging()
 """
 
+import atexit
+import contextvars
 import logging
 import logging.config
+import logging.handlers
+import os
+import queue
+import random
 import yaml
 
+# Pass as extra= to mark a log call as a hot-path message subject to sampling
+HOT_PATH = {'hot_path': True}
+
+# Sampling decision of the current request; None outside a request
+_request_sampled = contextvars.ContextVar('request_sampled', default=None)
+# Fraction of requests whose hot-path messages are kept
+_sample_rate = 1.0
+# Listeners of the active queue-based configuration
+_listeners = []
+
+
+class HotPathSampler(logging.Filter):
+    """
+    Drop hot-path records of requests that were not sampled.
+    Records outside a request are sampled one by one at the same rate.
+    """
+    def filter(self, record):
+        if not getattr(record, 'hot_path', False):
+            return True
+        sampled = _request_sampled.get()
+        if sampled is None:
+            return _sample_rate >= 1.0 or random.random() < _sample_rate
+        return sampled
+
+
+def sample_request():
+    """
+    Decide whether the hot-path messages of the current request are logged.
+    Call at the start of each request; the decision holds for everything running in its context.
+    Returns:
+        bool: True if the request is sampled.
+    """
+    sampled = _sample_rate >= 1.0 or random.random() < _sample_rate
+    _request_sampled.set(sampled)
+    return sampled
+
+
+def _detach_handlers(logger):
+    """
+    Remove and return a logger's handlers.
+    Args:
+        logger (logging.Logger): Logger to detach the handlers from.
+    Returns:
+        list: The removed handlers.
+    """
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    return handlers
+
+
+@atexit.register
+def stop_listeners():
+    """
+    Stop the background listeners, flushing every queued record to its handlers.
+    """
+    while _listeners:
+        _listeners.pop().stop()
+
+
 def setup_logging(config_path='config/logging.yaml', default_level=logging.INFO):
     """
     Setup logging configuration.
     Args:
         config_path (str): Path to the logging configuration file.
         default_level (int): Default logging level.
+    Returns:
+        list: The background QueueListeners, empty when queueing is disabled.
     """
+    global _sample_rate
+    stop_listeners()
     try:
         with open(config_path, 'r') as file:
             config = yaml.safe_load(file)
-            logging.config.dictConfig(config)
-            logging.info("Logging configuration loaded successfully from %s", config_path)
+        use_queue = config.pop('queue', False)
+        _sample_rate = float(config.pop('hot_path_sample_rate', 1.0))
+
+        # File handlers fail to start if their directory is missing
+        for handler in config.get('handlers', {}).values():
+            if 'filename' in handler:
+                os.makedirs(os.path.dirname(handler['filename']) or '.', exist_ok=True)
+        logging.config.dictConfig(config)
+
+        sampler = HotPathSampler()
+        loggers = [logging.getLogger()] + [logging.getLogger(name) for name in config.get('loggers', {})]
+        if use_queue:
+            # Loggers only enqueue records; one listener thread per distinct handler set does the I/O
+            queue_handlers = {}
+            for logger in loggers:
+                handlers = tuple(_detach_handlers(logger))
+                if not handlers:
+                    continue
+                if handlers not in queue_handlers:
+                    records = queue.SimpleQueue()
+                    queue_handler = logging.handlers.QueueHandler(records)
+                    # Filter before the queue, so dropped records are never formatted
+                    queue_handler.addFilter(sampler)
+                    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+                    listener.start()
+                    _listeners.append(listener)
+                    queue_handlers[handlers] = queue_handler
+                logger.addHandler(queue_handlers[handlers])
+        else:
+            for logger in loggers:
+                for handler in logger.handlers:
+                    handler.addFilter(sampler)
+        logging.info("Logging configuration loaded successfully from %s", config_path)
+        return list(_listeners)
     except Exception as e:
         logging.basicConfig(level=default_level)
         logging.error("Error loading logging configuration from %s: %s", config_path, e)
         logging.info("Using default logging configuration.")
-
-
+        return []
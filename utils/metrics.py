@@ -0,0 +1,213 @@
+"""
+metrics.py - In-process latency and throughput metrics.
+
+Objective:
+    Record counters and latency distributions on the serving hot path with minimal overhead and expose them in the
+    Prometheus text format. Latencies feed both a cumulative histogram (for Prometheus-side aggregation) and a
+    window of recent samples from which p50/p95/p99 are reported directly.
+
+Integration with Other Files:
+    - price_engine/dynamic_pricing_calculation.py times model lookup, prediction and rule application.
+    - api/api_endpoints.py times request parsing and serialization and serves the /metrics route.
+
+Usage:
+    from utils.metrics import metrics
+    with metrics.stage('predict'):
+        ...
+    metrics.inc('pricing_unknown_users_total', 3)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+# Histogram bucket upper bounds in seconds, from 50us to 10s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+# Recent samples kept per series for the quantiles
+QUANTILE_WINDOW = 4096
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyRecorder:
+    """
+    Cumulative latency histogram plus a ring buffer of recent samples for quantiles.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS, window=QUANTILE_WINDOW):
+        self.buckets = np.asarray(buckets)
+        self.bucket_counts = np.zeros(len(buckets) + 1, dtype=np.int64)
+        self.count = 0
+        self.sum = 0.0
+        self._window = np.zeros(window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """
+        Record one latency.
+        Args:
+            seconds (float): Observed latency in seconds.
+        """
+        bucket = int(np.searchsorted(self.buckets, seconds))
+        with self._lock:
+            self.bucket_counts[bucket] += 1
+            self._window[self.count % len(self._window)] = seconds
+            self.count += 1
+            self.sum += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        """
+        Compute latency quantiles over the recent sample window.
+        Args:
+            quantiles (tuple): Quantiles in [0, 1].
+        Returns:
+            dict: Quantile -> latency in seconds (NaN before the first sample).
+        """
+        with self._lock:
+            samples = self._window[:min(self.count, len(self._window))].copy()
+        if not len(samples):
+            return {q: float('nan') for q in quantiles}
+        return dict(zip(quantiles, np.quantile(samples, quantiles).tolist()))
+
+
+class ServiceMetrics:
+    """
+    Registry of labelled counters and latency recorders, rendered as Prometheus text.
+    """
+    def __init__(self, prefix='pricing'):
+        self.prefix = prefix
+        self._counters = {}
+        self._latencies = {}
+        self._gauge_sources = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increment a counter.
+        Args:
+            name (str): Counter name, ending in _total by convention.
+            value (int): Increment.
+            **labels: Label values of the series.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record a latency.
+        Args:
+            name (str): Latency metric name, ending in _seconds by convention.
+            seconds (float): Observed latency.
+            **labels: Label values of the series.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        recorder = self._latencies.get(key)
+        if recorder is None:
+            with self._lock:
+                recorder = self._latencies.setdefault(key, LatencyRecorder())
+        recorder.observe(seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Time a block as one stage of request handling.
+        Args:
+            stage (str): Stage name, e.g. 'predict'.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f'{self.prefix}_stage_seconds', time.perf_counter() - start, stage=stage)
+
+    def add_gauges(self, source):
+        """
+        Register a callable whose gauges are read at every scrape.
+        Args:
+            source (callable): Function returning a dict of gauge name -> value.
+        """
+        self._gauge_sources.append(source)
+
+    def snapshot(self):
+        """
+        Summarize every latency series as count, mean and quantiles.
+        Returns:
+            dict: Series label -> latency summary in milliseconds.
+        """
+        summary = {}
+        for (name, labels), recorder in list(self._latencies.items()):
+            series = name + ''.join(f'[{value}]' for _, value in labels)
+            quantiles = recorder.quantiles()
+            summary[series] = {'count': recorder.count,
+                               'mean_ms': recorder.sum / recorder.count * 1000 if recorder.count else 0.0,
+                               **{f'p{int(q * 100)}_ms': value * 1000 for q, value in quantiles.items()}}
+        return summary
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        Returns:
+            str: Metrics text.
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            latencies = sorted(self._latencies.items(), key=lambda item: item[0])
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{format_labels(labels)} {value}')
+
+        for (name, labels), recorder in latencies:
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            cumulative = np.cumsum(recorder.bucket_counts)
+            for bound, count in zip(recorder.buckets, cumulative):
+                lines.append(f'{name}_bucket{format_labels(labels + (("le", repr(float(bound))),))} {count}')
+            lines.append(f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {cumulative[-1]}')
+            lines.append(f'{name}_sum{format_labels(labels)} {recorder.sum}')
+            lines.append(f'{name}_count{format_labels(labels)} {recorder.count}')
+        for (name, labels), recorder in latencies:
+            quantile_name = f'{name}_recent'
+            if quantile_name not in typed:
+                lines.append(f'# TYPE {quantile_name} summary')
+                typed.add(quantile_name)
+            for q, value in recorder.quantiles().items():
+                lines.append(f'{quantile_name}{format_labels(labels + (("quantile", str(q)),))} {value}')
+
+        for source in self._gauge_sources:
+            for name, value in source().items():
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {float(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """
+        Drop every recorded counter and latency.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._latencies.clear()
+
+
+def format_labels(labels):
+    """
+    Format label pairs as a Prometheus label set.
+    Args:
+        labels (tuple): (name, value) pairs.
+    Returns:
+        str: Label set, empty when there are no labels.
+    """
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+# Process-wide metrics registry
+metrics = ServiceMetrics()
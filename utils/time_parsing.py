@@ -0,0 +1,40 @@
+"""
+time_parsing.py - Parse the hour of day from HH:MM[:SS] purchase times.
+
+Objective:
+    Keep one definition of how purchase times map to hours, shared by training features and live pricing so
+    both always agree. The module only depends on numpy, so the serving process can import it without pandas.
+
+Integration with Other Files:
+    - data/feature_extractor.py derives the Hour feature with parse_hours.
+    - price_engine/dynamic_pricing_calculation.py picks the hour-of-day tier tables of live requests with
+      parse_hour.
+
+Usage:
+    from utils.time_parsing import parse_hour, parse_hours
+    parse_hour('18:30')  # 18
+"""
+
+import numpy as np
+
+
+def parse_hour(purchase_time):
+    """
+    Parse the hour of a single HH:MM[:SS] time.
+    Args:
+        purchase_time (str): Time of purchase.
+    Returns:
+        int: Hour of the day.
+    """
+    return int(str(purchase_time).partition(':')[0])
+
+
+def parse_hours(purchase_times):
+    """
+    Parse the hours of many HH:MM[:SS] times with vectorized string operations.
+    Args:
+        purchase_times (pd.Series): Times of purchase.
+    Returns:
+        pd.Series: Hour of the day.
+    """
+    return purchase_times.astype(str).str.partition(':')[0].astype(np.int64)